@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Main-content extraction on a corpus of saved pages.
+
+For each page in bench/corpus/ it compares web_text's plain mode with
+mode="main" and reports output size, the reduction, extraction throughput
+(MB of HTML per second), and whether the phrases listed in
+corpus/expected.json were kept ("must") or dropped ("must_not").
+
+    python bench/bench_extract.py --repeat 20
+    python bench/bench_extract.py --show news_article.html
+"""
+import argparse, json, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+sys.path.insert(0, ROOT)
+from sgpt_common import extract
+
+
+def _plain(html: str) -> str:
+    p = extract.TextParser()
+    p.feed(html)
+    return p.text()
+
+
+def _timed(fn, html: str, repeat: int):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(html)
+    return out, (time.perf_counter() - t) / repeat
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--show", help="print the main-mode output of one page and exit")
+    args = ap.parse_args()
+    with open(os.path.join(CORPUS, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    if args.show:
+        with open(os.path.join(CORPUS, args.show), encoding="utf-8") as f:
+            print(extract.main_text(f.read()))
+        return 0
+
+    pages, ok = [], True
+    tot = {"html": 0, "plain": 0, "main": 0, "plain_s": 0.0, "main_s": 0.0}
+    for name in sorted(expected):
+        with open(os.path.join(CORPUS, name), encoding="utf-8") as f:
+            html = f.read()
+        plain, plain_s = _timed(_plain, html, args.repeat)
+        main, main_s = _timed(extract.main_text, html, args.repeat)
+        missing = [s for s in expected[name]["must"] if s not in main]
+        leaked = [s for s in expected[name]["must_not"] if s in main]
+        ok &= not missing and not leaked
+        pages.append({"page": name, "html_bytes": len(html.encode()), "plain_chars": len(plain),
+                      "main_chars": len(main), "reduction": f"{1 - len(main) / max(1, len(plain)):.0%}",
+                      "main_mb_s": round(len(html) / main_s / 1e6, 1),
+                      "missing": missing, "leaked": leaked})
+        for k, v in (("html", len(html)), ("plain", len(plain)), ("main", len(main)),
+                     ("plain_s", plain_s), ("main_s", main_s)):
+            tot[k] += v
+    print(json.dumps({"pages": pages, "total": {
+        "plain_chars": tot["plain"], "main_chars": tot["main"],
+        "reduction": f"{1 - tot['main'] / max(1, tot['plain']):.0%}",
+        "plain_mb_s": round(tot["html"] / tot["plain_s"] / 1e6, 1),
+        "main_mb_s": round(tot["html"] / tot["main_s"] / 1e6, 1),
+        "all_expectations_met": bool(ok)}}, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Connection reuse and latency: one-shot urllib vs the pooled client.
+
+Fetches the same local page N times both ways against bench/localserver.py
+and reports server-side TCP connections, p50 latency and bytes on the wire.
+
+    python bench/bench_http_pool.py --requests 200 --size 50000
+"""
+import argparse, json, os, ssl, statistics, sys, time, urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from localserver import LocalServer
+from sgpt_common import httpclient
+
+
+def _run(srv, n, fetch) -> dict:
+    before = srv.connections
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fetch()
+        samples.append((time.perf_counter() - t) * 1000)
+    return {"connections": srv.connections - before,
+            "p50_ms": round(statistics.median(samples), 3),
+            "total_ms": round(sum(samples), 1)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--size", type=int, default=50000)
+    ap.add_argument("--latency", type=float, default=0.0, help="server-side delay per request")
+    args = ap.parse_args()
+
+    with LocalServer(latency=args.latency) as srv:
+        url = srv.url(f"/page?size={args.size}")
+        ctx = ssl.create_default_context()
+
+        def one_shot():
+            req = urllib.request.Request(url, headers={"User-Agent": httpclient.UA})
+            with urllib.request.urlopen(req, timeout=20, context=ctx) as r:
+                r.read()
+
+        wire = {}
+
+        def pooled():
+            with httpclient.get(url) as r:
+                r.read()
+                wire["bytes"] = r.raw_bytes
+
+        result = {"requests": args.requests, "page_bytes": len(urllib.request.urlopen(url).read()),
+                  "urllib": _run(srv, args.requests, one_shot),
+                  "pooled": _run(srv, args.requests, pooled)}
+        result["pooled"]["wire_bytes_per_request"] = wire["bytes"]
+        result["pool_stats"] = dict(httpclient.POOL.stats)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of loading the function modules, as sgpt does at startup.
+
+Each measurement is a fresh interpreter that first imports what sgpt has
+loaded anyway (pydantic, instructor), then loads the function files by
+path and reports the wall time, with ``python -X importtime`` naming the
+heaviest imports it pulled in, and which ``sgpt_common`` modules loading
+imported (only ``defaults`` and ``trace`` are expected). "all" loads every
+module in one process, which is what an sgpt turn pays.
+
+    python bench/bench_import.py
+    python bench/bench_import.py --root /tmp/old-checkout --runs 9
+"""
+import argparse, glob, json, os, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import sys, time, importlib.util, warnings
+warnings.filterwarnings("ignore")
+from pydantic import BaseModel, Field  # sgpt has all of this loaded before it
+from instructor import OpenAISchema    # reads the functions folder
+
+
+class Warm(OpenAISchema):
+    x: int = Field(0, description="x")
+
+
+Warm.openai_schema  # instructor's own lazy imports, paid once per turn by any function
+sys.stderr.write("--start--\n")
+t = time.perf_counter()
+for path in sys.argv[1:]:
+    name = path.rsplit("/", 1)[-1][:-3]
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    mod.Function.openai_schema  # sgpt builds every schema
+ms = (time.perf_counter() - t) * 1000
+print(" ".join(sorted(m for m in sys.modules if m.startswith("sgpt_common."))))
+print(ms)
+"""
+
+
+def _measure(paths, runs: int):
+    """(best wall ms, [(self us, cumulative us, module)] from the best run, sgpt_common modules loaded)."""
+    best, best_tree, loaded = None, [], []
+    for _ in range(runs):
+        p = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD, *paths],
+                           capture_output=True, text=True)
+        if p.returncode:
+            raise SystemExit(p.stderr[-2000:])
+        out = p.stdout.splitlines()
+        ms, loaded = float(out[-1]), out[-2].split()
+        if best is None or ms < best:
+            tree = []
+            for line in p.stderr.split("--start--\n", 1)[-1].splitlines():
+                if line.startswith("import time:") and "|" in line:
+                    us_self, us_cum, name = line[len("import time:"):].split("|")
+                    if us_self.strip().isdigit():
+                        tree.append((int(us_self), int(us_cum), name.rstrip()))
+            best, best_tree = ms, tree
+    return best, best_tree, loaded
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default=ROOT, help="checkout whose function modules to load")
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement (best is kept)")
+    ap.add_argument("--top", type=int, default=8, help="heaviest imports to list for 'all'")
+    ap.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = ap.parse_args()
+    paths = sorted(p for p in glob.glob(os.path.join(args.root, "*.py")))
+    results = {}
+    for path in paths:
+        results[os.path.basename(path)[:-3]], _, _ = _measure([path], args.runs)
+    results["all"], tree, loaded = _measure(paths, args.runs)
+    heavy = sorted(tree, key=lambda t: -t[0])[: args.top]
+    if args.json:
+        print(json.dumps({"root": args.root, "ms": {k: round(v, 2) for k, v in results.items()},
+                          "heaviest_self_us": [[n.strip(), s] for s, _, n in heavy],
+                          "sgpt_common_loaded": loaded}, indent=2))
+        return 0
+    for name, ms in results.items():
+        print(f"{name:20s} {ms:8.1f} ms")
+    print(f"\nsgpt_common modules loaded: {', '.join(loaded) or 'none'}")
+    print(f"heaviest imports when loading all ({len(tree)} modules imported):")
+    for us_self, us_cum, name in heavy:
+        print(f"  {us_self / 1000:7.1f} ms self  {us_cum / 1000:7.1f} ms cumulative  {name.strip()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Log-aware summariser vs the plain head/tail one, on a synthetic log.
+
+The log is generated on the fly (never held whole): timestamped request
+lines with random ids, bursts of identical lines, and a few errors and
+warnings in the middle. Both summarisers are fed the same 64 KiB blocks
+that ``remember`` reads; the script reports throughput, summary size, and
+how many of the planted errors/warnings each summary kept. It first checks
+that lines differing only in ordinary words are never merged into a run.
+
+    python bench/bench_logsum.py --mb 200
+    python bench/bench_logsum.py --mb 5 --show
+"""
+import argparse, os, random, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sgpt_common import capture, logsum
+
+_PLANTED = [
+    "ERROR db: connection refused by 10.0.0.7:5432",
+    "WARNING: disk /var at 93% capacity",
+    "Traceback (most recent call last):",
+    "FATAL: worker 3 killed by OOM",
+]
+
+
+def _blocks(mb: int, seed: int = 1):
+    """64 KiB-ish text blocks of a synthetic log, ``mb`` MB in total."""
+    rnd = random.Random(seed)
+    target = mb * 1024 * 1024
+    planted_at = sorted(rnd.randrange(target // 10, target - target // 10) for _ in _PLANTED)
+    done = 0
+    n = 0
+    buf = []
+    size = 0
+    while done < target:
+        n += 1
+        if planted_at and done >= planted_at[0]:
+            planted_at.pop(0)
+            line = f"2025-03-01T12:{n % 60:02d}:{n % 60:02d}Z {_PLANTED[len(_PLANTED) - len(planted_at) - 1]}"
+        elif n % 5000 < 300:
+            line = "2025-03-01T12:00:00Z DEBUG heartbeat ok"
+        else:
+            line = (f"2025-03-01T12:{n % 60:02d}:{(n // 60) % 60:02d}.{n % 1000:03d}Z INFO "
+                    f"GET /api/items/{rnd.getrandbits(32):x} 200 {rnd.randrange(900)}ms")
+        buf.append(line)
+        size += len(line) + 1
+        if size >= 65536:
+            yield "\n".join(buf) + "\n"
+            done += size
+            buf, size = [], 0
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+# Same shape, different words: each must survive as its own line.
+_WORD_LINES = ["ii  bash 5.2.15 amd64", "ii  dash 0.5.12 amd64", "ii  cash 1.0 amd64",
+               "ii  bed 2.1 all", "ii  bad 2.1 all", "ii  fade 3 all"]
+# Same line apart from ids and numbers: these must collapse into one run.
+_ID_LINES = [f"GET /api/items/{i * 7919:x}a 200 {i}ms" for i in range(1, 6)]
+
+
+def _check_runs() -> None:
+    s = logsum.LogSummary(4000)
+    s.feed_lines([ln for ln in _WORD_LINES for _ in range(3)] + _ID_LINES * 40)
+    out = s.text()
+    missing = [ln for ln in _WORD_LINES if f"{ln}  [×3]" not in out]
+    assert not missing, f"lines merged into a neighbour's run: {missing}"
+    assert f"[×{len(_ID_LINES) * 40}]" in out, "id-only differences not collapsed:\n" + out
+    print(f"run keys   {len(_WORD_LINES)} word-only variants kept apart, id-only variants collapsed")
+
+
+def _run(name: str, sink, mb: int) -> str:
+    split = capture._Splitter(sink)
+    t = time.perf_counter()
+    for block in _blocks(mb):
+        split(block)
+    split.close()
+    out = sink.text()
+    dt = time.perf_counter() - t
+    kept = sum(p in out for p in _PLANTED)
+    print(f"{name:10s} {mb / dt:7.1f} MB/s  {sink.lines / dt / 1e6:5.2f} M lines/s  "
+          f"summary {len(out):6d} chars  planted kept {kept}/{len(_PLANTED)}")
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mb", type=int, default=50, help="size of the generated log")
+    ap.add_argument("--chars", type=int, default=logsum.MAX_CHARS, help="LogSummary budget")
+    ap.add_argument("--show", action="store_true", help="print both summaries")
+    a = ap.parse_args()
+    _check_runs()
+    ht = _run("headtail", capture.HeadTail(24), a.mb)
+    ls = _run("logsum", logsum.LogSummary(a.chars), a.mb)
+    if a.show:
+        print("\n--- headtail ---\n" + ht + "\n\n--- logsum ---\n" + ls)
+
+
+if __name__ == "__main__":
+    main()
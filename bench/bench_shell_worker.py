@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Per-command latency: fresh `bash -lc` / `sh -c` vs the persistent shell worker.
+
+    python bench/bench_shell_worker.py --runs 50 --command true
+"""
+import argparse, json, os, statistics, subprocess, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sgpt_common import proc
+
+
+def _time(fn, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=50)
+    ap.add_argument("--command", default="true")
+    args = ap.parse_args()
+
+    w = proc.ShellWorker()
+    w.run("true", lambda b: None, 60, proc.MAX_BYTES)  # pay the login once, outside the timing
+    result = {
+        "command": args.command,
+        "bash -lc (remember)": _time(lambda: subprocess.run(["bash", "-lc", args.command],
+                                                            capture_output=True), args.runs),
+        "sh -c (execute_shell)": _time(lambda: proc.run(args.command, persistent=False), args.runs),
+        "worker": _time(lambda: w.run(args.command, lambda b: None, 60, proc.MAX_BYTES), args.runs),
+    }
+    w.close()
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: every memory function against synthetic stores of several
+sizes, and the web functions against bench/localserver.py.
+
+Each group runs in a fresh child process, so imports, caches and the peak
+RSS of one group do not leak into the next. A group times each
+``Function.execute`` call ``--repeat`` times, after one warm-up call whose
+time is reported separately as ``first_ms``. The results are JSON, with
+percentiles in milliseconds and peak RSS in KiB. On Linux the peak is
+reset before each benchmark, so it is that benchmark's own peak. Compare
+two runs with ``--compare``.
+
+    python bench/bench_suite.py --sizes 1000,100000,1000000 --out before.json
+    python bench/bench_suite.py --only web --page-sizes 10000,1000000 --latency 0.02
+    python bench/bench_suite.py --out after.json --compare before.json
+"""
+import argparse, importlib.util, json, os, platform, random, resource, shutil, subprocess, sys, \
+    tempfile, time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_WORDS = ("build deploy error warning disk cache kernel nginx postgres docker compose backup "
+          "restore cron ssh key token latency timeout retry queue worker memory swap cpu load "
+          "network dns route firewall package upgrade install config secret log rotate").split()
+_TITLES = ("Command: du -sh /var/log", "Command: systemctl status nginx", "File: app.log",
+           "File: config.yaml", "Note", "Command: docker ps", "Command: df -h")
+
+
+def _load(name: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.Function
+
+
+def _reset_peak() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")  # resets VmHWM (Linux only)
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+
+def _pct(xs, p: float) -> float:
+    xs = sorted(xs)
+    k = (len(xs) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def _time(name: str, call, repeat: int, **extra) -> dict:
+    """Time ``call(i)`` once cold and ``repeat`` more times; returns one result row."""
+    _reset_peak()
+    t = time.perf_counter()
+    out = call(0)
+    first = (time.perf_counter() - t) * 1000
+    samples = []
+    for i in range(1, repeat + 1):
+        t = time.perf_counter()
+        out = call(i)
+        samples.append((time.perf_counter() - t) * 1000)
+    samples = samples or [first]
+    row = {"name": name, **extra, "n": len(samples), "first_ms": round(first, 3),
+           "min_ms": round(min(samples), 3), "p50_ms": round(_pct(samples, 50), 3),
+           "p90_ms": round(_pct(samples, 90), 3), "p99_ms": round(_pct(samples, 99), 3),
+           "max_ms": round(max(samples), 3), "mean_ms": round(sum(samples) / len(samples), 3),
+           "peak_rss_kb": _peak_rss_kb(), "out_chars": len(out or "")}
+    print(f"  {name:34s} p50 {row['p50_ms']:9.3f} ms  p99 {row['p99_ms']:9.3f} ms  "
+          f"rss {row['peak_rss_kb'] // 1024} MiB", file=sys.stderr)
+    return row
+
+
+def _populate(size: int, seed: int = 1) -> float:
+    """Fill the store at SGPT_MEMORY_DB with ``size`` synthetic entries; returns seconds taken."""
+    sys.path.insert(0, ROOT)
+    from sgpt_common import store, vectors
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    step = 365 * 24 * 3600 / max(size, 1)
+
+    def rows():
+        for i in range(size):
+            words = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randrange(20, 80)))
+            yield ((start + timedelta(seconds=i * step)).isoformat() + "Z", rnd.choice(_TITLES),
+                   f"$ {rnd.choice(_WORDS)} {i}\n{words}\n# exit: 0", rnd.randrange(100, 100000))
+
+    t = time.perf_counter()
+
+    def fill(db):
+        db.executemany("INSERT INTO memories (created, title, summary, raw_len) VALUES (?, ?, ?, ?)",
+                       rows())
+        vectors.mark_stale(db)  # memory_search builds its index on first use
+    store.write(fill)
+    return time.perf_counter() - t
+
+
+def _memory_group(size: int, repeat: int, skip: set) -> list:
+    build = _populate(size)
+    print(f"memory store: {size} entries (built in {build:.1f}s)", file=sys.stderr)
+    from sgpt_common import store
+    fn = {n: _load(n) for n in ("memory", "memory_list", "memory_search", "memory_edit",
+                                "memory_clear", "remember")}
+    rnd = random.Random(2)
+    ids = lambda: rnd.randrange(1, size + 1)
+    mid = store.get(size // 2)
+    deep = f"{mid['created']}|{mid['id']}"
+    month = mid["created"][:7]
+    tmp = tempfile.mkdtemp(prefix="sgpt-bench-")
+    log = os.path.join(tmp, "app.log")
+    with open(log, "w") as fh:
+        for i in range(20000):
+            fh.write(f"2025-01-01T00:00:{i % 60:02d}Z INFO request {i} ok in {i % 97}ms\n")
+            if i % 5000 == 4999:
+                fh.write(f"2025-01-01T00:00:{i % 60:02d}Z ERROR upstream timed out ({i})\n")
+
+    benches = [
+        ("memory(id)", lambda i: fn["memory"].execute(id=ids())),
+        ("memory(ids=50)", lambda i: (lambda a: fn["memory"].execute(ids=f"{a}-{a + 49}"))(
+            rnd.randrange(1, max(2, size - 49)))),
+        ("memory_list()", lambda i: fn["memory_list"].execute()),
+        ("memory_list(cursor=middle)", lambda i: fn["memory_list"].execute(cursor=deep)),
+        ("memory_list(since/until)", lambda i: fn["memory_list"].execute(
+            since=month, until=month + "-15")),
+        ("memory_list(title)", lambda i: fn["memory_list"].execute(title=rnd.choice(_TITLES)[-6:])),
+        ("memory_list(query)", lambda i: fn["memory_list"].execute(
+            query=f"{rnd.choice(_WORDS)} {rnd.choice(_WORDS)}")),
+        ("memory_search(query)", lambda i: fn["memory_search"].execute(
+            query=f"{rnd.choice(_WORDS)} {rnd.choice(_WORDS)}")),
+        ("memory_edit(append)", lambda i: fn["memory_edit"].execute(
+            id=ids(), summary=f"bench note {i}", summary_mode="append")),
+        ("memory_edit(pin)", lambda i: fn["memory_edit"].execute(id=ids(), pinned=bool(i % 2))),
+        ("memory_clear(ids)", lambda i: fn["memory_clear"].execute(ids=[ids()])),
+        ("remember(text)", lambda i: fn["remember"].execute(
+            mode="text", content=f"bench note {i}\n" + " ".join(_WORDS))),
+        ("remember(file)", lambda i: fn["remember"].execute(mode="file", content=log)),
+        ("remember(command)", lambda i: fn["remember"].execute(
+            mode="command", content=f"seq 1 {2000 + i}")),
+    ]
+    out = []
+    try:
+        for name, call in benches:
+            if name.split("(")[0] in skip or name in skip:
+                continue
+            out.append(_time(name, call, repeat, group="memory", size=size))
+        if "memory_clear" not in skip:  # last: it empties the store
+            out.append(_time("memory_clear(all)", lambda i: fn["memory_clear"].execute(), 0,
+                             group="memory", size=size))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for row in out:
+        row["build_s"] = round(build, 2)
+    return out
+
+
+def _web_group(page_sizes: list, latency: float, repeat: int, skip: set) -> list:
+    sys.path.insert(0, HERE)
+    from localserver import LocalServer
+    fn = {n: _load(n) for n in ("web_get", "web_text", "web_extract_links", "web_download")}
+    tmp = tempfile.mkdtemp(prefix="sgpt-bench-")
+    out = []
+    try:
+        with LocalServer(latency=latency) as srv:
+            for size in page_sizes:
+                page = lambda i: srv.url(f"/page?size={size}&seed={i}&links=200")
+                benches = [
+                    ("web_get", lambda i: fn["web_get"].execute(page(i))),
+                    ("web_text", lambda i: fn["web_text"].execute(page(i))),
+                    ("web_text(main)", lambda i: fn["web_text"].execute(page(i), mode="main")),
+                    ("web_extract_links", lambda i: fn["web_extract_links"].execute(page(i))),
+                    ("web_download", lambda i: fn["web_download"].execute(
+                        srv.url(f"/bytes?size={size}&n={i}"), os.path.join(tmp, f"dl{i}"))),
+                ]
+                print(f"web: {size} byte pages, {latency}s latency", file=sys.stderr)
+                for name, call in benches:
+                    if name.split("(")[0] not in skip and name not in skip:
+                        out.append(_time(name, call, repeat, group="web", size=size,
+                                         latency_s=latency))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out
+
+
+def _child(args) -> int:
+    skip = set(filter(None, args.skip.split(",")))
+    if args.group == "memory":
+        rows = _memory_group(args.size, args.repeat, skip)
+    else:
+        rows = _web_group([int(s) for s in args.page_sizes.split(",")], args.latency, args.repeat, skip)
+    json.dump(rows, sys.stdout)
+    return 0
+
+
+def _run_group(argv: list, env: dict) -> list:
+    p = subprocess.run([sys.executable, os.path.abspath(__file__), *argv], env=env,
+                       stdout=subprocess.PIPE)
+    if p.returncode:
+        raise SystemExit(f"benchmark group {argv} failed (exit {p.returncode})")
+    return json.loads(p.stdout)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], text=True,
+                              capture_output=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def _compare(new: dict, old_path: str) -> None:
+    with open(old_path) as fh:
+        old = json.load(fh)
+    key = lambda r: (r["group"], r["name"], r["size"])
+    before = {key(r): r for r in old["results"]}
+    print(f"\n{'benchmark':44s} {'size':>9s} {'p50 before':>12s} {'p50 after':>12s} {'ratio':>7s}"
+          f"   ({old['meta']['commit']} -> {new['meta']['commit']})", file=sys.stderr)
+    for r in new["results"]:
+        b = before.get(key(r))
+        if b:
+            ratio = r["p50_ms"] / b["p50_ms"] if b["p50_ms"] else float("inf")
+            print(f"{r['group'] + ' ' + r['name']:44s} {r['size']:9d} {b['p50_ms']:12.3f} "
+                  f"{r['p50_ms']:12.3f} {ratio:7.2f}", file=sys.stderr)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,100000,1000000", help="memory store sizes")
+    ap.add_argument("--page-sizes", default="10000,100000,1000000", help="web page/body sizes in bytes")
+    ap.add_argument("--latency", type=float, default=0.0, help="server-side delay per request")
+    ap.add_argument("--repeat", type=int, default=20, help="timed calls per benchmark")
+    ap.add_argument("--only", choices=("memory", "web"), help="run one group only")
+    ap.add_argument("--skip", default="", help="comma-separated function or benchmark names")
+    ap.add_argument("--cache", action="store_true", help="keep the read and HTTP caches on")
+    ap.add_argument("--out", help="write the JSON here instead of stdout")
+    ap.add_argument("--compare", help="earlier --out file to compare p50s against")
+    ap.add_argument("--group", help=argparse.SUPPRESS)
+    ap.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.group:
+        return _child(args)
+
+    results = []
+    tmp = tempfile.mkdtemp(prefix="sgpt-bench-")
+    env = dict(os.environ, SGPT_MEMORY_BLOB_DIR=os.path.join(tmp, "blobs"),
+               SGPT_HTTP_CACHE_DIR=os.path.join(tmp, "http"))
+    if not args.cache:
+        env.update(SGPT_MEMORY_CACHE_SIZE="0", SGPT_HTTP_CACHE="0")
+    common = ["--repeat", str(args.repeat), "--skip", args.skip]
+    try:
+        if args.only in (None, "memory"):
+            for size in (int(s) for s in args.sizes.split(",")):
+                d = os.path.join(tmp, f"store{size}")
+                os.makedirs(d)
+                e = dict(env, SGPT_MEMORY_DB=os.path.join(d, "memory.db"),
+                         SGPT_MEMORY_FILE=os.path.join(d, "memory.json"))
+                results += _run_group(["--group", "memory", "--size", str(size), *common], e)
+                shutil.rmtree(d, ignore_errors=True)
+        if args.only in (None, "web"):
+            results += _run_group(["--group", "web", "--page-sizes", args.page_sizes,
+                                   "--latency", str(args.latency), *common], env)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {"meta": {"commit": _commit(), "date": datetime.utcnow().isoformat() + "Z",
+                       "python": platform.python_version(), "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "repeat": args.repeat, "cache": args.cache},
+              "results": results}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        _compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
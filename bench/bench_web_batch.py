@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Batch fetch wall time: N sequential web_text calls vs one ``urls`` call.
+
+Serves pages with a per-request delay from bench/localserver.py (spread
+over two local "hosts") and reports the wall time of each approach next to
+the slowest single fetch.
+
+    python bench/bench_web_batch.py --urls 8 --latency 0.3
+"""
+import argparse, importlib.util, json, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from localserver import LocalServer
+
+
+def _load(name: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.Function
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--urls", type=int, default=8)
+    ap.add_argument("--latency", type=float, default=0.3, help="server-side delay per request")
+    args = ap.parse_args()
+    os.environ["SGPT_HTTP_CACHE"] = "0"  # measure the network, not the cache
+    web_text = _load("web_text")
+
+    with LocalServer(latency=args.latency) as a, LocalServer(latency=args.latency) as b:
+        urls = [(a, b)[i % 2].url(f"/page?seed={i}") for i in range(args.urls)]
+        t = time.perf_counter()
+        for u in urls:
+            web_text.execute(u)
+        sequential = time.perf_counter() - t
+        t = time.perf_counter()
+        out = web_text.execute(urls=urls)
+        batched = time.perf_counter() - t
+    print(json.dumps({"urls": args.urls, "latency_s": args.latency,
+                      "sequential_s": round(sequential, 3), "batch_s": round(batched, 3),
+                      "speedup": round(sequential / batched, 1),
+                      "summary": out.splitlines()[0]}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
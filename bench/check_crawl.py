@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of web_crawl against a generated site graph.
+
+Serves /site/<n>.html pages (each linking to a few others, to ../ paths,
+fragments, mailto:, an external host and a robots.txt-disallowed path)
+from bench/localserver.py and checks that the crawl:
+
+- fetches exactly the pages reachable within max_depth (breadth-first);
+- never fetches a URL twice, and never fetches /private/ or another host;
+- stops at max_pages;
+- keeps at most PER_HOST requests in flight and honours the delay;
+- resolves links against the URL a redirect ended at.
+
+The HTTP cache is on, in a temporary directory, as it is by default.
+
+It also times the compact visited set on a million URLs.
+
+    python bench/check_crawl.py --pages 500 --depth 3
+"""
+import argparse, json, os, sys, tempfile, time
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SGPT_HTTP_CACHE_DIR", tempfile.mkdtemp(prefix="check_crawl-"))
+from localserver import LocalServer
+from sgpt_common import crawl
+
+
+def _reachable(srv, depth: int) -> set:
+    seen, queue = {0}, deque([(0, 0)])
+    while queue:
+        n, d = queue.popleft()
+        if d == depth:
+            continue
+        for m in srv.site_links(n) + [0]:
+            if m not in seen:
+                seen.add(m)
+                queue.append((m, d + 1))
+    return seen
+
+
+def _check(name: str, cond: bool, failures: list) -> None:
+    print(f"{'ok  ' if cond else 'FAIL'} {name}")
+    if not cond:
+        failures.append(name)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--visited", type=int, default=1_000_000)
+    args = ap.parse_args()
+    failures: list = []
+
+    with LocalServer(site_pages=args.pages, gzip=False) as srv:
+        expected = {srv.url(f"/site/{n}.html") for n in _reachable(srv, args.depth)}
+        stats: dict = {}
+        t = time.perf_counter()
+        pages = list(crawl.crawl(srv.url("/site/0.html"), args.depth, 10_000, delay=0, stats=stats))
+        elapsed = time.perf_counter() - t
+        urls = [p.url for p in pages]
+        site_paths = [p for p in srv.paths if p.startswith("/site/")]
+        _check(f"fetched the {len(expected)} reachable pages", set(urls) == expected, failures)
+        _check("no URL fetched twice", len(site_paths) == len(set(site_paths)), failures)
+        _check("robots.txt fetched once", srv.paths.count("/robots.txt") == 1, failures)
+        _check("nothing under /private/ fetched", not any(p.startswith("/private") for p in srv.paths), failures)
+        # Pages come back as fetches finish, so the last page of one level can
+        # arrive after the first of the next, but never two levels late.
+        deepest = [max(p.depth for p in pages[: i + 1]) for i in range(len(pages))]
+        _check("breadth-first order", all(p.depth >= d - 1 for p, d in zip(pages, deepest)), failures)
+        _check(f"at most {crawl.PER_HOST} requests in flight", srv.max_inflight <= crawl.PER_HOST, failures)
+        print(f"     {len(pages)} pages in {elapsed:.2f}s, stats {stats}")
+
+    with LocalServer(site_pages=args.pages, gzip=False) as srv:
+        pages = list(crawl.crawl(srv.url("/site/0.html"), 10, 25, delay=0))
+        _check("max_pages respected", len(pages) == 25 and
+               len([p for p in srv.paths if p.startswith("/site/")]) == 25, failures)
+
+    with LocalServer(site_pages=args.pages, gzip=False, latency=0) as srv:
+        t = time.perf_counter()
+        list(crawl.crawl(srv.url("/site/0.html"), 3, 11, delay=0.05))
+        took = time.perf_counter() - t
+        _check("per-host delay honoured (11 pages at 0.05s >= 0.5s)", took >= 0.5, failures)
+
+    with LocalServer(gzip=False) as srv:
+        pages = list(crawl.crawl(srv.url("/dir"), 1, 10, delay=0))
+        _check("links resolved against the redirect target",
+               "/dir/intro.html" in srv.paths and "/intro.html" not in srv.paths, failures)
+        pages = list(crawl.crawl(srv.url("/dir"), 1, 10, delay=0))
+        _check("... also when the page comes from the cache",
+               srv.paths.count("/dir/intro.html") == 2 and "/intro.html" not in srv.paths, failures)
+
+    vs = crawl.VisitedSet()
+    t = time.perf_counter()
+    for i in range(args.visited):
+        vs.add(f"https://example.com/page/{i}?q={i % 97}")
+    add_s = time.perf_counter() - t
+    dup = sum(not vs.add(f"https://example.com/page/{i}?q={i % 97}") for i in range(0, args.visited, 1000))
+    _check("visited set keeps every URL", len(vs) == args.visited and dup == args.visited // 1000, failures)
+    print(json.dumps({"visited_urls": len(vs), "table_mb": round(vs.nbytes / 1e6, 1),
+                      "add_us_per_url": round(add_s / args.visited * 1e6, 2)}))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
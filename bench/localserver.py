@@ -0,0 +1,167 @@
+"""
+Local HTTP/1.1 test server for the web benchmarks.
+
+Serves generated pages with keep-alive, optional gzip, configurable size
+and latency, Range requests, ETag/Last-Modified revalidation, a
+generated link graph and a redirected directory URL (/dir -> /dir/), and counts the TCP connections, requests (with their
+paths) and the peak number of requests in flight.
+
+    with LocalServer() as srv:
+        srv.url("/page?size=100000&latency=0.01")
+"""
+import gzip, hashlib, http.server, socketserver, threading, time
+from urllib.parse import parse_qs, urlsplit
+
+_WORDS = ("alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu "
+          "nu xi omicron pi rho sigma tau upsilon phi chi psi omega").split()
+
+
+def page_html(size: int, seed: int = 0, links: int = 20) -> bytes:
+    """A plain article page of roughly ``size`` bytes with ``links`` anchors."""
+    parts = ["<html><head><title>Page %d</title><style>p{}</style></head><body>" % seed,
+             "<nav>" + " ".join(f'<a href="/nav/{i}">Nav {i}</a>' for i in range(8)) + "</nav>",
+             "<h1>Document %d</h1>" % seed]
+    n, i = sum(map(len, parts)), 0
+    while n < size:
+        words = " ".join(_WORDS[(seed + i + j) % len(_WORDS)] for j in range(60))
+        link = f' <a href="/page/{(seed * 31 + i) % 1000}">link {i}</a>' if i < links else ""
+        p = f"<p>{words}{link}.</p>\n"
+        parts.append(p)
+        n += len(p)
+        i += 1
+    parts.append("<footer>&copy; footer <a href='/about'>About</a></footer></body></html>")
+    return "".join(parts).encode()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _body(self, path: str, q: dict) -> bytes:
+        if path.startswith("/site/"):
+            return self.server.site_page(path)
+        if path == "/dir/":  # a relative link, resolved against the redirected URL
+            return b'<html><head><title>Dir</title></head><body><a href="intro.html">intro</a></body></html>'
+        if path == "/dir/intro.html":
+            return b"<html><head><title>Intro</title></head><body><p>intro</p></body></html>"
+        if path.startswith("/bytes"):
+            size = int(q.get("size", ["1048576"])[0])
+            return hashlib.sha256(b"seed").digest() * (size // 32) + b"x" * (size % 32)
+        return page_html(int(q.get("size", ["20000"])[0]), int(q.get("seed", ["0"])[0]),
+                         int(q.get("links", ["20"])[0]))
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.paths.append(self.path)
+            self.server.inflight += 1
+            self.server.max_inflight = max(self.server.max_inflight, self.server.inflight)
+        try:
+            self._get()
+        finally:
+            with self.server.lock:
+                self.server.inflight -= 1
+
+    def _get(self):
+        u = urlsplit(self.path)
+        q = parse_qs(u.query)
+        latency = float(q.get("latency", [self.server.latency])[0])
+        if latency:
+            time.sleep(latency)
+        if u.path == "/robots.txt":
+            body = self.server.robots.encode()
+            return self._send(200, body, "text/plain")
+        if u.path == "/dir":  # like a web server adding the slash to a directory URL
+            return self._send(301, b"", "text/plain", {"Location": "/dir/"})
+        body = self._body(u.path, q)
+        if body is None:
+            return self._send(404, b"not found", "text/plain")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        ctype = "application/octet-stream" if u.path.startswith("/bytes") else "text/html; charset=utf-8"
+        extra = {"ETag": etag, "Cache-Control": q.get("cc", ["no-cache"])[0]}
+        rng = self.headers.get("Range")
+        if rng and u.path.startswith("/bytes") and "norange" not in q:
+            start, _, end = rng.partition("=")[2].partition("-")
+            start, end = int(start), min(int(end or len(body) - 1), len(body) - 1)
+            extra["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return self._send(206, body[start : end + 1], ctype, extra)
+        if u.path.startswith("/bytes") and "norange" not in q:
+            extra["Accept-Ranges"] = "bytes"
+        if "gzip" in self.headers.get("Accept-Encoding", "") and self.server.gzip and \
+                not u.path.startswith("/bytes"):
+            body = gzip.compress(body, 6)
+            extra["Content-Encoding"] = "gzip"
+        self._send(200, body, ctype, extra)
+
+    do_HEAD = do_GET
+
+    def _send(self, code, body, ctype, extra=None):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+class LocalServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0, gzip: bool = True, site_pages: int = 0,
+                 site_fanout: int = 5, robots: str = "User-agent: *\nDisallow: /private/\n"):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency, self.gzip, self.robots = latency, gzip, robots
+        self.site_pages, self.site_fanout = site_pages, site_fanout
+        self.lock = threading.Lock()
+        self.connections = self.requests = 0
+        self.inflight = self.max_inflight = 0
+        self.paths = []  # request paths in arrival order
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def site_links(self, n: int):
+        """Graph edges of /site/<n>.html (page numbers)."""
+        return [(n * 7 + k * 13 + 1) % self.site_pages for k in range(self.site_fanout)]
+
+    def site_page(self, path: str):
+        """/site/<n>.html links to a few deterministic other pages of the graph."""
+        try:
+            n = int(path.rsplit("/", 1)[1].split(".")[0])
+        except ValueError:
+            return None
+        if not 0 <= n < self.site_pages:
+            return None
+        links = [f'<a href="/site/{m}.html#frag">p</a>' for m in self.site_links(n)]
+        links.append('<a href="../site/0.html">home</a> <a href="/private/x">secret</a>')
+        links.append('<a href="mailto:a@b.c">mail</a> <a href="http://elsewhere.invalid/">out</a>')
+        return f"<html><head><title>Site page {n}</title></head><body><h1>Site page {n}</h1>{' '.join(links)}</body></html>".encode()
+
+    def url(self, path: str = "/") -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
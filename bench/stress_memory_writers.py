@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent memory writers.
+
+Spawns many processes (each with a few threads) that insert memories and
+append to one shared memory against a scratch DB, then checks that no
+write was lost: every insert is present, ids are unique and contiguous,
+and every append survived the read-modify-write.
+
+    python bench/stress_memory_writers.py --procs 16 --threads 4 --writes 25
+"""
+import argparse, json, multiprocessing as mp, os, sys, tempfile, threading, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _worker(db_path: str, proc: int, threads: int, writes: int) -> None:
+    os.environ["SGPT_MEMORY_DB"] = db_path
+    sys.path.insert(0, ROOT)
+    from sgpt_common import store
+
+    def append(tag):
+        def apply(db):
+            row = store.get(1, db)
+            store.update(1, db, summary=row["summary"] + "\n" + tag)
+        store.write(apply)
+
+    def run(t):
+        for i in range(writes):
+            store.insert(f"p{proc} t{t} #{i}", "stress", 6)
+            append(f"p{proc}-t{t}-{i}")
+
+    ts = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--procs", type=int, default=16)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--writes", type=int, default=25, help="inserts (and appends) per thread")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="sgpt-stress-")
+    db_path = os.path.join(tmp, "memory.db")
+    os.environ["SGPT_MEMORY_DB"] = db_path
+    os.environ["SGPT_MEMORY_FILE"] = os.path.join(tmp, "memory.json")
+    sys.path.insert(0, ROOT)
+    from sgpt_common import store
+    store.insert("shared", "start", 0)
+
+    t0 = time.perf_counter()
+    procs = [mp.Process(target=_worker, args=(db_path, p, args.threads, args.writes))
+             for p in range(args.procs)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+
+    conn = store.connect()
+    ids = [r[0] for r in conn.execute("SELECT id FROM memories ORDER BY id")]
+    tags = set(store.get(1)["summary"].splitlines()[1:])
+    expected = args.procs * args.threads * args.writes
+    want_tags = {f"p{p}-t{t}-{i}" for p in range(args.procs)
+                 for t in range(args.threads) for i in range(args.writes)}
+    result = {
+        "writers": args.procs * args.threads,
+        "writes": expected * 2,
+        "seconds": round(elapsed, 3),
+        "writes_per_sec": round(expected * 2 / elapsed, 1),
+        "inserts_found": len(ids) - 1,
+        "ids_contiguous": ids == list(range(1, len(ids) + 1)),
+        "appends_lost": len(want_tags - tags),
+        "failed_procs": sum(1 for p in procs if p.exitcode),
+    }
+    ok = (result["inserts_found"] == expected and result["ids_contiguous"]
+          and not result["appends_lost"] and not result["failed_procs"])
+    result["ok"] = ok
+    print(json.dumps(result, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Summarise a trace written with SGPT_TRACE (see sgpt_common/trace.py).
+
+Per function: calls, errors, wall-time percentiles, mean CPU and bytes,
+and how much of the wall time each kind of span accounts for (spans in
+parallel threads add up, so batch calls can pass 100%). Then the
+slowest calls with their spans and profile dumps.
+
+    python bench/trace_report.py ~/.cache/shell_gpt/trace.jsonl --slowest 5
+    python bench/trace_report.py trace.jsonl --fn web_text
+"""
+import argparse, json, os, sys
+from collections import defaultdict
+
+
+def _pct(xs, p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round((len(xs) - 1) * p / 100)))]
+
+
+def _load(path: str, fn: str):
+    with open(path) as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if not fn or rec.get("fn") == fn:
+                yield rec
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", nargs="?", default=os.path.expanduser("~/.cache/shell_gpt/trace.jsonl"))
+    ap.add_argument("--fn", help="only this function (its schema title)")
+    ap.add_argument("--slowest", type=int, default=3, help="slowest calls to show in full")
+    args = ap.parse_args()
+    calls = list(_load(args.path, args.fn))
+    if not calls:
+        print("No calls traced.")
+        return 1
+
+    by_fn = defaultdict(list)
+    for c in calls:
+        by_fn[c["fn"]].append(c)
+    for fn, cs in sorted(by_fn.items(), key=lambda kv: -sum(c["wall_ms"] for c in kv[1])):
+        wall = [c["wall_ms"] for c in cs]
+        mean = lambda k: sum(c.get(k, 0) for c in cs) / len(cs)
+        errors = sum(1 for c in cs if c.get("error"))
+        print(f"{fn}: {len(cs)} call(s), {errors} error(s)")
+        print(f"  wall ms   p50 {_pct(wall, 50):.1f}  p95 {_pct(wall, 95):.1f}  max {max(wall):.1f}")
+        print(f"  mean      cpu {mean('cpu_ms'):.1f} ms  children {mean('child_cpu_ms'):.1f} ms  "
+              f"read {mean('read_bytes'):.0f} B  written {mean('written_bytes'):.0f} B  "
+              f"net {mean('net_read_bytes'):.0f} B  returned {mean('returned_bytes'):.0f} B")
+        spans = defaultdict(float)
+        for c in cs:
+            for s in c.get("spans", ()):
+                spans[s["name"]] += s["ms"]
+        total = sum(wall) or 1
+        for name, ms in sorted(spans.items(), key=lambda kv: -kv[1]):
+            print(f"  {name:18s} {ms:10.1f} ms  {100 * ms / total:5.1f}% of wall")
+
+    for c in sorted(calls, key=lambda c: -c["wall_ms"])[: args.slowest]:
+        print(f"\n{c['fn']} {c['wall_ms']:.1f} ms (cpu {c['cpu_ms']:.1f} ms) args {c.get('args')}")
+        for s in c.get("spans", ()):
+            extra = {k: v for k, v in s.items() if k not in ("name", "at_ms", "ms")}
+            print(f"  +{s['at_ms']:9.1f} ms  {s['name']:18s} {s['ms']:9.1f} ms  {extra or ''}")
+        if c.get("profile"):
+            print(f"  profile: {c['profile']}.*")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,22 @@
-import subprocess
+import os
+import sys
+from typing import Optional
 
 from instructor import OpenAISchema
 from pydantic import Field
 
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import defaults, proc, trace
 
+
+@trace.instrument
 class Function(OpenAISchema):
     """
     Executes a shell command and returns the output (result).
+    Long-running or very chatty commands are stopped at a time/size limit;
+    then only the start and end of the output are returned, with stats.
     """
 
     shell_command: str = Field(
@@ -14,15 +24,28 @@ class Function(OpenAISchema):
         example="ls -la",
         descriptions="Shell command to execute.",
     )
+    timeout_sec: Optional[float] = Field(
+        None, description=f"Stop the command after this many seconds (default {defaults.SHELL_TIMEOUT_SEC:g})."
+    )
+    max_output_bytes: Optional[int] = Field(
+        None, description=f"Stop the command once it has printed this many bytes (default {defaults.SHELL_MAX_BYTES})."
+    )
 
     class Config:
         title = "execute_shell_command"
 
     @classmethod
-    def execute(cls, shell_command: str) -> str:
-        process = subprocess.Popen(
-            shell_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    def execute(
+        cls,
+        shell_command: str,
+        timeout_sec: Optional[float] = None,
+        max_output_bytes: Optional[int] = None,
+    ) -> str:
+        r = proc.run(
+            shell_command,
+            timeout=timeout_sec or proc.TIMEOUT_SEC,
+            max_bytes=max_output_bytes or proc.MAX_BYTES,
         )
-        output, _ = process.communicate()
-        exit_code = process.returncode
-        return f"Exit code: {exit_code}, Output:\n{output.decode()}"
+        if r.stopped or r.omitted:
+            return f"Exit code: {r.exit_code} ({r.stats()}), Output:\n{r.output()}"
+        return f"Exit code: {r.exit_code}, Output:\n{r.output()}"
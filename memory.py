@@ -1,30 +1,104 @@
 # ~/.config/shell_gpt/functions/memory.py
-import json, os
+import os, re, sys
+from typing import List, Optional, Tuple
 from pydantic import Field
 from instructor import OpenAISchema
 
-MEMORY_PATH = os.path.expanduser(
-    os.environ.get("SGPT_MEMORY_FILE", "~/.config/shell_gpt/memory.json")
-)
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import blobs, store, trace
 
+MAX_BULK = 200
+
+
+def _parse_ids(spec: str) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """Parse "3, 7, 10-20" into ([3, 7], [(10, 20)]); ValueError on anything else."""
+    ids, ranges = [], []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        m = re.fullmatch(r"(\d+)\s*-\s*(\d+)", part)
+        if m:
+            lo, hi = int(m.group(1)), int(m.group(2))
+            ranges.append((min(lo, hi), max(lo, hi)))
+        else:
+            ids.append(int(part))
+    return ids, ranges
+
+
+@trace.instrument
 class Function(OpenAISchema):
     """
-    Retrieve a previously saved memory by ID.
+    Retrieve previously saved memories: one by ID, or many at once with ids
+    (a list such as "3,7,10-20"). With raw=true, page through the full raw
+    text behind one memory instead of its summary.
     """
-    id: int = Field(..., description="Memory ID to fetch.")
+    id: Optional[int] = Field(None, description="Memory ID to fetch.")
+    ids: Optional[str] = Field(
+        None, example="3,7,10-20", description=f"Several IDs and inclusive ID ranges (up to {MAX_BULK} entries)."
+    )
+    raw: bool = Field(False, description="Return the raw text instead of the summary.")
+    offset: int = Field(0, ge=0, description="Raw mode: byte offset to start at.")
+    length: int = Field(4000, ge=1, le=65536, description="Raw mode: bytes to return.")
 
     class Config:
         title = "memory"
 
     @classmethod
-    def execute(cls, id: int) -> str:
-        if not os.path.exists(MEMORY_PATH):
-            return f"No memory DB at {MEMORY_PATH}"
+    def execute(cls, id: Optional[int] = None, ids: Optional[str] = None, raw: bool = False,
+                offset: int = 0, length: int = 4000) -> str:
+        if not store.exists():
+            return f"No memory DB at {store.DB_PATH}"
+        if ids:
+            if raw:
+                return "Raw mode reads one memory: give id, not ids."
+            return _bulk(ids)
+        if id is None:
+            return "Error: give id or ids."
         try:
-            data = json.load(open(MEMORY_PATH, "r", encoding="utf-8"))
+            it = store.get(id)
         except Exception:
             return "Could not read memory DB."
-        for it in data:
-            if it.get("id") == id:
-                return f"[Memory #{id}: {it.get('title')}] {it.get('summary')}"
-        return f"Memory #{id} not found."
+        if not it:
+            return f"Memory #{id} not found."
+        try:
+            store.touch([it])  # last access, for LRU retention
+        except Exception:
+            pass
+        if not raw:
+            return f"[Memory #{id}: {it.get('title')}] {it.get('summary')}"
+        if not blobs.exists(it.get("blob")):
+            return f"Memory #{id} has no raw text stored."
+        try:
+            data, total = blobs.read(it["blob"], offset, length)
+        except Exception as e:
+            return f"Could not read raw text of memory #{id}: {e}"
+        start = min(offset, total)
+        end = start + len(data)
+        head = f"[Memory #{id}: {it.get('title')}] raw bytes {start}-{end} of {total}"
+        more = f"\n… more: offset={end}" if end < total else ""
+        return f"{head}\n{data.decode('utf-8', errors='replace')}{more}"
+
+
+def _bulk(spec: str) -> str:
+    try:
+        ids, ranges = _parse_ids(spec)
+    except ValueError:
+        return f"Invalid ids: {spec!r} (expected e.g. \"3,7,10-20\")."
+    try:
+        items = store.get_many(ids, ranges, MAX_BULK)
+    except Exception:
+        return "Could not read memory DB."
+    try:
+        store.touch(items)
+    except Exception:
+        pass
+    t = trace.clock()
+    out = [f"[Memory #{it['id']}: {it.get('title')}] {it.get('summary')}" for it in items]
+    got = {it["id"] for it in items}
+    missing = [i for i in sorted(set(ids)) if i not in got]
+    if len(items) >= MAX_BULK:
+        out.append(f"(stopped at {MAX_BULK} entries; ask for the rest separately)")
+    elif missing:
+        out.append("Not found: " + ", ".join(f"#{i}" for i in missing))
+    trace.mark("serialize", t, rows=len(items))
+    return "\n\n".join(out) if out else "No memories found for those ids."
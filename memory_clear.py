@@ -1,13 +1,15 @@
 # ~/.config/shell_gpt/functions/memory_clear.py
-import json, os
+import os, sys
 from typing import List, Optional, Literal
 from pydantic import Field
 from instructor import OpenAISchema
 
-MEMORY_PATH = os.path.expanduser(
-    os.environ.get("SGPT_MEMORY_FILE", "~/.config/shell_gpt/memory.json")
-)
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import store, trace
 
+@trace.instrument
 class Function(OpenAISchema):
     """
     Clear memories. Delete specific IDs or wipe everything.
@@ -31,27 +33,22 @@ class Function(OpenAISchema):
         if confirm != "YES":
             return "Refused: confirmation is required."
 
-        if not os.path.exists(MEMORY_PATH):
+        if not store.exists():
             return "Nothing to delete: memory DB not found."
 
+        def apply(db) -> str:
+            if not store.count(db):
+                return "Nothing to delete: memory DB is empty."
+
+            if ids:
+                deleted = store.delete(ids, db)
+                return f"Deleted {deleted} entrie(s) by ID."
+            else:
+                # wipe all
+                store.clear(db)
+                return "All memories deleted."
+
         try:
-            data = json.load(open(MEMORY_PATH, "r", encoding="utf-8"))
-            if not isinstance(data, list):
-                data = []
+            return store.write(apply)
         except Exception:
-            data = []
-
-        if not data:
-            return "Nothing to delete: memory DB is empty."
-
-        if ids:
-            ids_set = set(int(x) for x in ids)
-            before = len(data)
-            data = [e for e in data if int(e.get("id", -1)) not in ids_set]
-            deleted = before - len(data)
-            json.dump(data, open(MEMORY_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
-            return f"Deleted {deleted} entrie(s) by ID."
-        else:
-            # wipe all
-            json.dump([], open(MEMORY_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
-            return "All memories deleted."
+            return "Could not update memory DB."
@@ -0,0 +1,61 @@
+# ~/.config/shell_gpt/functions/memory_compact.py
+import os, sys
+from typing import Optional
+from pydantic import Field
+from instructor import OpenAISchema
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import retention, store, trace
+
+@trace.instrument
+class Function(OpenAISchema):
+    """
+    Compact the memory store: apply the retention policy, delete raw text
+    no memory refers to any more, and rewrite the database file. Reports
+    the space reclaimed. Safe to run while other sessions use the store.
+
+    Limits default to SGPT_MEMORY_MAX_ENTRIES / SGPT_MEMORY_MAX_BYTES /
+    SGPT_MEMORY_TTL_DAYS; pass a value to override it for this run (0 = off).
+    Pinned memories are never removed.
+    """
+    max_entries: Optional[int] = Field(None, ge=0, description="Keep at most this many entries (LRU evicted first).")
+    max_bytes: Optional[int] = Field(None, ge=0, description="Keep at most this many bytes of entries (LRU evicted first).")
+    ttl_days: Optional[float] = Field(None, ge=0, description="Remove entries created more than this many days ago.")
+
+    class Config:
+        title = "memory_compact"
+
+    @classmethod
+    def execute(
+        cls,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_days: Optional[float] = None,
+    ) -> str:
+        if not store.exists():
+            return "Nothing to compact: memory DB not found."
+        p = retention.POLICY
+        policy = retention.Policy(
+            p.max_entries if max_entries is None else max_entries,
+            p.max_bytes if max_bytes is None else max_bytes,
+            p.ttl_days if ttl_days is None else ttl_days,
+        )
+        try:
+            r = retention.compact(policy)
+        except Exception as e:
+            return f"Could not compact memory DB: {e}"
+        removed = r["removed"]
+        n = sum(removed.values())
+        reasons = ", ".join(f"{v} by {k}" for k, v in removed.items() if v)
+        lines = [
+            f"Compacted memory store: {r['before']} -> {r['after']} bytes "
+            f"(reclaimed {max(0, r['before'] - r['after'])} bytes).",
+            f"Retention removed {n} entrie(s)" + (f" ({reasons})" if reasons else "")
+            + f"; {r['entries']} left.",
+            f"Swept {r['blob_files']} unreferenced raw blob(s), {r['blob_bytes']} bytes.",
+        ]
+        if not policy.active:
+            lines.append("No retention limits set (SGPT_MEMORY_MAX_ENTRIES, SGPT_MEMORY_MAX_BYTES, SGPT_MEMORY_TTL_DAYS).")
+        return "\n".join(lines)
@@ -1,16 +1,18 @@
 # ~/.config/shell_gpt/functions/memory_edit.py
-import json, os
+import os, sys
 from typing import Optional, Literal
 from pydantic import Field
 from instructor import OpenAISchema
 
-MEMORY_PATH = os.path.expanduser(
-    os.environ.get("SGPT_MEMORY_FILE", "~/.config/shell_gpt/memory.json")
-)
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import store, trace
 
+@trace.instrument
 class Function(OpenAISchema):
     """
-    Edit a memory's title and/or summary.
+    Edit a memory's title and/or summary, or pin it so retention never removes it.
 
     - summary_mode: how to apply the provided summary text:
         * 'replace'  -> overwrite
@@ -24,6 +26,7 @@ class Function(OpenAISchema):
     summary_mode: Literal["replace", "append", "prepend"] = Field(
         "replace", description="How to apply the new summary text."
     )
+    pinned: Optional[bool] = Field(None, description="Pin (true) or unpin (false). Leave unset to keep.")
 
     class Config:
         title = "memory_edit"
@@ -35,46 +38,40 @@ class Function(OpenAISchema):
         title: Optional[str] = None,
         summary: Optional[str] = None,
         summary_mode: str = "replace",
+        pinned: Optional[bool] = None,
     ) -> str:
-        if not os.path.exists(MEMORY_PATH):
+        if not store.exists():
             return "Memory DB not found."
+        if summary_mode not in ("replace", "append", "prepend"):
+            return f"Invalid summary_mode: {summary_mode}"
+        if title is None and summary is None and pinned is None:
+            return "No changes provided."
 
-        try:
-            data = json.load(open(MEMORY_PATH, "r", encoding="utf-8"))
-            if not isinstance(data, list):
-                return "Corrupt memory DB."
-        except Exception:
-            return "Could not read memory DB."
-
-        target = None
-        for e in data:
-            if int(e.get("id", -1)) == int(id):
-                target = e
-                break
-
-        if not target:
-            return f"Memory #{id} not found."
-
-        changed = False
+        def apply(db) -> str:
+            target = store.get(id, db)
+            if not target:
+                return f"Memory #{id} not found."
 
-        if title is not None:
-            target["title"] = title
-            changed = True
+            changes = {}
+            if title is not None:
+                changes["title"] = title
+            if pinned is not None:
+                changes["pinned"] = int(pinned)
 
-        if summary is not None:
-            existing = target.get("summary", "")
-            if summary_mode == "replace":
-                target["summary"] = summary
-            elif summary_mode == "append":
-                target["summary"] = (existing + ("\n" if existing and not existing.endswith("\n") else "") + summary).rstrip()
-            elif summary_mode == "prepend":
-                target["summary"] = (summary + ("\n" if summary and not summary.endswith("\n") else "") + existing).rstrip()
-            else:
-                return f"Invalid summary_mode: {summary_mode}"
-            changed = True
+            if summary is not None:
+                existing = target.get("summary", "")
+                if summary_mode == "replace":
+                    changes["summary"] = summary
+                elif summary_mode == "append":
+                    changes["summary"] = (existing + ("\n" if existing and not existing.endswith("\n") else "") + summary).rstrip()
+                else:
+                    changes["summary"] = (summary + ("\n" if summary and not summary.endswith("\n") else "") + existing).rstrip()
 
-        if not changed:
-            return "No changes provided."
+            store.update(id, db, **changes)
+            return f"Updated memory #{id}."
 
-        json.dump(data, open(MEMORY_PATH, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
-        return f"Updated memory #{id}."
+        try:
+            # Read-modify-write in one transaction, so concurrent edits are not lost.
+            return store.write(apply)
+        except Exception:
+            return "Could not update memory DB."
@@ -1,38 +1,89 @@
 # ~/.config/shell_gpt/functions/memory_list.py
-import json, os
-from typing import Optional
+import os, sys
+from typing import List, Literal, Optional
 from pydantic import Field
 from instructor import OpenAISchema
 
-MEMORY_PATH = os.path.expanduser(
-    os.environ.get("SGPT_MEMORY_FILE", "~/.config/shell_gpt/memory.json")
-)
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import store, trace
 
+_FIELD = Literal["id", "created", "title", "summary", "raw_len", "accessed", "pinned"]
+
+@trace.instrument
 class Function(OpenAISchema):
     """
-    List recent memories. Optional substring filter on title/summary.
+    List recent memories, or search them by title/summary.
+
+    With a query, results are ranked by relevance (BM25), words match as
+    prefixes, and each hit shows a snippet with matches in [brackets].
+
+    Without a query, memories are listed newest first. Either way results
+    come one page at a time: pass the returned next_cursor to get the
+    following page. since/until and title narrow both.
     """
-    query: Optional[str] = Field(None, description="Substring to filter title/summary.")
-    limit: int = Field(20, ge=1, le=200, description="Max entries to return.")
+    query: Optional[str] = Field(None, description="Search words for title/summary (prefix match, ranked).")
+    limit: int = Field(20, ge=1, le=200, description="Max entries to return (per page).")
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page.")
+    since: Optional[str] = Field(None, example="2025-01-31", description="Only memories created at or after this date/time (UTC, ISO).")
+    until: Optional[str] = Field(None, example="2025-02-01T12:00", description="Only memories created before this date/time (UTC, ISO).")
+    title: Optional[str] = Field(None, description="Only memories whose title contains this text.")
+    fields: Optional[List[_FIELD]] = Field(None, description="Fields to show (default: id, created, title).")
 
     class Config:
         title = "list_memories"
 
     @classmethod
-    def execute(cls, query: Optional[str] = None, limit: int = 20) -> str:
-        if not os.path.exists(MEMORY_PATH):
+    def execute(
+        cls,
+        query: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        title: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> str:
+        if not store.exists():
             return "No memories."
+        next_cursor = None
         try:
-            items = json.load(open(MEMORY_PATH, "r", encoding="utf-8"))
+            if query:
+                items, next_cursor = store.search(query, limit, cursor, since, until, title)
+            else:
+                items, next_cursor = store.page(limit, cursor, since, until, title)
+        except ValueError:
+            return f"Invalid cursor: {cursor!r}"
         except Exception:
             return "Could not read memory DB."
-        items = sorted(items, key=lambda x: x.get("id", 0), reverse=True)
+        t = trace.clock()
         out = []
-        q = (query or "").lower()
         for it in items:
-            line = f"#{it['id']}  {it['created']}  {it['title']}"
-            if not q or q in it.get("title","").lower() or q in it.get("summary","").lower():
-                out.append(line)
-            if len(out) >= limit:
-                break
+            out.append(_format(it, fields))
+            if it.get("snippet"):
+                out.append("    " + " ".join(it["snippet"].split()))
+        if next_cursor:
+            out.append(f"next_cursor: {next_cursor}")
+        trace.mark("serialize", t, rows=len(items))
         return "\n".join(out) if out else "No matches."
+
+
+def _format(it: dict, fields: Optional[List[str]]) -> str:
+    if not fields:
+        return f"#{it['id']}  {it['created']}  {it['title']}" + ("  [pinned]" if it.get("pinned") else "")
+    head, body = [], []
+    for f in fields:
+        if f == "id":
+            head.append(f"#{it['id']}")
+        elif f == "summary":
+            body.append("    " + (it.get("summary") or "").replace("\n", "\n    "))
+        elif f == "pinned":
+            head.append("[pinned]" if it.get("pinned") else "[not pinned]")
+        elif f == "raw_len":
+            head.append(f"{it.get('raw_len') or 0} chars")
+        elif f == "accessed":
+            head.append(f"accessed {it.get('accessed') or 'never'}")
+        else:
+            head.append(str(it.get(f) or ""))
+    return "\n".join(["  ".join(head), *body])
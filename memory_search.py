@@ -0,0 +1,37 @@
+# ~/.config/shell_gpt/functions/memory_search.py
+import os, sys
+from pydantic import Field
+from instructor import OpenAISchema
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import store, trace, vectors
+
+@trace.instrument
+class Function(OpenAISchema):
+    """
+    Find the memories most similar to a query (local vector similarity, no network).
+    Use this when exact words may differ; use list_memories for keyword search.
+    """
+    query: str = Field(..., description="What to look for, in natural language.")
+    k: int = Field(5, ge=1, le=50, description="Number of memories to return.")
+
+    class Config:
+        title = "memory_search"
+
+    @classmethod
+    def execute(cls, query: str, k: int = 5) -> str:
+        if not vectors.available():
+            return "memory_search needs NumPy (pip install numpy)."
+        if not store.exists():
+            return "No memories."
+        try:
+            items = store.similar(query, k)
+        except Exception:
+            return "Could not read memory DB."
+        out = []
+        for it in items:
+            first = next((ln for ln in it["summary"].splitlines() if ln.strip()), "")
+            out.append(f"#{it['id']}  {it['score']:.3f}  {it['title']}\n    {first[:160]}")
+        return "\n".join(out) if out else "No matches."
@@ -1,39 +1,25 @@
 # ~/.config/shell_gpt/functions/remember.py
-import json, os, shlex, subprocess
-from datetime import datetime
-from typing import Optional, Literal
-from pydantic import Field
+import os, sys
+from typing import List, Optional, Literal
+from pydantic import BaseModel, Field
 from instructor import OpenAISchema
 
-MEMORY_PATH = os.path.expanduser(
-    os.environ.get("SGPT_MEMORY_FILE", "~/.config/shell_gpt/memory.json")
-)
-
-def _load() -> list:
-    if os.path.exists(MEMORY_PATH):
-        try:
-            with open(MEMORY_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-        except Exception:
-            return []
-    return []
-
-def _save(items: list) -> None:
-    os.makedirs(os.path.dirname(MEMORY_PATH), exist_ok=True)
-    tmp = MEMORY_PATH + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, MEMORY_PATH)
-
-def _summarise(text: str, max_lines: int = 24) -> str:
-    lines = [ln.rstrip() for ln in text.strip().splitlines()]
-    if len(lines) <= max_lines:
-        return "\n".join(lines)
-    head = lines[: int(max_lines * 0.6)]
-    tail = lines[- int(max_lines * 0.4) :]
-    return "\n".join(head + ["…", *tail])
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import batch, blobs, capture, defaults, logsum, retention, store, trace
 
+MAX_ITEMS = 32
+_KILL_SLACK_SEC = 5  # a timed-out command is killed, then has this long to report
+
+
+class Item(BaseModel):
+    mode: Literal["command", "file", "text"] = Field(..., description="What to remember.")
+    content: str = Field(..., description="Shell command, file path, or note text.")
+    title: Optional[str] = Field(None, description="Optional short title for the memory entry.")
+
+
+@trace.instrument
 class Function(OpenAISchema):
     """
     Remember important information by summarising one of:
@@ -42,60 +28,150 @@ class Function(OpenAISchema):
     - a free-text note (mode="text").
 
     The summary is stored with an auto-incremented ID for later retrieval.
+    Long output is condensed: repeated lines are collapsed with counts and
+    error/warning lines are always kept, within max_chars.
+    The full raw text is kept too (compressed, deduplicated) and can be paged
+    through with memory(id, raw=true).
+
+    To snapshot several things at once, pass items instead: they run in
+    parallel and are saved together under consecutive IDs.
     """
 
-    mode: Literal["command", "file", "text"] = Field(..., description="What to remember.")
-    content: str = Field(
-        ...,
+    mode: Optional[Literal["command", "file", "text"]] = Field(None, description="What to remember.")
+    content: Optional[str] = Field(
+        None,
         example="du -sh /var/log",
         description="Shell command (mode=command), file path (mode=file), or note text (mode=text).",
     )
     title: Optional[str] = Field(None, description="Optional short title for the memory entry.")
+    items: Optional[List[Item]] = Field(
+        None, description=f"Several things to remember in one call (up to {MAX_ITEMS})."
+    )
+    timeout: float = Field(60, ge=1, le=600, description="Batch mode: seconds allowed per item.")
+    max_chars: int = Field(defaults.SUMMARY_CHARS, ge=200, le=50000, description="Size budget of each summary, in characters.")
 
     class Config:
         title = "remember"
 
     @classmethod
-    def execute(cls, mode: str, content: str, title: Optional[str] = None) -> str:
-        raw = ""
+    def execute(
+        cls,
+        mode: Optional[str] = None,
+        content: Optional[str] = None,
+        title: Optional[str] = None,
+        items: Optional[List] = None,
+        timeout: float = 60,
+        max_chars: int = defaults.SUMMARY_CHARS,
+    ) -> str:
+        if items:
+            items = [i if isinstance(i, dict) else dict(i) for i in items][:MAX_ITEMS]
+            return _batch(items, timeout, max_chars)
+        if mode is None or content is None:
+            return "Error: give mode and content, or items."
+        if mode not in ("command", "file", "text"):
+            return f"Unsupported mode: {mode}"
+        m = _capture(mode, content, title, max_chars=max_chars)
+
+        def save(db):
+            entry = store.insert(m["title"], m["summary"], m["raw_len"], db, m["blob"])
+            # Retention runs in the same transaction and never evicts the new entry.
+            removed = retention.enforce(db, keep=[entry["id"]]) if retention.POLICY.active else {}
+            return entry, sum(removed.values())
+
+        entry, evicted = store.write(save)
+        note = f"\n(retention removed {evicted} older entrie(s))" if evicted else ""
+        return f"Saved memory #{entry['id']} — {entry['title']}{_kept(m)}\n{entry['summary']}{note}"
+
+
+def _capture(mode: str, content: str, title: Optional[str] = None, timeout: Optional[float] = None,
+             persistent: bool = defaults.SHELL_PERSISTENT, max_chars: int = defaults.SUMMARY_CHARS) -> dict:
+    """Summarise one item; returns the fields of its memory plus the kept raw size."""
+    # Output and files are streamed through a bounded summariser, never held whole;
+    # the raw text streams into the blob store alongside.
+    make = (lambda: logsum.LogSummary(max_chars)) if logsum.ENABLED else None
+    raw = blobs.writer()
+    try:
         if mode == "command":
-            try:
-                if any(ch in content for ch in ["|", ";", "&", "$(", "`", "*", ">","<"]):
-                    p = subprocess.run(["bash", "-lc", content], capture_output=True, text=True)
-                else:
-                    p = subprocess.run(shlex.split(content), capture_output=True, text=True)
-                raw = f"$ {content}\n# exit: {p.returncode}\n\n{p.stdout}\n{p.stderr}"
-            except Exception as e:
-                raw = f"$ {content}\n# error: {e}"
+            summary, raw_len = capture.command(content, raw=raw, timeout=timeout,
+                                               persistent=persistent, make=make)
             default_title = f"Command: {content}"
 
         elif mode == "file":
             path = os.path.expanduser(content)
-            try:
-                with open(path, "r", encoding="utf-8", errors="replace") as f:
-                    text = f.read()
-                raw = f"# file: {path}\n\n{text}"
-            except Exception as e:
-                raw = f"# file: {path}\n# error: {e}"
+            summary, raw_len = capture.file(path, raw=raw, make=make)
             default_title = f"File: {os.path.basename(path)}"
 
-        elif mode == "text":
-            raw = content
+        else:
+            if make is not None:
+                s = make()
+                s.feed_text(content)
+                summary = s.text()
+            else:
+                summary = capture.summarise(content)
+            raw_len = len(content)
+            if raw is not None:
+                raw.write(content.encode("utf-8"))
             default_title = "Note"
+        blob = raw.close() if raw is not None else None
+    finally:
+        if raw is not None:
+            raw.abort()  # no-op once closed
+    return {"title": title or default_title, "summary": summary, "raw_len": raw_len,
+            "blob": blob, "raw_size": raw.size if blob else 0}
+
 
+def _kept(m: dict) -> str:
+    return f" (raw text kept, {m['raw_size']} bytes)" if m["blob"] else ""
+
+
+def _batch(items: List[dict], timeout: float, max_chars: int) -> str:
+    """Capture every item concurrently, then insert all results in one transaction."""
+    jobs, errors = [], {}
+    for n, it in enumerate(items):
+        mode, content = it.get("mode"), it.get("content")
+        if mode not in ("command", "file", "text") or not content:
+            errors[n] = f"unsupported item (mode={mode!r})"
+            jobs.append(None)
+            continue
+        # The persistent shell runs one command at a time, so batches use fresh processes.
+        jobs.append(lambda mode=mode, content=content, title=it.get("title"):
+                    _capture(mode, content, title, timeout, persistent=False, max_chars=max_chars))
+    runnable = [j for j in jobs if j is not None]
+    results = iter(batch.run_jobs(runnable, timeout + _KILL_SLACK_SEC, capture.WORKERS))
+    captured = {}
+    for n, job in enumerate(jobs):
+        if job is None:
+            continue
+        ok, r = next(results)
+        if ok:
+            captured[n] = r
         else:
-            return f"Unsupported mode: {mode}"
+            errors[n] = "timed out" if isinstance(r, batch.Timeout) else f"{type(r).__name__}: {r}"
 
-        summary = _summarise(raw)
-        items = _load()
-        new_id = max([it.get("id", 0) for it in items], default=0) + 1
-        entry = {
-            "id": new_id,
-            "created": datetime.utcnow().isoformat() + "Z",
-            "title": title or default_title,
-            "summary": summary,
-            "raw_len": len(raw),
-        }
-        items.append(entry)
-        _save(items)
-        return f"Saved memory #{new_id} — {entry['title']}\n{entry['summary']}"
+    def save(db):
+        entries = {n: store.insert(m["title"], m["summary"], m["raw_len"], db, m["blob"])
+                   for n, m in sorted(captured.items())}
+        keep = [e["id"] for e in entries.values()]
+        removed = retention.enforce(db, keep=keep) if retention.POLICY.active and keep else {}
+        return entries, sum(removed.values())
+
+    try:
+        entries, evicted = store.write(save) if captured else ({}, 0)
+    except Exception as e:
+        return f"Could not save memories: {e}"
+    ids = [e["id"] for e in entries.values()]
+    if ids:
+        span = f"#{ids[0]}" if len(ids) == 1 else f"#{ids[0]}-#{ids[-1]}"
+        head = f"Saved {len(ids)}/{len(items)} memories ({span})"
+    else:
+        head = f"Saved 0/{len(items)} memories"
+    parts = [head + (f", {len(errors)} failed" if errors else "") + "."]
+    for n, it in enumerate(items):
+        if n in entries:
+            e = entries[n]
+            parts.append(f"=== #{e['id']} — {e['title']}{_kept(captured[n])} ===\n{e['summary']}")
+        else:
+            parts.append(f"=== item {n + 1} ({it.get('content')!r}) not saved: {errors[n]} ===")
+    if evicted:
+        parts.append(f"(retention removed {evicted} older entrie(s))")
+    return "\n\n".join(parts)
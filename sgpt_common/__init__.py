@@ -0,0 +1,57 @@
+# ~/.config/shell_gpt/functions/sgpt_common/__init__.py
+"""
+Shared helpers for the Shell GPT function modules.
+
+sgpt only loads the top-level ``*.py`` files of the functions folder, so this
+package sits next to them as a plain directory and each function module puts
+its own folder on ``sys.path`` before importing it.
+
+sgpt imports every function module on every turn, but a turn calls at most
+a few of them. So ``from sgpt_common import store`` hands out a stand-in
+that imports the submodule (and sqlite3, html.parser, ... behind it) on
+first attribute access, normally inside ``execute``.
+"""
+import importlib, os, threading
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_lazy = {}
+_lazy_lock = threading.Lock()
+
+
+class _Lazy:
+    """Stand-in for a submodule; the first attribute access imports it."""
+
+    __slots__ = ("_name", "_mod")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_mod", None)
+
+    def _load(self):
+        mod = self._mod
+        if mod is None:
+            mod = importlib.import_module(self._name)  # the import lock makes this thread-safe
+            object.__setattr__(self, "_mod", mod)
+        return mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def __getattr__(name: str):
+    # Only reached while the submodule is not imported yet (importing sets the attribute).
+    if name.startswith("_") or not os.path.exists(os.path.join(_HERE, name + ".py")):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in _lazy:
+            _lazy[name] = _Lazy(f"{__name__}.{name}")
+        return _lazy[name]
@@ -0,0 +1,114 @@
+# ~/.config/shell_gpt/functions/sgpt_common/batch.py
+"""
+Concurrent job runner, used by the ``urls`` mode of the web_* functions
+and by ``remember``'s ``items``.
+
+Jobs are dispatched in input order to at most ``concurrency`` worker
+threads, optionally with at most ``per_key`` in flight per key (the host,
+for URLs). Each job has its own wall-clock deadline, counted from when it
+starts. A job that misses the deadline is reported as timed out and its
+slot is released. Its thread finishes in the background, bounded by the
+job's own timeouts. One job failing does not affect the others. Results
+come back in input order.
+"""
+import os, threading, time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import defaults
+
+CONCURRENCY = int(os.environ.get("SGPT_WEB_BATCH_CONCURRENCY", "8"))
+PER_HOST = int(os.environ.get("SGPT_WEB_BATCH_PER_HOST", "4"))
+MAX_URLS = defaults.WEB_BATCH_MAX_URLS
+
+
+def _host(url: str) -> str:
+    """host:port, the unit the per-host limit applies to."""
+    try:
+        u = urlsplit(url)
+        return f"{(u.hostname or '').lower()}:{u.port or ''}"
+    except ValueError:
+        return ""
+
+
+class Timeout(Exception):
+    """A job that was given up on because it missed its deadline."""
+
+
+def run_jobs(jobs: List[Callable[[], object]], timeout: float, concurrency: int = CONCURRENCY,
+             keys: Optional[List[str]] = None, per_key: int = 0) -> List[Tuple[bool, object]]:
+    """
+    Run ``jobs`` concurrently. ``keys`` (one per job) and ``per_key`` cap
+    how many jobs with the same key run at once. Returns (ok,
+    result-or-exception) per job, in order; a missed deadline is (False, Timeout).
+    """
+    results: List[Optional[Tuple[bool, object]]] = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    running: Dict[int, Tuple[str, float]] = {}  # index -> (key, deadline)
+    active: Dict[str, int] = {}
+    cond = threading.Condition()
+
+    def work(i: int) -> None:
+        try:
+            r = (True, jobs[i]())
+        except Exception as e:
+            r = (False, e)
+        with cond:
+            if i in running:  # not already given up on
+                key, _ = running.pop(i)
+                active[key] -= 1
+                results[i] = r
+                cond.notify()
+
+    with cond:
+        while pending or running:
+            now = time.monotonic()
+            for i, (key, deadline) in list(running.items()):
+                if now >= deadline:
+                    del running[i]
+                    active[key] -= 1
+                    results[i] = (False, Timeout(f"no complete result within {timeout:g}s"))
+            for i in list(pending):
+                if len(running) >= concurrency:
+                    break
+                key = keys[i] if keys is not None else ""
+                if per_key and active.get(key, 0) >= per_key:
+                    continue
+                pending.remove(i)
+                active[key] = active.get(key, 0) + 1
+                running[i] = (key, now + timeout)
+                threading.Thread(target=work, args=(i,), daemon=True).start()
+            if running:
+                cond.wait(max(0.0, min(d for _, d in running.values()) - time.monotonic()))
+    return results  # type: ignore[return-value]
+
+
+def run(urls: List[str], fetch: Callable[[str], str], timeout: float,
+        concurrency: int = CONCURRENCY, per_host: int = PER_HOST) -> List[str]:
+    """``fetch`` each URL concurrently; returns one result string per URL, in order."""
+    jobs = [lambda url=url: fetch(url) for url in urls]
+    out = []
+    for ok, r in run_jobs(jobs, timeout, concurrency, [_host(u) for u in urls], per_host):
+        if ok:
+            out.append(r)
+        elif isinstance(r, Timeout):
+            out.append(f"Timeout: {r}")
+        else:
+            out.append(f"Error: {r}")
+    return out
+
+
+def _failed(result: str) -> bool:
+    return result.startswith(("HTTPError", "URLError", "Error:", "Timeout:"))
+
+
+def report(urls: List[str], fetch: Callable[[str], str], timeout: float) -> str:
+    """Run a batch and format it as one section per URL plus a failure count."""
+    urls = list(urls)[:MAX_URLS]
+    results = run(urls, fetch, timeout)
+    failed = sum(map(_failed, results))
+    head = f"Fetched {len(urls) - failed}/{len(urls)} URLs" + (f" ({failed} failed)" if failed else "")
+    parts = [head]
+    for i, (url, r) in enumerate(zip(urls, results), 1):
+        parts.append(f"=== [{i}] {url}{' (failed)' if _failed(r) else ''} ===\n{r}")
+    return "\n\n".join(parts)
@@ -0,0 +1,238 @@
+# ~/.config/shell_gpt/functions/sgpt_common/blobs.py
+"""
+Content-addressed store for the raw text behind memories.
+
+Each blob is named by the SHA-256 of its raw bytes, so identical command
+outputs or files are stored once. Blobs are written in independently
+compressed 256 KiB chunks (zstd if the ``zstandard`` package is installed,
+zlib otherwise) followed by a chunk index, so ``read(sha, offset, length)``
+decompresses only the chunks it needs.
+
+Layout: ``SGB1`` + codec (1 byte) + chunk size (u32), the chunks, then the
+index (raw size u64, chunk count u32, chunk end offsets u64...) and a
+footer (index offset u64 + ``SGB1``).
+"""
+import hashlib, os, struct, tempfile, time, zlib
+from typing import List, Optional, Tuple
+
+from . import store
+
+ENABLED = os.environ.get("SGPT_MEMORY_BLOBS", "1").lower() not in ("0", "false", "no", "off")
+DIR = os.path.expanduser(
+    os.environ.get("SGPT_MEMORY_BLOB_DIR", os.path.splitext(store.DB_PATH)[0] + ".blobs")
+)
+# Unreferenced blobs younger than this are left alone by sweep(): their
+# memory row may not be committed yet.
+SWEEP_GRACE_SEC = 600
+# Raw text larger than this is summarised as usual but not kept.
+MAX_BYTES = int(os.environ.get("SGPT_MEMORY_BLOB_MAX_BYTES", str(64 * 1024 * 1024)))
+CHUNK = 256 * 1024
+_MAGIC = b"SGB1"
+_HEAD = struct.Struct("<4scI")
+_FOOT = struct.Struct("<Q4s")
+
+zstandard = None  # imported by _zstd() on first use
+_zstd_missing = False
+
+
+def _zstd():
+    global zstandard, _zstd_missing
+    if zstandard is None and not _zstd_missing:
+        try:
+            import zstandard as zstd
+            zstandard = zstd
+        except ImportError:  # optional dependency
+            _zstd_missing = True
+    return zstandard
+
+
+def _codec() -> bytes:
+    return b"s" if _zstd() is not None else b"z"
+
+
+def _compress(codec: bytes, data: bytes) -> bytes:
+    if codec == b"s":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(codec: bytes, data: bytes) -> bytes:
+    if codec == b"s":
+        if _zstd() is None:
+            raise RuntimeError("blob was written with zstd; install the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def path(sha: str) -> str:
+    return os.path.join(DIR, sha[:2], sha[2:])
+
+
+def exists(sha: Optional[str]) -> bool:
+    return bool(sha) and os.path.exists(path(sha))
+
+
+class Writer:
+    """
+    Streams raw bytes into a new blob (``write``), then ``close`` returns its
+    SHA-256, or None if nothing was written or the size cap was exceeded.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        os.makedirs(DIR, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=DIR, prefix=".tmp-")
+        self._fh = os.fdopen(fd, "wb")
+        self._codec = _codec()
+        self._fh.write(_HEAD.pack(_MAGIC, self._codec, CHUNK))
+        self._sha = hashlib.sha256()
+        self._buf = bytearray()
+        self._ends: List[int] = []
+        self.size = 0
+        self.max_bytes = max_bytes
+        self.overflow = False
+
+    def write(self, data: bytes) -> None:
+        if self.overflow or not data:
+            return
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.overflow = True
+            self._buf.clear()
+            return
+        self._sha.update(data)
+        self._buf += data
+        while len(self._buf) >= CHUNK:
+            self._flush(bytes(self._buf[:CHUNK]))
+            del self._buf[:CHUNK]
+
+    def _flush(self, raw: bytes) -> None:
+        self._fh.write(_compress(self._codec, raw))
+        self._ends.append(self._fh.tell())
+
+    def abort(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+            try:
+                os.remove(self._tmp)
+            except OSError:
+                pass
+
+    def close(self) -> Optional[str]:
+        if self._fh is None:
+            return None
+        if self.overflow or not self.size:
+            self.abort()
+            return None
+        if self._buf:
+            self._flush(bytes(self._buf))
+        sha = self._sha.hexdigest()
+        dest = path(sha)
+        if os.path.exists(dest):  # same content already stored
+            self.abort()
+            try:
+                os.utime(dest)  # fresh mtime: sweep() leaves it alone until the row is committed
+            except OSError:
+                pass
+            return sha
+        index = self._fh.tell()
+        self._fh.write(struct.pack(f"<QI{len(self._ends)}Q", self.size, len(self._ends), *self._ends))
+        self._fh.write(_FOOT.pack(index, _MAGIC))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())  # durable before a memory row points at it
+        self._fh.close()
+        self._fh = None
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(self._tmp, dest)
+        return sha
+
+
+def writer() -> Optional[Writer]:
+    """A new Writer, or None when the blob store is disabled or not writable."""
+    if not ENABLED:
+        return None
+    try:
+        return Writer()
+    except OSError:
+        return None
+
+
+def put(data: bytes) -> Optional[str]:
+    w = Writer()
+    w.write(data)
+    return w.close()
+
+
+def _index(fh) -> Tuple[bytes, int, int, List[int]]:
+    """(codec, chunk size, raw size, chunk end offsets)."""
+    magic, codec, chunk = _HEAD.unpack(fh.read(_HEAD.size))
+    fh.seek(-_FOOT.size, os.SEEK_END)
+    at, magic2 = _FOOT.unpack(fh.read(_FOOT.size))
+    if magic != _MAGIC or magic2 != _MAGIC:
+        raise ValueError("not a memory blob")
+    fh.seek(at)
+    size, n = struct.unpack("<QI", fh.read(12))
+    ends = list(struct.unpack(f"<{n}Q", fh.read(8 * n)))
+    return codec, chunk, size, ends
+
+
+def size(sha: str) -> int:
+    with open(path(sha), "rb") as fh:
+        return _index(fh)[2]
+
+
+def read(sha: str, offset: int = 0, length: int = 65536) -> Tuple[bytes, int]:
+    """
+    Raw bytes ``[offset, offset + length)`` of a blob and its total size.
+    Only the chunks overlapping the range are read and decompressed.
+    """
+    with open(path(sha), "rb") as fh:
+        codec, chunk, total, ends = _index(fh)
+        offset = max(0, min(offset, total))
+        stop = min(total, offset + max(0, length))
+        out = bytearray()
+        for i in range(offset // chunk, (stop + chunk - 1) // chunk):
+            start = ends[i - 1] if i else _HEAD.size
+            fh.seek(start)
+            raw = _decompress(codec, fh.read(ends[i] - start))
+            lo = max(offset - i * chunk, 0)
+            out += raw[lo : stop - i * chunk]
+        return bytes(out), total
+
+
+def sweep(referenced: set, grace: float = SWEEP_GRACE_SEC) -> Tuple[int, int]:
+    """
+    Delete blobs (and stale temp files) not in ``referenced``, skipping any
+    modified in the last ``grace`` seconds. Returns (files, bytes) removed.
+    """
+    files = freed = 0
+    cutoff = time.time() - grace
+    if not os.path.isdir(DIR):
+        return 0, 0
+    for root, _, names in os.walk(DIR):
+        for name in names:
+            p = os.path.join(root, name)
+            sha = os.path.basename(root) + name
+            if not name.startswith(".tmp-") and sha in referenced:
+                continue
+            try:
+                st = os.stat(p)
+                if st.st_mtime > cutoff:
+                    continue
+                os.remove(p)
+            except OSError:
+                continue
+            files += 1
+            freed += st.st_size
+    return files, freed
+
+
+def disk_usage() -> int:
+    total = 0
+    for root, _, names in os.walk(DIR):
+        for name in names:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,349 @@
+# ~/.config/shell_gpt/functions/sgpt_common/capture.py
+"""
+Bounded-memory capture for ``remember``.
+
+Command output and file contents are streamed line by line into a
+summariser, so peak memory does not depend on how much a command prints or
+how large a file is. ``HeadTail`` keeps the first and last lines;
+``logsum.LogSummary`` collapses repeats and keeps errors and warnings from
+anywhere (callers pick one with ``make``). With ``HeadTail``, large regular
+files are not streamed at all: only their head and tail are read, via seek.
+
+Each function also takes an optional ``raw`` sink (anything with
+``write(bytes)``, normally a ``blobs.Writer``) that receives the full raw
+text as it streams past, so it can be kept without being held in memory.
+"""
+import codecs, os, shlex, subprocess, tempfile, threading
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from . import proc, trace
+
+MAX_LINE_CHARS = 4096          # longer lines are cut when kept in the summary
+_READ_LINE = 65536             # readline() cap, so one endless line cannot blow up memory
+_FILE_STREAM_MAX = 1 << 20     # regular files up to this size are streamed in full
+_SHELL_CHARS = ["|", ";", "&", "$(", "`", "*", ">", "<"]
+_COPY = 256 * 1024
+WORKERS = int(os.environ.get("SGPT_REMEMBER_WORKERS", "8"))  # items remember captures at once
+
+
+class HeadTail:
+    """
+    Streaming version of the old ``_summarise``: keeps the first 60% and the
+    last 40% of ``max_lines`` lines, strips blank lines at both ends, and
+    counts every line/char it is fed.
+    """
+
+    needs_middle = False  # files may be summarised from their two ends
+
+    def __init__(self, max_lines: int = 24):
+        self.max_lines = max_lines
+        self.head_n = int(max_lines * 0.6)
+        self.tail_n = int(max_lines * 0.4)
+        self.head: List[str] = []
+        self.tail: deque = deque(maxlen=max_lines - self.head_n)
+        self.lines = 0        # lines kept after blank-stripping
+        self.chars = 0        # every char fed, newlines included
+        self._blank = 0       # blank lines held back until something follows them
+
+    def feed(self, line: str) -> None:
+        self.chars += len(line) + 1
+        line = line.rstrip()
+        if not line:
+            if self.lines:
+                self._blank += 1
+            return
+        while self._blank:
+            self._blank -= 1
+            self._keep("")
+        self._keep(line[:MAX_LINE_CHARS])
+
+    def _keep(self, line: str) -> None:
+        self.lines += 1
+        if len(self.head) < self.head_n:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    def feed_lines(self, lines: List[str]) -> None:
+        """Same as ``feed`` for each line, but only touches the lines that can survive."""
+        if len(self.head) < self.head_n or len(lines) < 64:
+            for line in lines:
+                self.feed(line)
+            return
+        self.chars += sum(map(len, lines)) + len(lines)
+        j = len(lines) - 1
+        while j >= 0 and not lines[j].rstrip():
+            j -= 1
+        if j < 0:
+            self._blank += len(lines)
+            return
+        room = self.tail.maxlen
+        if j + 1 < room:
+            self.tail.extend([""] * min(self._blank, room - j - 1))
+        self.tail.extend(ln.rstrip()[:MAX_LINE_CHARS] for ln in lines[max(0, j + 1 - room) : j + 1])
+        self.lines += self._blank + j + 1
+        self._blank = len(lines) - 1 - j
+
+    def skip(self, n: int, chars: int = 0) -> None:
+        """Account for ``n`` lines that passed by without being looked at."""
+        if n <= 0:
+            return
+        self._blank = 0
+        self.lines += n
+        self.chars += chars
+        self.tail.clear()
+
+    def feed_text(self, text: str) -> None:
+        for line in text.split("\n"):
+            self.feed(line)
+        self.chars -= 1  # split() adds no trailing newline
+
+    def replace(self, i: int, line: str) -> None:
+        self.head[i] = line
+
+    def text(self) -> str:
+        if self.lines <= self.max_lines:
+            return "\n".join(self.head + list(self.tail))
+        tail = list(self.tail)[-self.tail_n:] if self.tail_n else []
+        return "\n".join(self.head + ["…", *tail])
+
+
+class _Ends:
+    """First and last ``n`` raw lines of a stream, plus totals."""
+
+    def __init__(self, n: int):
+        self.first: List[str] = []
+        self.last: deque = deque(maxlen=n)
+        self.n, self.lines, self.chars = n, 0, 0
+
+    def feed(self, line: str) -> None:
+        self.lines += 1
+        self.chars += len(line) + 1
+        if len(self.first) < self.n:
+            self.first.append(line[:MAX_LINE_CHARS])
+        else:
+            self.last.append(line[:MAX_LINE_CHARS])
+
+    def feed_lines(self, lines: List[str]) -> None:
+        if len(self.first) < self.n:
+            for line in lines:
+                self.feed(line)
+            return
+        self.lines += len(lines)
+        self.chars += sum(map(len, lines)) + len(lines)
+        self.last.extend(ln[:MAX_LINE_CHARS] for ln in lines[-self.n:])
+
+    def replay(self, into: HeadTail) -> None:
+        kept = self.first + list(self.last)
+        for line in self.first:
+            into.feed(line)
+        into.skip(self.lines - len(kept), self.chars - sum(len(x) + 1 for x in kept))
+        for line in self.last:
+            into.feed(line)
+
+
+def summarise(text: str, max_lines: int = 24) -> str:
+    s = HeadTail(max_lines)
+    s.feed_text(text)
+    return s.text()
+
+
+class _Splitter:
+    """Turns text pieces into whole lines for ``sink.feed_lines``; overlong lines are split."""
+
+    def __init__(self, sink):
+        self.sink, self.carry = sink, ""
+
+    def __call__(self, text: str) -> None:
+        lines = (self.carry + text).split("\n")
+        self.carry = lines.pop()
+        if len(self.carry) >= _READ_LINE:
+            lines.append(self.carry)
+            self.carry = ""
+        if lines:
+            self.sink.feed_lines(lines)
+
+    def close(self) -> bool:
+        """Flush; returns True if the input ended with a newline (or was empty)."""
+        if self.carry:
+            self.sink.feed_lines([self.carry])
+            self.carry = ""
+            return False
+        return True
+
+
+def _pump(stream, sink, raw=None) -> bool:
+    """Feed a text stream to ``sink`` in blocks; True if it ended with a newline."""
+    split = _Splitter(sink)
+    while True:
+        block = stream.read(_READ_LINE)
+        if not block:
+            return split.close()
+        if raw is not None:
+            raw.write(block.encode("utf-8"))
+        split(block)
+
+
+def _copy(src, raw) -> None:
+    """Copy a binary file object into ``raw`` until EOF or the sink overflows."""
+    while not getattr(raw, "overflow", False):
+        block = src.read(_COPY)
+        if not block:
+            return
+        raw.write(block)
+
+
+def command(content: str, max_lines: int = 24, raw=None, timeout: Optional[float] = None,
+            persistent: bool = proc.PERSISTENT, make: Optional[Callable] = None) -> Tuple[str, int]:
+    """
+    Run a command and summarise ``$ cmd / # exit: N / stdout / stderr``
+    without holding its output. Returns (summary, raw_len). ``raw`` gets
+    stdout followed by stderr. A command still running after ``timeout``
+    seconds is killed (with its children) and summarised as far as it got.
+    ``make`` builds the summariser (default ``HeadTail(max_lines)``).
+    """
+    make = make or (lambda: HeadTail(max_lines))
+    if persistent:
+        return _command_in_worker(content, make, raw, timeout)
+    try:
+        if any(ch in content for ch in _SHELL_CHARS):
+            argv = ["bash", "-lc", content]
+        else:
+            argv = shlex.split(content)
+        p = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             text=True, encoding="utf-8", errors="replace",
+                             start_new_session=timeout is not None)
+    except Exception as e:
+        s = make()
+        s.feed_text(f"$ {content}\n# error: {e}")
+        return s.text(), s.chars
+
+    s = make()
+    s.feed(f"$ {content}")
+    s.feed("# exit: ?")  # patched below once the exit code is known
+    s.feed("")
+    # stderr is printed after stdout, so only its ends (or its own summary)
+    # are kept until then, and its raw bytes are spooled, to disk if large.
+    err = make() if s.needs_middle else _Ends(max_lines)
+    spool = tempfile.SpooledTemporaryFile(_FILE_STREAM_MAX) if raw is not None else None
+    t = threading.Thread(target=_pump, args=(p.stderr, err, spool), daemon=True)
+    t.start()
+    timed_out = threading.Event()
+
+    def stop() -> None:
+        timed_out.set()
+        proc.kill_group(p)
+
+    timer = threading.Timer(timeout, stop) if timeout is not None else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    with trace.span("proc.run", persistent=False) as sp:
+        if _pump(p.stdout, s, raw):
+            s.feed("")
+        t.join()
+        rc = p.wait()
+        sp.set(exit=rc)
+    if timer is not None:
+        timer.cancel()
+    err.replay(s)
+    if timed_out.is_set():
+        s.feed(f"# stopped: timeout after {timeout:g}s")
+    if spool is not None:
+        with spool:
+            spool.seek(0)
+            _copy(spool, raw)
+    s.replace(1, f"# exit: {rc}")
+    return s.text(), s.chars
+
+
+def _command_in_worker(content: str, make: Callable, raw=None,
+                       timeout: Optional[float] = None) -> Tuple[str, int]:
+    # The warm shell merges stderr into stdout and enforces the execute_shell limits.
+    s = make()
+    s.feed(f"$ {content}")
+    s.feed("# exit: ?")
+    s.feed("")
+    dec = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    split = _Splitter(s)
+
+    def on_output(b: bytes) -> None:
+        if raw is not None:
+            raw.write(b)
+        split(dec.decode(b))
+
+    try:
+        code, _, stopped = proc.stream(content, on_output, timeout or proc.TIMEOUT_SEC,
+                                       persistent=True)
+    except Exception as e:
+        s = make()
+        s.feed_text(f"$ {content}\n# error: {e}")
+        return s.text(), s.chars
+    split(dec.decode(b"", final=True))
+    split.close()
+    if stopped:
+        s.feed(f"# stopped: {stopped}")
+    s.replace(1, f"# exit: {code}")
+    return s.text(), s.chars
+
+
+def _tail_lines(fh, size: int, n: int, start: int = 0) -> Optional[List[str]]:
+    """
+    Last ``n`` lines of a binary file, reading backwards from the end but
+    not before ``start``; None if the scan reaches ``start`` first.
+    """
+    block, pos, buf = 8192, size, b""
+    while pos > start and buf.count(b"\n") <= n and len(buf) < n * _READ_LINE:
+        step = min(block, pos - start)
+        pos -= step
+        fh.seek(pos)
+        buf = fh.read(step) + buf
+    if pos <= start:
+        return None
+    return buf.decode("utf-8", errors="replace").splitlines()[-n:]
+
+
+def file(path: str, max_lines: int = 24, raw=None, make: Optional[Callable] = None) -> Tuple[str, int]:
+    """
+    Summarise ``# file: path`` plus contents. Small or non-regular files
+    (pipes, /proc) are streamed, and so is every file when the summariser
+    needs the middle; otherwise large regular files only have their head
+    and tail read (plus one sequential copy into ``raw``, if given).
+    Returns (summary, raw_len).
+    """
+    make = make or (lambda: HeadTail(max_lines))
+    s = make()
+    s.feed(f"# file: {path}")
+    s.feed("")
+    try:
+        st = os.stat(path)
+        tail = None
+        if not s.needs_middle and os.path.isfile(path) and st.st_size > _FILE_STREAM_MAX:
+            with open(path, "rb") as fh:
+                while len(s.head) < s.head_n:
+                    piece = fh.readline(_READ_LINE)
+                    if not piece:
+                        break
+                    s.feed(piece.decode("utf-8", errors="replace").rstrip("\r\n"))
+                tail = _tail_lines(fh, st.st_size, s.tail_n + 1, fh.tell())
+                if tail is not None and raw is not None:
+                    fh.seek(0)
+                    _copy(fh, raw)
+        if tail is None:  # small or special file, or too few lines for head and tail to stay apart
+            s = make()
+            s.feed(f"# file: {path}")
+            s.feed("")
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                _pump(f, s, raw)
+            return s.text(), s.chars
+        tail = tail[1:]  # first one may be partial
+    except Exception as e:
+        s = make()
+        s.feed_text(f"# file: {path}\n# error: {e}")
+        return s.text(), s.chars
+    s.skip(max_lines)  # line count in the middle is unknown; it is not read
+    for line in tail:
+        s.feed(line)
+    return s.text(), len(f"# file: {path}\n\n") + st.st_size
+
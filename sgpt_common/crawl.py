@@ -0,0 +1,322 @@
+# ~/.config/shell_gpt/functions/sgpt_common/crawl.py
+"""
+Breadth-first site crawler behind ``web_crawl``.
+
+- links are resolved against the page (or its ``<base href>``) and
+  normalised, so ``/a/../b#x`` and ``HTTP://Host:80/b`` are one URL;
+- the visited set stores 64-bit URL fingerprints in a flat open-addressing
+  table (about 16 bytes per URL), so millions of URLs fit in tens of MB;
+- ``robots.txt`` is fetched once per host through the HTTP cache and
+  honoured, including ``Crawl-delay``;
+- pages are fetched concurrently with a cap per host and a minimum delay
+  between requests to the same host; results are yielded as they complete.
+"""
+import hashlib, posixpath, re, threading, time
+from array import array
+from collections import deque
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from . import defaults, httpcache, httpclient
+
+CONCURRENCY = 8
+PER_HOST = 2
+DELAY_SEC = defaults.CRAWL_DELAY_SEC
+MAX_CRAWL_DELAY = 10.0
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+_PCT = re.compile(r"%[0-9a-fA-F]{2}")
+
+
+class Page(NamedTuple):
+    url: str
+    depth: int
+    status: Optional[int]
+    title: str
+    links: int  # new crawlable links found on the page
+    error: Optional[str] = None
+
+
+def normalize(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Absolute, canonical http(s) URL without fragment; None for other schemes."""
+    try:
+        u = urlsplit(urljoin(base, url.strip()) if base else url.strip())
+        scheme = u.scheme.lower()
+        if scheme not in ("http", "https") or not u.hostname:
+            return None
+        host = u.hostname.lower().rstrip(".")
+        port = u.port
+    except ValueError:
+        return None
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if port and port != (443 if scheme == "https" else 80):
+        host = f"{host}:{port}"
+    path = u.path or "/"
+    if "/." in path:  # dot segments in an absolute URL (urljoin resolves relative ones)
+        trailing = path.endswith(("/", "/.", "/.."))
+        path = posixpath.normpath(path)
+        if path.startswith("//"):
+            path = path[1:]
+        if trailing and path != "/":
+            path += "/"
+    path = _PCT.sub(lambda m: m.group(0).upper(), quote(path, safe="/%:@!$&'()*+,;=-._~"))
+    query = _PCT.sub(lambda m: m.group(0).upper(), u.query)
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class VisitedSet:
+    """Set of URLs stored as 64-bit fingerprints in an open-addressing table."""
+
+    def __init__(self, capacity: int = 1024):
+        size = 1
+        while size < capacity * 2:
+            size *= 2
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._n = 0
+
+    @staticmethod
+    def _fp(url: str) -> int:
+        fp = int.from_bytes(hashlib.blake2b(url.encode(), digest_size=8).digest(), "little")
+        return fp or 1  # 0 marks an empty slot
+
+    def add(self, url: str) -> bool:
+        """Add ``url``; True if it was not there yet."""
+        if self._insert(self._fp(url)):
+            self._n += 1
+            if self._n * 2 > len(self._slots):
+                self._grow()
+            return True
+        return False
+
+    def __contains__(self, url: str) -> bool:
+        fp, slots, mask = self._fp(url), self._slots, self._mask
+        i = fp & mask
+        while slots[i]:
+            if slots[i] == fp:
+                return True
+            i = (i + 1) & mask
+        return False
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _insert(self, fp: int) -> bool:
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while slots[i]:
+            if slots[i] == fp:
+                return False
+            i = (i + 1) & mask
+        slots[i] = fp
+        return True
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for fp in old:
+            if fp:
+                self._insert(fp)
+
+    @property
+    def nbytes(self) -> int:
+        return self._slots.itemsize * len(self._slots)
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.hrefs: List[str] = []
+        self.base: Optional[str] = None
+        self.title = ""
+        self.nofollow = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            a = dict(attrs)
+            if a.get("href") and "nofollow" not in (a.get("rel") or "").lower():
+                self.hrefs.append(a["href"])
+        elif tag == "base" and self.base is None:
+            self.base = dict(attrs).get("href")
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            a = dict(attrs)
+            if (a.get("name") or "").lower() == "robots" and "nofollow" in (a.get("content") or "").lower():
+                self.nofollow = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title and len(self.title) < 300:
+            self.title += data
+
+
+class _Robots:
+    """robots.txt per host, fetched once per crawl (and cached on disk by httpcache)."""
+
+    def __init__(self, user_agent: str, timeout: float):
+        self.ua, self.timeout = user_agent, timeout
+        self._hosts: Dict[str, RobotFileParser] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, origin: str) -> RobotFileParser:
+        rp = RobotFileParser(origin + "/robots.txt")
+        try:
+            with httpcache.get(origin + "/robots.txt", None, self.timeout, self.ua) as resp:
+                body = resp.read(512 * 1024).decode(httpclient.charset(resp), errors="replace")
+            rp.parse(body.splitlines())
+        except httpclient.HTTPError as e:
+            if e.code in (401, 403):
+                rp.disallow_all = True
+            else:
+                rp.allow_all = True  # 404 and friends: no rules
+        except (httpclient.URLError, OSError):
+            rp.allow_all = True
+        return rp
+
+    def get(self, url: str) -> RobotFileParser:
+        u = urlsplit(url)
+        origin = f"{u.scheme}://{u.netloc}"
+        with self._lock:
+            if origin in self._hosts:
+                return self._hosts[origin]
+        rp = self._load(origin)
+        with self._lock:
+            return self._hosts.setdefault(origin, rp)
+
+    def cached_delay(self, url: str) -> float:
+        """Crawl-delay for the host if its robots.txt is already loaded, else 0."""
+        u = urlsplit(url)
+        rp = self._hosts.get(f"{u.scheme}://{u.netloc}")
+        d = rp.crawl_delay(self.ua) if rp is not None else None
+        return min(float(d), MAX_CRAWL_DELAY) if d else 0.0
+
+    def allowed(self, url: str) -> bool:
+        return self.get(url).can_fetch(self.ua, url)
+
+
+def _fetch(url: str, timeout: float, user_agent: str) -> Tuple[Page, str, List[str]]:
+    """(page, final url, hrefs); ``page.links`` is filled in by the crawler."""
+    with httpcache.get(url, None, timeout, user_agent) as resp:
+        final = normalize(getattr(resp, "url", None) or url) or url
+        if "html" not in (resp.headers.get("Content-Type") or "").lower():
+            return Page(url, 0, resp.status, "", 0), final, []
+        p = _PageParser()
+        for chunk in httpclient.iter_text(resp, MAX_PAGE_BYTES):
+            p.feed(chunk)
+        base = urljoin(final, p.base) if p.base else final
+        hrefs = [] if p.nofollow else [urljoin(base, h) for h in p.hrefs]
+        return Page(url, 0, resp.status, " ".join(p.title.split()), 0), final, hrefs
+
+
+def crawl(seed: str, max_depth: int = 2, max_pages: int = 50, same_host: bool = True,
+          timeout: float = 20, user_agent: str = httpclient.UA, concurrency: int = CONCURRENCY,
+          per_host: int = PER_HOST, delay: float = DELAY_SEC,
+          stats: Optional[dict] = None) -> Iterator[Page]:
+    """
+    Yield a ``Page`` per fetched URL, breadth-first from ``seed``, as fetches
+    complete. ``stats`` (if given) receives counters: queued, robots_blocked,
+    errors, visited.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(queued=0, robots_blocked=0, errors=0)
+    start = normalize(seed)
+    if start is None:
+        raise ValueError(f"not an http(s) URL: {seed}")
+    seed_host = urlsplit(start).netloc
+    visited = VisitedSet()
+    visited.add(start)
+    robots = _Robots(user_agent, timeout)
+    frontier = deque([(start, 0)])
+    running: Dict[str, int] = {}  # host -> in flight
+    next_at: Dict[str, float] = {}  # host -> earliest next request
+    done: deque = deque()
+    cond = threading.Condition()
+    inflight = 0
+    started = 0
+
+    def work(url: str, depth: int, host: str) -> None:
+        try:
+            if not robots.allowed(url):
+                result = None
+            else:
+                page, final, hrefs = _fetch(url, timeout, user_agent)
+                result = (page._replace(depth=depth), final, hrefs)
+        except httpclient.HTTPError as e:
+            result = (Page(url, depth, e.code, "", 0, f"HTTPError {e.code}: {e.reason}"), url, [])
+        except Exception as e:
+            result = (Page(url, depth, None, "", 0, f"{type(e).__name__}: {e}"), url, [])
+        with cond:
+            done.append((url, depth, host, result))
+            cond.notify()
+
+    cond.acquire()
+    try:
+        while True:
+            ready: List[Page] = []
+            while done:
+                url, depth, host, result = done.popleft()
+                inflight -= 1
+                running[host] -= 1
+                if result is None:
+                    stats["robots_blocked"] += 1
+                    started -= 1  # blocked URLs do not count against max_pages
+                    continue
+                page, final, hrefs = result
+                visited.add(final)
+                new = 0
+                if depth < max_depth:
+                    for href in hrefs:
+                        link = normalize(href)
+                        if link is None or (same_host and urlsplit(link).netloc != seed_host):
+                            continue
+                        if visited.add(link):
+                            frontier.append((link, depth + 1))
+                            stats["queued"] += 1
+                            new += 1
+                if page.error:
+                    stats["errors"] += 1
+                ready.append(page._replace(links=new))
+            if ready:
+                cond.release()  # workers keep reporting while the caller consumes
+                try:
+                    yield from ready
+                finally:
+                    cond.acquire()
+                continue
+            if started >= max_pages:
+                frontier.clear()
+            if not frontier and not inflight:
+                break
+            now = time.monotonic()
+            wait = None
+            skipped: deque = deque()
+            while frontier and inflight < concurrency and started < max_pages:
+                url, depth = frontier.popleft()
+                host = urlsplit(url).netloc
+                if running.get(host, 0) >= per_host or next_at.get(host, 0) > now:
+                    skipped.append((url, depth))
+                    if next_at.get(host, 0) > now:
+                        w = next_at[host] - now
+                        wait = w if wait is None else min(wait, w)
+                    if len(skipped) > 256:  # keep the scan short on single-host crawls
+                        break
+                    continue
+                running[host] = running.get(host, 0) + 1
+                next_at[host] = now + max(delay, robots.cached_delay(url))
+                inflight += 1
+                started += 1
+                threading.Thread(target=work, args=(url, depth, host), daemon=True).start()
+            frontier.extendleft(reversed(skipped))
+            if not done:
+                cond.wait(wait)
+    finally:
+        cond.release()
+    stats["visited"] = len(visited)
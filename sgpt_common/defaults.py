@@ -0,0 +1,17 @@
+# ~/.config/shell_gpt/functions/sgpt_common/defaults.py
+"""
+Defaults the function schemas show, read from the environment.
+
+sgpt builds every function's schema on every turn, so these live in a
+module that imports nothing but ``os``. The modules that act on them
+(``proc``, ``logsum``, ``batch``, ``crawl``) are only imported when a
+function runs, and take their values from here.
+"""
+import os
+
+SHELL_TIMEOUT_SEC = float(os.environ.get("SGPT_SHELL_TIMEOUT", "300"))
+SHELL_MAX_BYTES = int(os.environ.get("SGPT_SHELL_MAX_BYTES", str(16 * 1024 * 1024)))
+SHELL_PERSISTENT = os.environ.get("SGPT_SHELL_PERSISTENT", "").lower() not in ("", "0", "false", "no")
+SUMMARY_CHARS = int(os.environ.get("SGPT_REMEMBER_SUMMARY_CHARS", "2400"))
+WEB_BATCH_MAX_URLS = 50
+CRAWL_DELAY_SEC = 0.1
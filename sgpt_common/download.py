@@ -0,0 +1,273 @@
+# ~/.config/shell_gpt/functions/sgpt_common/download.py
+"""
+Segmented, resumable downloads for ``web_download``.
+
+If the server advertises ``Accept-Ranges: bytes`` and a ``Content-Length``,
+the file is split into byte ranges fetched concurrently into a preallocated
+``<out>.part`` file. Progress is checkpointed in ``<out>.part.json``, so a
+later call with the same URL resumes where it stopped (if the server sent
+a strong ETag or a Last-Modified, and it still matches). Otherwise the file is streamed in one request as before.
+
+The SHA-256 is computed while downloading: the segment at the hash frontier
+is hashed as it arrives, and data that landed ahead of the frontier is read
+back from the page cache as the frontier reaches it, never in a separate
+pass after the download.
+"""
+import hashlib, json, os, threading
+from typing import Dict, List, Optional, Tuple
+
+from . import httpclient
+
+SEGMENT_MIN = int(os.environ.get("SGPT_DOWNLOAD_SEGMENT_MIN", str(4 * 1024 * 1024)))
+_SEGMENT_FLOOR = 1024 * 1024  # never split into ranges smaller than this
+_CHUNK = 256 * 1024
+_CHECKPOINT_EVERY = 4 * 1024 * 1024
+_RETRIES = 3
+
+
+class Aborted(Exception):
+    """The download cannot finish (size cap, server changed); message is user-facing."""
+
+
+class Interrupted(Exception):
+    """Network failure mid-download; the .part file and manifest are kept for resuming."""
+
+
+class _RangesIgnored(Exception):
+    """A range request got the whole file (200): no range support after all, or it changed."""
+
+
+def _probe(url: str, headers: Dict[str, str], timeout: float) -> Tuple[Optional[int], bool, dict]:
+    """(size, ranges supported, validators) from a HEAD request; (None, False, {}) on failure."""
+    try:
+        with httpclient.request("HEAD", url, headers, timeout) as resp:
+            h = resp.headers
+            size = h.get("Content-Length")
+            ranges = (h.get("Accept-Ranges") or "").lower() == "bytes" \
+                and not h.get("Content-Encoding")
+            return (int(size) if size and size.isdigit() else None, ranges,
+                    {"etag": h.get("ETag"), "last_modified": h.get("Last-Modified")})
+    except (httpclient.HTTPError, httpclient.URLError, OSError):
+        return None, False, {}
+
+
+class _Job:
+    def __init__(self, url: str, part: str, size: int, validators: dict, segments: List[list]):
+        self.url, self.part, self.size, self.validators = url, part, size, validators
+        self.segments = segments  # [start, end_inclusive, done]
+        self.lock = threading.Lock()
+        self.sha = hashlib.sha256()
+        self.hashed = 0  # hash frontier: bytes [0, hashed) are in self.sha
+        self.since_checkpoint = 0
+        self.fd = -1
+        self.stop = threading.Event()  # set when one segment makes the others pointless
+
+    @property
+    def manifest(self) -> str:
+        return self.part + ".json"
+
+    def save(self) -> None:
+        tmp = self.manifest + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "size": self.size, "validators": self.validators,
+                       "segments": self.segments}, f)
+        os.replace(tmp, self.manifest)
+
+    def _written_until(self, pos: int) -> int:
+        """End of the contiguous written region starting at ``pos``."""
+        for start, end, done in self.segments:
+            if start <= pos <= end:
+                if start + done <= pos:
+                    return pos
+                pos = start + done
+                if pos <= end:
+                    return pos
+        return pos
+
+    def wrote(self, offset: int, data: bytes) -> None:
+        """Record a write; advance the hash inline or by catching up from the page cache."""
+        with self.lock:
+            for seg in self.segments:
+                if data and seg[0] <= offset <= seg[1]:
+                    seg[2] = offset + len(data) - seg[0]
+                    break
+            if offset == self.hashed:
+                self.sha.update(data)
+                self.hashed += len(data)
+            while True:
+                end = self._written_until(self.hashed)
+                if end <= self.hashed:
+                    break
+                n = min(end - self.hashed, _CHUNK * 4)
+                self.sha.update(os.pread(self.fd, n, self.hashed))
+                self.hashed += n
+            self.since_checkpoint += len(data)
+            if self.since_checkpoint >= _CHECKPOINT_EVERY:
+                self.since_checkpoint = 0
+                self.save()
+
+
+def _load_job(url: str, part: str, size: int, validators: dict, n: int) -> _Job:
+    """
+    The checkpointed job for ``part`` if it is for the same file, else fresh
+    segments. Without a validator If-Range can use, a changed file could not
+    be told apart from the old one, so nothing is resumed.
+    """
+    try:
+        if _if_range(validators) is None:
+            raise ValueError("no validator to resume against")
+        with open(part + ".json", "r", encoding="utf-8") as f:
+            m = json.load(f)
+        if m["url"] == url and m["size"] == size and m["validators"] == validators \
+                and os.path.getsize(part) == size:
+            return _Job(url, part, size, validators, [list(s) for s in m["segments"]])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    step = -(-size // n)
+    segs = [[s, min(s + step, size) - 1, 0] for s in range(0, size, step)]
+    return _Job(url, part, size, validators, segs)
+
+
+def _if_range(validators: dict) -> Optional[str]:
+    """A strong ETag, else Last-Modified: servers must ignore If-Range with a weak ETag."""
+    etag = validators.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validators.get("last_modified")
+
+
+def _fetch_segment(job: _Job, seg: list, headers: Dict[str, str], timeout: float,
+                   errors: list) -> None:
+    for _ in range(_RETRIES):
+        start, end, done = seg
+        if start + done > end:
+            return
+        h = {**headers, "Range": f"bytes={start + done}-{end}"}
+        if_range = _if_range(job.validators)
+        if if_range:
+            h["If-Range"] = if_range
+        try:
+            with httpclient.request("GET", job.url, h, timeout) as resp:
+                if resp.status == 200:
+                    errors.append(_RangesIgnored())
+                    job.stop.set()
+                    return
+                if resp.status != 206:
+                    errors.append(Aborted(f"Aborted: server answered {resp.status} to a range request."))
+                    job.stop.set()
+                    return
+                pos = start + done
+                while pos <= end and not job.stop.is_set():
+                    chunk = resp.read1(min(_CHUNK, end - pos + 1))
+                    if not chunk:
+                        break
+                    os.pwrite(job.fd, chunk, pos)
+                    job.wrote(pos, chunk)
+                    pos += len(chunk)
+        except (httpclient.HTTPError, httpclient.URLError, OSError) as e:
+            last = e
+            continue
+        if seg[0] + seg[2] > seg[1] or job.stop.is_set():
+            return
+        last = httpclient.URLError("connection closed early")
+    errors.append(Interrupted(str(getattr(last, "reason", last))))
+
+
+def segmented(url: str, out_path: str, headers: Dict[str, str], timeout: float, size: int,
+              validators: dict, segments: int) -> Tuple[int, str, bool]:
+    """Download into ``out_path`` using ranges. Returns (size, sha256 hex, resumed)."""
+    part = out_path + ".part"
+    job = _load_job(url, part, size, validators, segments)
+    resumed = any(s[2] for s in job.segments)
+    if not resumed:
+        with open(part, "wb") as fh:
+            fh.truncate(size)  # preallocate; segments are written in place
+            try:
+                os.posix_fallocate(fh.fileno(), 0, size)
+            except (AttributeError, OSError):
+                pass  # sparse file is fine where fallocate is unsupported
+        job.save()
+    job.fd = os.open(part, os.O_RDWR)
+    try:
+        job.wrote(0, b"")  # on resume, hash the prefix that is already on disk
+        errors: list = []
+        threads = [threading.Thread(target=_fetch_segment, args=(job, seg, headers, timeout, errors))
+                   for seg in job.segments if seg[0] + seg[2] <= seg[1]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        job.save()
+        if errors:
+            aborted = next((e for e in errors if isinstance(e, (Aborted, _RangesIgnored))), None)
+            if aborted:
+                _discard(part)
+                raise aborted
+            raise errors[0]
+        if job.hashed != size:
+            raise Interrupted("download incomplete")
+        os.fsync(job.fd)
+    finally:
+        os.close(job.fd)
+    os.replace(part, out_path)
+    _discard_manifest(part)
+    return size, job.sha.hexdigest(), resumed
+
+
+def _discard_manifest(part: str) -> None:
+    try:
+        os.remove(part + ".json")
+    except OSError:
+        pass
+
+
+def _discard(part: str) -> None:
+    _discard_manifest(part)
+    try:
+        os.remove(part)
+    except OSError:
+        pass
+
+
+def single(url: str, out_path: str, headers: Dict[str, str], timeout: float,
+           max_bytes: int) -> Tuple[int, str]:
+    """One sequential stream (servers without ranges). Returns (size, sha256 hex)."""
+    with httpclient.request("GET", url, headers, timeout) as resp:
+        sha = hashlib.sha256()
+        total = 0
+        with open(out_path, "wb") as fh:
+            while True:
+                chunk = resp.read1(65536)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    fh.close()
+                    try: os.remove(out_path)
+                    except Exception: pass
+                    raise Aborted(f"Aborted: download exceeded {max_bytes} bytes.")
+                fh.write(chunk)
+                sha.update(chunk)
+    return total, sha.hexdigest()
+
+
+def download(url: str, out_path: str, headers: Dict[str, str], timeout: float,
+             max_bytes: int, segments: int = 4) -> Tuple[int, str, str]:
+    """
+    Download ``url`` to ``out_path``; returns (size, sha256 hex, mode) where
+    mode describes how it was fetched. Raises Aborted/Interrupted or the
+    httpclient errors.
+    """
+    size, ranges, validators = _probe(url, headers, timeout)
+    if size is not None and size > max_bytes:
+        raise Aborted(f"Aborted: download exceeded {max_bytes} bytes.")
+    if ranges and size is not None and size >= SEGMENT_MIN:
+        n = max(1, min(segments, size // _SEGMENT_FLOOR))
+        try:
+            size, digest, resumed = segmented(url, out_path, headers, timeout, size, validators, n)
+            return size, digest, f"{n} segments" + (", resumed" if resumed else "")
+        except _RangesIgnored:
+            size, digest = single(url, out_path, headers, timeout, max_bytes)
+            return size, digest, "single stream (server ignored byte ranges)"
+    size, digest = single(url, out_path, headers, timeout, max_bytes)
+    return size, digest, "single stream"
@@ -0,0 +1,406 @@
+# ~/.config/shell_gpt/functions/sgpt_common/extract.py
+"""
+Main-content extraction for ``web_text(mode="main")``.
+
+The page is cut into text blocks at block-level tags. Each block gets its
+word count, the share of its characters inside links (link density), and
+a hint from the tag and class/id names of its ancestors (nav, footer,
+sidebar, cookie, ... count against it; article, content, post, ... for
+it). Blocks that look like prose score their parent and grandparent
+elements, and the best-scoring element is taken as the main content.
+Headings and prose blocks inside that element are kept. Text that repeats
+across the page ("Share", "Read more", signatures) is dropped.
+
+The plain-text parser of ``web_text`` and the link parser of
+``web_extract_links`` live here too, so that ``html.parser`` is imported
+when a page is parsed rather than when sgpt loads the function files.
+"""
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+_BLOCK = {"address", "article", "aside", "blockquote", "body", "center", "dd", "details", "dialog",
+          "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2",
+          "h3", "h4", "h5", "h6", "header", "hr", "html", "li", "main", "menu", "nav", "ol", "p",
+          "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"}
+_SKIP = {"script", "style", "noscript", "svg", "template", "iframe", "button", "select",
+         "textarea", "canvas", "object", "math"}
+# What may appear in <head>; any other tag closes it, since </head> is optional.
+_HEAD_TAGS = {"head", "title", "meta", "link", "style", "script", "base", "noscript", "template"}
+_VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+         "source", "track", "wbr"}
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_SELF_CLOSING = {"p": {"p"}, "li": {"li"}, "dt": {"dt", "dd"}, "dd": {"dt", "dd"},
+                 "tr": {"tr", "td", "th"}, "td": {"td", "th"}, "th": {"td", "th"}}
+_LEAVES = {"p", "pre", "li", "td", "th", "dd", "dt", "blockquote", "figcaption", "summary"}
+_NEGATIVE_TAGS = {"nav", "aside", "footer", "form", "menu", "dialog"}
+_NEGATIVE = re.compile(r"nav|menu|footer|sidebar|side-bar|aside|cookie|consent|banner|"
+                       r"breadcrumb|share|social|comment|related|promo|advert|\bads?\b|sponsor|"
+                       r"subscribe|newsletter|popup|modal|widget|masthead|skip|signature|"
+                       r"pagination|pager|tags?\b|toolbar|login|signup", re.I)
+_POSITIVE = re.compile(r"article|content|main|post|entry|story|body|text|blog|prose|"
+                       r"markdown|documentation|docs?\b", re.I)
+_WS = re.compile(r"\s+")
+CHARS_PER_TOKEN = 4  # rough average for English text
+
+
+class _Node:
+    __slots__ = ("tag", "parent", "hint", "score", "total")
+
+    def __init__(self, tag: str, parent: Optional["_Node"], hint: int):
+        self.tag, self.parent, self.hint = tag, parent, hint
+        self.score = self.total = 0.0
+
+
+class _Block:
+    __slots__ = ("node", "text", "link_chars", "kind")
+
+    def __init__(self, node: _Node, text: str, link_chars: int, kind: str):
+        self.node, self.text, self.link_chars, self.kind = node, text, link_chars, kind
+
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / max(1, len(self.text))
+
+    @property
+    def words(self) -> int:
+        return self.text.count(" ") + 1
+
+
+class _BlockParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.root = _Node("#root", None, 0)
+        self.stack: List[_Node] = [self.root]
+        self.blocks: List[_Block] = []
+        self.title = ""
+        self._text: List[str] = []
+        self._link_chars = 0
+        self._in_a = 0
+        self._skip = 0
+        self._in_head = False
+        self._in_title = False
+        self._pre = 0
+
+    def _flush(self) -> None:
+        if not self._text:
+            return
+        raw = "".join(self._text)
+        self._text = []
+        text = raw.strip("\n") if self._pre else _WS.sub(" ", raw).strip()
+        links, self._link_chars = self._link_chars, 0
+        if text:
+            node = self.stack[-1]
+            kind = node.tag if node.tag in _HEADINGS or node.tag in ("li", "pre") else \
+                "cell" if node.tag in ("td", "th") else "p"
+            self.blocks.append(_Block(node, text, min(links, len(text)), kind))
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        if tag == "head":
+            self._in_head = True
+        elif tag not in _HEAD_TAGS:
+            self._in_head = False
+        if tag in _SKIP:
+            if tag not in _VOID:
+                self._skip += 1
+            return
+        if tag == "a":
+            self._in_a += 1
+        elif tag == "br" and self._pre:
+            self._text.append("\n")
+        if tag not in _BLOCK:
+            return
+        self._flush()
+        top = self.stack[-1]
+        if top.tag in _SELF_CLOSING.get(tag, ()):
+            self.stack.pop()  # implied </p>, </li>, </td>, ...
+        if tag in _VOID:
+            return
+        a = dict(attrs)
+        names = f"{a.get('class') or ''} {a.get('id') or ''} {a.get('role') or ''}"
+        hint = 0
+        if tag in ("html", "body"):
+            pass  # page-wide classes ("has-sidebar") say nothing about a block
+        elif tag in _NEGATIVE_TAGS or (tag == "header" and not self._inside("article", "main")):
+            hint = -1
+        elif tag in ("article", "main"):
+            hint = 1
+        elif names.strip():
+            if _NEGATIVE.search(names):
+                hint = -1
+            elif _POSITIVE.search(names):
+                hint = 1
+        self.stack.append(_Node(tag, self.stack[-1], hint))
+        if tag == "pre":
+            self._pre += 1
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag == "head":
+            self._in_head = False
+        if tag in _SKIP:
+            self._skip = max(0, self._skip - 1)
+            return
+        if tag == "a":
+            self._in_a = max(0, self._in_a - 1)
+        if tag not in _BLOCK:
+            return
+        self._flush()
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                break
+        if tag == "pre":
+            self._pre = max(0, self._pre - 1)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if self._skip or self._in_head:
+            return
+        self._text.append(data)
+        if self._in_a:
+            self._link_chars += len(_WS.sub(" ", data).strip())
+
+    def _inside(self, *tags) -> bool:
+        return any(n.tag in tags for n in self.stack)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class TextParser(HTMLParser):
+    """Plain text of a page for ``web_text`` (mode="all"): all text outside script/style."""
+
+    def __init__(self):
+        super().__init__()
+        self.out = []
+        self.chars = 0  # raw chars in self.out, an upper bound on len(self.text())
+        self._skip = False  # inside script/style
+
+    def handle_starttag(self, tag, attrs):
+        if tag.lower() in ("script","style"):
+            self._skip = True
+        elif tag.lower() in ("p","br","div","li","h1","h2","h3","h4","h5","h6"):
+            self.out.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag.lower() in ("script","style"):
+            self._skip = False
+        elif tag.lower() in ("p","div","li"):
+            self.out.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.out.append(data)
+            self.chars += len(data)
+
+    def text(self):
+        raw = "".join(self.out)
+        raw = re.sub(r"\n\s*\n\s*\n+", "\n\n", raw)
+        return raw.strip()
+
+
+class LinkParser(HTMLParser):
+    """Anchors of a page for ``web_extract_links``, as (href, text) pairs."""
+
+    def __init__(self):
+        super().__init__()
+        self.links: List[Tuple[str, str]] = []  # (href, text)
+        self.with_href = 0
+        self._in_a = False
+        self._buf = ""
+        self._curr_href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag.lower() == "a":
+            self._in_a = True
+            self._buf = ""
+            self._curr_href = dict(attrs).get("href")
+
+    def handle_data(self, data):
+        if self._in_a:
+            self._buf += data
+
+    def handle_endtag(self, tag):
+        if tag.lower() == "a" and self._in_a:
+            text = " ".join(self._buf.split())
+            href = self._curr_href or ""
+            self.links.append((href, text))
+            self.with_href += bool(href)
+            self._in_a = False
+            self._buf = ""
+            self._curr_href = None
+
+
+def _negative(node: _Node) -> bool:
+    while node is not None:
+        if node.hint < 0:
+            return True
+        node = node.parent
+    return False
+
+
+def _is_prose(b: _Block) -> bool:
+    if b.kind in _HEADINGS or b.link_density > 0.33:
+        return False
+    return b.words >= 12 or (b.words >= 5 and b.text[-1:] in ".!?:;\"'”") or b.kind == "pre"
+
+
+def _within(node: _Node, container: _Node) -> bool:
+    while node is not None:
+        if node is container:
+            return True
+        node = node.parent
+    return False
+
+
+class Extractor:
+    """Feed HTML in pieces (``feed``), then call ``text()``."""
+
+    def __init__(self):
+        self.p = _BlockParser()
+
+    def feed(self, data: str) -> None:
+        self.p.feed(data)
+
+    def text(self) -> str:
+        p = self.p
+        p.close()
+        blocks = p.blocks
+        counts: Dict[str, int] = {}
+        for b in blocks:
+            key = b.text.lower()
+            counts[key] = counts.get(key, 0) + 1
+        # Score the parent and grandparent of every prose block (as readability does),
+        # and keep the total prose weight under every element.
+        for b in blocks:
+            if not _is_prose(b) or _negative(b.node) or counts[b.text.lower()] > 1:
+                continue
+            score = min(b.words, 120) * (1 - b.link_density)
+            node = b.node.parent if b.node.tag in _LEAVES else b.node
+            share = 1.0
+            while node is not None and node is not p.root:
+                node.score += score * share
+                node.total += score
+                share /= 2
+                node = node.parent
+        best = None
+        for node in {id(b.node): b.node for b in blocks}.values():
+            n = node
+            while n is not None and n is not p.root:
+                w = n.score * (1.25 if n.hint > 0 else 1.0)
+                if best is None or w > best[0]:
+                    best = (w, n)
+                n = n.parent
+        container = best[1] if best and best[0] > 0 else p.root
+        # Widen to an ancestor that holds much more prose: posts in a thread,
+        # sections each wrapped in their own element.
+        n = container.parent
+        while n is not None and n is not p.root:
+            if n.total > 1.3 * container.total:
+                container = n
+            n = n.parent
+
+        out: List[tuple] = []  # (heading level or 0, line, kind)
+        seen = set()
+        first_heading = next((b for b in blocks if b.kind == "h1"), None)
+        if first_heading is not None and not _within(first_heading.node, container):
+            out.append((1, "# " + first_heading.text, "h"))
+            seen.add(first_heading.text.lower())
+        elif first_heading is None and p.title.strip():
+            out.append((1, "# " + _WS.sub(" ", p.title).strip(), "h"))
+        row = None
+        for b in blocks:
+            if not _within(b.node, container) or _negative_below(b.node, container):
+                continue
+            if b.kind == "cell":  # table rows become "a | b | c"
+                if b.link_density > 0.5:
+                    continue
+                if row is b.node.parent and out:
+                    out[-1] = (0, out[-1][1] + " | " + b.text, "row")
+                else:
+                    out.append((0, b.text, "row"))
+                    row = b.node.parent
+                continue
+            row = None
+            key = b.text.lower()
+            if key in seen:
+                continue
+            if b.kind in _HEADINGS:
+                if b.link_density > 0.5 or b.words > 30:
+                    continue
+                level = int(b.kind[1])
+                line, kind = "#" * level + " " + b.text, "h"
+            elif _is_prose(b) or (b.kind == "li" and b.link_density <= 0.5 and counts[key] == 1):
+                if counts[key] > 1 and b.words < 12:
+                    continue  # repeated boilerplate ("Share this", "Read more")
+                level, kind = 0, "li" if b.kind == "li" else "p"
+                line = "- " + b.text if kind == "li" else b.text
+            else:
+                continue
+            seen.add(key)
+            out.append((level, line, kind))
+        # Drop headings whose section ended up empty ("See also" over a dropped link list).
+        kept: List[tuple] = []
+        for i, (level, line, kind) in enumerate(out):
+            if level and i:
+                nxt = next((lv for lv, _, _ in out[i + 1:] if not lv or lv <= level), None)
+                if nxt is None or nxt:
+                    continue
+            kept.append((line, kind))
+        if not any(kind != "h" for _, kind in kept):  # nothing looked like content
+            kept = [(b.text, "p") for b in blocks]
+        return _join(kept)
+
+
+def _negative_below(node: _Node, container: _Node) -> bool:
+    """A nav/sidebar/... between the block and the chosen container."""
+    while node is not None and node is not container:
+        if node.hint < 0:
+            return True
+        node = node.parent
+    return False
+
+
+def _join(lines: List[tuple]) -> str:
+    """Blank line between blocks; list items and table rows stay together."""
+    parts: List[str] = []
+    prev = None
+    for line, kind in lines:
+        if prev is not None and not (kind == prev and kind in ("li", "row")):
+            parts.append("\n")
+        parts.append(line + "\n")
+        prev = kind
+    return "".join(parts).strip()
+
+
+def main_text(html: str) -> str:
+    ex = Extractor()
+    ex.feed(html)
+    return ex.text()
+
+
+def budget(max_chars: Optional[int] = None, max_tokens: Optional[int] = None) -> Optional[int]:
+    """The tighter of a char and a token budget, in chars (None = no budget)."""
+    limits = [n for n in (max_chars, max_tokens and max_tokens * CHARS_PER_TOKEN) if n]
+    return min(limits) if limits else None
+
+
+def trim(text: str, max_chars: Optional[int]) -> str:
+    """Cut ``text`` to ``max_chars`` at a paragraph, line or word boundary."""
+    if not max_chars or len(text) <= max_chars:
+        return text
+    marker = f"\n… [trimmed to {max_chars} chars]"
+    limit = max(0, max_chars - len(marker))
+    cut = text[:limit]
+    for sep in ("\n\n", "\n", " "):
+        i = cut.rfind(sep)
+        if i >= limit // 2:
+            cut = cut[:i]
+            break
+    return cut.rstrip() + marker
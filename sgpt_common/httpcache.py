@@ -0,0 +1,421 @@
+# ~/.config/shell_gpt/functions/sgpt_common/httpcache.py
+"""
+On-disk HTTP cache shared by web_get, web_text and web_extract_links.
+
+Bodies are stored once per SHA-256 under ``bodies/`` (decoded, so gzip is
+not stored twice); a small SQLite index maps URLs to bodies plus their
+freshness data. Fresh entries are served without touching the network,
+stale ones are revalidated with ``If-None-Match``/``If-Modified-Since`` and
+served from disk on 304. ``derived`` keeps per-body artifacts (extracted
+text, link lists) so a hit also skips re-parsing.
+
+Entries are keyed by URL plus the caller's own request headers and user
+agent, so a response that varies on them (``Vary: Accept-Language``) is
+only served back to requests that send the same values; the headers the
+client adds itself are the same on every request. Only plain GET 200
+responses are stored, never for requests carrying ``Authorization``/
+``Cookie``/``Range`` headers, ``Cache-Control: no-store`` or ``Vary: *``.
+The cache is trimmed LRU-first to ``SGPT_HTTP_CACHE_MAX_BYTES`` and entries
+older than ``SGPT_HTTP_CACHE_TTL`` seconds are dropped.
+"""
+import hashlib, json, os, sqlite3, tempfile, threading, time
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from . import httpclient
+
+ENABLED = os.environ.get("SGPT_HTTP_CACHE", "1").lower() not in ("0", "false", "no", "off")
+CACHE_DIR = os.path.expanduser(os.environ.get("SGPT_HTTP_CACHE_DIR", "~/.cache/shell_gpt/http"))
+MAX_BYTES = int(os.environ.get("SGPT_HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TTL_SEC = float(os.environ.get("SGPT_HTTP_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_BODY = int(os.environ.get("SGPT_HTTP_CACHE_MAX_BODY", str(16 * 1024 * 1024)))
+# A caller that stops reading early (web_get previews) still fills the cache
+# if the rest of the body is known (Content-Length) to be at most this big.
+# Callers that stop because they have all they need call ``abandon`` instead.
+FILL_MAX = int(os.environ.get("SGPT_HTTP_CACHE_FILL_MAX", str(2 * 1024 * 1024)))
+HEURISTIC_MAX_SEC = 24 * 3600
+_PRIVATE_HEADERS = ("authorization", "cookie", "range")
+
+_SCHEMA_VERSION = 3  # an index built by an older version is dropped and rebuilt
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    final_url     TEXT NOT NULL,
+    headers       TEXT NOT NULL,
+    body_sha      TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    stored        REAL NOT NULL,
+    expires       REAL NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    accessed      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS derived (
+    body_sha TEXT NOT NULL,
+    kind     TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    PRIMARY KEY (body_sha, kind)
+);
+"""
+
+_local = threading.local()
+
+
+def _db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(CACHE_DIR, "index.db"), isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS entries")
+            conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        for stmt in _SCHEMA.split(";"):
+            if stmt.strip():
+                conn.execute(stmt)
+        _local.conn = conn
+    return conn
+
+
+def _body_path(sha: str) -> str:
+    return os.path.join(CACHE_DIR, "bodies", sha[:2], sha)
+
+
+def _cacheable_request(headers: Dict[str, str]) -> bool:
+    return not any(k.lower() in _PRIVATE_HEADERS for k in headers)
+
+
+def _key(url: str, headers: Dict[str, str], user_agent: Optional[str]) -> str:
+    """The URL plus whatever the caller sent that can select another representation."""
+    extra = sorted((k.lower(), v) for k, v in headers.items())
+    if user_agent:
+        extra.append(("user-agent", user_agent))
+    return url + " " + json.dumps(extra) if extra else url
+
+
+def _directives(value: Optional[str]) -> Dict[str, Optional[str]]:
+    out: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        k, _, v = part.strip().partition("=")
+        if k:
+            out[k.lower()] = v.strip('"') or None
+    return out
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _expires(headers, now: float) -> Optional[float]:
+    """Absolute expiry time, or None if the response must not be stored."""
+    cc = _directives(headers.get("Cache-Control"))
+    if "no-store" in cc or "*" in (headers.get("Vary") or ""):
+        return None
+    if "no-cache" in cc:
+        return now
+    if (cc.get("max-age") or "").isdigit():
+        return now + int(cc["max-age"])
+    exp = _http_date(headers.get("Expires"))
+    if headers.get("Expires") is not None:
+        return exp if exp is not None else now  # invalid Expires means already expired
+    lm = _http_date(headers.get("Last-Modified"))
+    date = _http_date(headers.get("Date")) or now
+    if lm is not None and lm < date:  # RFC 9111 4.2.2 heuristic: 10% of the age
+        return now + min((date - lm) * 0.1, HEURISTIC_MAX_SEC)
+    return now
+
+
+def _message(pairs) -> Message:
+    m = Message()
+    for k, v in pairs:
+        m[k] = v
+    return m
+
+
+class CachedResponse:
+    """
+    A cache hit: same reading interface as ``httpclient.Response``; ``url``
+    is where the stored response came from after redirects.
+    """
+
+    def __init__(self, url: str, headers: Message, path: str, body_sha: str, state: str):
+        self.url, self.headers, self.body_sha, self.cache_state = url, headers, body_sha, state
+        self.status, self.reason = 200, "OK"
+        self._fh = open(path, "rb")
+        self.raw_bytes = 0
+
+    @property
+    def length(self) -> Optional[int]:
+        return os.fstat(self._fh.fileno()).st_size
+
+    def read(self, n: int = -1) -> bytes:
+        return self._fh.read(n)
+
+    def read1(self, n: int = 65536) -> bytes:
+        return self._fh.read(n)
+
+    def iter_chunks(self, size: int = 65536):
+        return iter(lambda: self._fh.read(size), b"")
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Filling:
+    """
+    Wraps a live ``httpclient.Response``: hashes and spools the body while
+    the caller reads it, and stores it in the cache on close if it was
+    read to the end and is cacheable. ``url`` is the URL after redirects.
+    """
+
+    def __init__(self, resp, key: str, url: str, expires: Optional[float]):
+        self.resp, self.key, self.expires = resp, key, expires
+        self.requested, self.url = url, getattr(resp, "url", None) or url
+        self.status, self.reason, self.headers = resp.status, resp.reason, resp.headers
+        self.cache_state = "miss"
+        self._sha = hashlib.sha256()
+        self._size = 0
+        self._eof = False
+        self._spool = None
+        if expires is not None:
+            os.makedirs(os.path.join(CACHE_DIR, "bodies"), exist_ok=True)
+            self._spool = tempfile.NamedTemporaryFile(dir=os.path.join(CACHE_DIR, "bodies"),
+                                                      prefix=".fill-", delete=False)
+
+    @property
+    def length(self) -> Optional[int]:
+        return self.resp.length
+
+    @property
+    def raw_bytes(self) -> int:
+        return self.resp.raw_bytes
+
+    @property
+    def body_sha(self) -> Optional[str]:
+        """SHA-256 of the body, known once it has been read to the end."""
+        return self._sha.hexdigest() if self._eof else None
+
+    def _seen(self, data: bytes) -> bytes:
+        self._sha.update(data)
+        self._size += len(data)
+        if self._spool is not None:
+            if self._size > MAX_BODY:
+                self._drop_spool()
+            else:
+                self._spool.write(data)
+        return data
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.resp.read(n)
+        if n < 0 or len(data) < n:
+            self._eof = True
+        return self._seen(data)
+
+    def read1(self, n: int = 65536) -> bytes:
+        data = self.resp.read1(n)
+        if not data:
+            self._eof = True
+        return self._seen(data)
+
+    def iter_chunks(self, size: int = 65536):
+        while True:
+            chunk = self.read1(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def _drop_spool(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            try:
+                os.remove(self._spool.name)
+            except OSError:
+                pass
+            self._spool = None
+
+    def abandon(self) -> None:
+        """The caller is stopping on purpose: do not read the rest to fill the cache."""
+        if not self._eof:
+            self._drop_spool()
+
+    def close(self) -> None:
+        try:
+            if self._spool is not None and not self._eof:
+                known = self.resp.length
+                if known is not None and known - self._size <= FILL_MAX:
+                    while self._spool is not None and self.read1(65536):
+                        pass
+            if self._spool is not None and self._eof:
+                self._spool.close()
+                _store(self.key, self.requested, self.url, self.resp.headers, self._spool.name, self.body_sha,
+                       self._size, self.expires)
+                self._spool = None
+        except Exception:
+            pass
+        finally:
+            self._drop_spool()
+            self.resp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def abandon(resp) -> None:
+    """
+    Tell the cache ``resp`` will not be read to the end on purpose (an
+    output cap was reached), so closing it does not download the rest.
+    """
+    if isinstance(resp, _Filling):
+        resp.abandon()
+
+
+def _store(key: str, url: str, final_url: str, headers, spool_path: str, sha: str, size: int, expires: float) -> None:
+    path = _body_path(sha)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(spool_path)
+    else:
+        os.replace(spool_path, path)
+    now = time.time()
+    pairs = [(k, v) for k, v in headers.items()
+             if k.lower() not in ("content-encoding", "content-length", "transfer-encoding",
+                                  "connection", "set-cookie")]
+    _db().execute(
+        "INSERT OR REPLACE INTO entries (key, url, final_url, headers, body_sha, size, stored, "
+        "expires, etag, last_modified, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (key, url, final_url, json.dumps(pairs), sha, size, now, expires, headers.get("ETag"),
+         headers.get("Last-Modified"), now),
+    )
+    evict()
+
+
+def evict(max_bytes: int = MAX_BYTES, ttl: float = TTL_SEC) -> int:
+    """Drop expired-by-TTL entries, then LRU entries until under ``max_bytes``."""
+    db = _db()
+    dropped = db.execute("DELETE FROM entries WHERE stored < ?", (time.time() - ttl,)).rowcount
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM "
+                       "(SELECT DISTINCT body_sha, size FROM entries)").fetchone()[0]
+    if total > max_bytes:
+        target = max_bytes * 0.9
+        for key, sha, size in db.execute("SELECT key, body_sha, size FROM entries "
+                                         "ORDER BY accessed").fetchall():
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            dropped += 1
+            if not db.execute("SELECT 1 FROM entries WHERE body_sha = ?", (sha,)).fetchone():
+                total -= size
+            if total <= target:
+                break
+    return _collect_garbage(db) if dropped else 0
+
+
+def _collect_garbage(db: sqlite3.Connection) -> int:
+    """Delete bodies and derived artifacts no entry points at; returns bytes freed."""
+    live = {r[0] for r in db.execute("SELECT DISTINCT body_sha FROM entries")}
+    db.execute("DELETE FROM derived WHERE body_sha NOT IN (SELECT body_sha FROM entries)")
+    freed = 0
+    root = os.path.join(CACHE_DIR, "bodies")
+    for sub in os.listdir(root) if os.path.isdir(root) else []:
+        d = os.path.join(root, sub)
+        if not os.path.isdir(d):
+            continue
+        for name in os.listdir(d):
+            if name not in live:
+                p = os.path.join(d, name)
+                try:
+                    freed += os.path.getsize(p)
+                    os.remove(p)
+                except OSError:
+                    pass
+    return freed
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 20,
+        user_agent: Optional[str] = None):
+    """
+    ``httpclient.get`` through the cache. The result has the usual reading
+    interface plus ``cache_state`` ("hit", "revalidated" or "miss") and
+    ``body_sha`` (set up front on hits, after a full read on misses).
+    """
+    headers = dict(headers or {})
+    if not ENABLED or not _cacheable_request(headers):
+        resp = httpclient.get(url, headers, timeout, user_agent)
+        resp.cache_state, resp.body_sha = "bypass", None
+        return resp
+    now = time.time()
+    key = _key(url, headers, user_agent)
+    try:
+        row = _db().execute("SELECT headers, body_sha, expires, etag, last_modified, stored, "
+                            "final_url FROM entries WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error:
+        row = None
+    if row and not os.path.exists(_body_path(row[1])):
+        row = None
+    if row and now - row[5] > TTL_SEC:
+        row = None
+    if row and now < row[2]:
+        _touch(key, now)
+        return CachedResponse(row[6], _message(json.loads(row[0])), _body_path(row[1]), row[1], "hit")
+    if row and (row[3] or row[4]):
+        if row[3]:
+            headers["If-None-Match"] = row[3]
+        if row[4]:
+            headers["If-Modified-Since"] = row[4]
+    resp = httpclient.get(url, headers, timeout, user_agent)
+    if resp.status == 304 and row:
+        resp.close()
+        stored = json.loads(row[0])
+        merged = dict((k.lower(), (k, v)) for k, v in stored)
+        for k, v in resp.headers.items():
+            merged[k.lower()] = (k, v)
+        pairs = list(merged.values())
+        expires = _expires(resp.headers, now) or now
+        final = getattr(resp, "url", None) or row[6]
+        _db().execute("UPDATE entries SET headers = ?, expires = ?, stored = ?, accessed = ?, "
+                      "final_url = ? WHERE key = ?", (json.dumps(pairs), expires, now, now, final, key))
+        return CachedResponse(final, _message(pairs), _body_path(row[1]), row[1], "revalidated")
+    return _Filling(resp, key, url, _expires(resp.headers, now) if resp.status == 200 else None)
+
+
+def _touch(key: str, now: float) -> None:
+    try:
+        _db().execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+    except sqlite3.Error:
+        pass
+
+
+def derived(body_sha: Optional[str], kind: str) -> Optional[str]:
+    """A previously stored artifact for this body (e.g. extracted text), or None."""
+    if not ENABLED or not body_sha:
+        return None
+    try:
+        row = _db().execute("SELECT value FROM derived WHERE body_sha = ? AND kind = ?",
+                            (body_sha, kind)).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def put_derived(body_sha: Optional[str], kind: str, value: str) -> None:
+    if not ENABLED or not body_sha:
+        return
+    try:  # orphans (body never stored) are swept by the next eviction
+        _db().execute("INSERT OR REPLACE INTO derived (body_sha, kind, value) VALUES (?, ?, ?)",
+                      (body_sha, kind, value))
+    except sqlite3.Error:
+        pass
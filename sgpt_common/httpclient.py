@@ -0,0 +1,346 @@
+# ~/.config/shell_gpt/functions/sgpt_common/httpclient.py
+"""
+Pooled HTTP/1.1 client shared by the web_* functions.
+
+- keep-alive connections are pooled per (scheme, host, port, proxy) and
+  reused across calls within one sgpt process;
+- one SSL context is built lazily and shared;
+- gzip/deflate bodies are decompressed transparently while streaming;
+- redirects are followed, HTTP(S)_PROXY / NO_PROXY are honoured.
+
+Errors mirror urllib's: ``HTTPError`` (status >= 400, has ``code`` and
+``reason``) and ``URLError`` (network failure, has ``reason``).
+"""
+import codecs, http.client, os, threading, time, zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from . import trace
+
+UA = "ShellGPT-Web/1.0 (+https://github.com/TheR1D/shell_gpt)"
+MAX_IDLE_PER_HOST = int(os.environ.get("SGPT_HTTP_MAX_IDLE_PER_HOST", "4"))
+IDLE_TIMEOUT_SEC = float(os.environ.get("SGPT_HTTP_IDLE_TIMEOUT", "60"))
+MAX_REDIRECTS = 5
+_CHUNK = 65536
+_DRAIN_MAX = 64 * 1024  # unread bodies up to this size are drained so the socket can be reused
+_REDIRECTS = (301, 302, 303, 307, 308)
+_RETRYABLE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+              ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+class HTTPError(Exception):
+    def __init__(self, url: str, code: int, reason: str, headers=None):
+        super().__init__(f"HTTP Error {code}: {reason}")
+        self.url, self.code, self.reason, self.headers = url, code, reason, headers
+
+
+class URLError(Exception):
+    def __init__(self, reason):
+        super().__init__(f"<urlopen error {reason}>")
+        self.reason = reason
+
+
+_ssl_ctx = None
+_ssl_lock = threading.Lock()
+
+
+def ssl_context():
+    global _ssl_ctx
+    if _ssl_ctx is None:
+        with _ssl_lock:
+            if _ssl_ctx is None:
+                import ssl
+                _ssl_ctx = ssl.create_default_context()
+    return _ssl_ctx
+
+
+def _proxy_for(scheme: str, host: str) -> Optional[str]:
+    import urllib.request
+    proxies = urllib.request.getproxies_environment()
+    if not proxies.get(scheme) or urllib.request.proxy_bypass_environment(host, proxies):
+        return None
+    return proxies[scheme]
+
+
+class _Decoder:
+    """Streaming gzip/deflate decoder; ``deflate`` may be zlib-wrapped or raw."""
+
+    def __init__(self, encoding: str):
+        self.raw_deflate = encoding == "deflate"
+        self.d = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding in ("gzip", "x-gzip")
+                                    else zlib.MAX_WBITS)
+        self.started = False
+
+    def decode(self, data: bytes) -> bytes:
+        if self.raw_deflate and not self.started and data:
+            self.started = True
+            try:
+                return self.d.decompress(data)
+            except zlib.error:  # some servers send raw deflate without the zlib header
+                self.d = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self.d.decompress(data)
+
+    def flush(self) -> bytes:
+        return self.d.flush()
+
+
+class Response:
+    """
+    A streamed response. ``read``/``iter_chunks`` return decoded bytes.
+    Closing it hands the connection back to the pool when the body was
+    fully read (or was small enough to drain); otherwise the socket is closed.
+    """
+
+    def __init__(self, pool: "Pool", key: tuple, conn, raw: http.client.HTTPResponse, url: str):
+        self.pool, self.key, self.conn, self.raw, self.url = pool, key, conn, raw, url
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers
+        enc = (raw.getheader("Content-Encoding") or "").strip().lower()
+        self._decoder = _Decoder(enc) if enc in ("gzip", "x-gzip", "deflate") else None
+        self._buf = bytearray()
+        self._eof = False
+        self.raw_bytes = 0  # bytes received off the wire (before decoding)
+
+    @property
+    def length(self) -> Optional[int]:
+        """Declared body size, or None if unknown or content-encoded."""
+        if self._decoder is not None:
+            return None
+        try:
+            return int(self.headers.get("Content-Length"))
+        except (TypeError, ValueError):
+            return None
+
+    def _fill(self) -> bool:
+        """Pull one wire chunk into the buffer; False at end of body."""
+        if self._eof:
+            return False
+        data = self.raw.read1(_CHUNK) if hasattr(self.raw, "read1") else self.raw.read(_CHUNK)
+        if not data:
+            self._eof = True
+            if self._decoder is not None:
+                self._buf += self._decoder.flush()
+            return False
+        self.raw_bytes += len(data)
+        self._buf += self._decoder.decode(data) if self._decoder is not None else data
+        return True
+
+    def _take(self, n: int) -> bytes:
+        out = bytes(self._buf[:n]) if n >= 0 else bytes(self._buf)
+        del self._buf[: len(out)]
+        return out
+
+    def read(self, n: int = -1) -> bytes:
+        while (n < 0 or len(self._buf) < n) and self._fill():
+            pass
+        return self._take(n)
+
+    def read1(self, n: int = _CHUNK) -> bytes:
+        """Whatever is available next (at most ``n`` bytes), b'' at end of body."""
+        while not self._buf and self._fill():
+            pass
+        return self._take(n)
+
+    def iter_chunks(self, size: int = _CHUNK):
+        while True:
+            chunk = self.read1(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        trace.count("net_read_bytes", self.raw_bytes)
+        reusable = not self.raw.will_close
+        if reusable and not self.raw.isclosed():
+            try:
+                drained = 0
+                while drained <= _DRAIN_MAX:
+                    data = self.raw.read(_CHUNK)
+                    if not data:
+                        break
+                    drained += len(data)
+                reusable = self.raw.isclosed()
+            except (OSError, http.client.HTTPException):
+                reusable = False
+        if reusable:
+            self.pool._release(self.key, conn)
+        else:
+            self.raw.close()
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Pool:
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST,
+                 idle_timeout: float = IDLE_TIMEOUT_SEC):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[tuple, List[Tuple[object, float]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "connections": 0, "reused": 0}
+
+    def _acquire(self, key: tuple, timeout: float):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, since = idle.pop()
+                if now - since < self.idle_timeout and conn.sock is not None:
+                    self.stats["reused"] += 1
+                    conn.timeout = timeout
+                    conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+            self.stats["connections"] += 1
+        scheme, host, port, proxy = key
+        if proxy:
+            p = urlsplit(proxy)
+            target = (p.hostname, p.port or (443 if p.scheme == "https" else 80))
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(*target, timeout=timeout, context=ssl_context())
+                conn.set_tunnel(host, port)
+            else:
+                conn = http.client.HTTPConnection(*target, timeout=timeout)
+        elif scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=ssl_context())
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        return conn, False
+
+    def _release(self, key: tuple, conn) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for idle in self._idle.values():
+                for conn, _ in idle:
+                    conn.close()
+            self._idle.clear()
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], timeout: float,
+              body: Optional[bytes]) -> Response:
+        u = urlsplit(url)
+        scheme = u.scheme.lower()
+        if scheme not in ("http", "https") or not u.hostname:
+            raise URLError(f"unsupported URL: {url}")
+        port = u.port or (443 if scheme == "https" else 80)
+        proxy = _proxy_for(scheme, u.hostname)
+        key = (scheme, u.hostname, port, proxy)
+        path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        if proxy and scheme == "http":
+            path = url  # plain-HTTP proxies take the absolute URL
+        hdrs = {"Host": u.netloc.rsplit("@", 1)[-1], **headers}
+        for attempt in (0, 1):
+            conn, reused = self._acquire(key, timeout)
+            try:
+                if not reused:
+                    with trace.span("http.connect", host=u.hostname, tls=scheme == "https"):
+                        conn.connect()
+                with trace.span("http.first_byte", host=u.hostname, reused=reused) as sp:
+                    conn.request(method, path, body=body, headers=hdrs)
+                    raw = conn.getresponse()
+                    sp.set(status=raw.status)
+            except _RETRYABLE as e:
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # the server dropped an idle keep-alive socket; retry on a new one
+                raise URLError(e)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise URLError(getattr(e, "reason", None) or e)
+            self.stats["requests"] += 1
+            return Response(self, key, conn, raw, url)
+        raise URLError("connection failed")  # not reached
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                timeout: float = 20, body: Optional[bytes] = None,
+                max_redirects: int = MAX_REDIRECTS) -> Response:
+        """
+        Send a request, following redirects. Adds ``User-Agent`` (if absent)
+        and ``Accept-Encoding: gzip, deflate`` (if absent). Raises HTTPError
+        for status >= 400 and URLError for network failures.
+        """
+        hdrs = {k: v for k, v in (headers or {}).items()}
+        lower = {k.lower() for k in hdrs}
+        if "user-agent" not in lower:
+            hdrs["User-Agent"] = UA
+        if "accept-encoding" not in lower:
+            hdrs["Accept-Encoding"] = "gzip, deflate"
+        for _ in range(max_redirects + 1):
+            resp = self._send(method, url, hdrs, timeout, body)
+            location = resp.headers.get("Location")
+            if resp.status in _REDIRECTS and location:
+                resp.close()
+                url = urljoin(url, location)
+                if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                    method, body = "GET", None
+                continue
+            if resp.status >= 400:
+                resp.close()
+                raise HTTPError(url, resp.status, resp.reason, resp.headers)
+            return resp
+        raise HTTPError(url, 310, "Too many redirects")
+
+
+POOL = Pool()
+
+
+def request(method: str, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 20, body: Optional[bytes] = None) -> Response:
+    return POOL.request(method, url, headers, timeout, body)
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 20,
+        user_agent: Optional[str] = None) -> Response:
+    """GET via the shared pool; ``user_agent`` overrides the default UA."""
+    headers = dict(headers or {})
+    if user_agent:
+        headers.setdefault("User-Agent", user_agent)
+    return POOL.request("GET", url, headers, timeout)
+
+
+def iter_text(resp, max_bytes: Optional[int] = None, size: int = _CHUNK):
+    """
+    Decode a response body incrementally (``charset(resp)``, errors replaced),
+    yielding str chunks as they arrive; stops after ``max_bytes`` decoded bytes.
+    Multi-byte sequences split across chunks are handled by the decoder.
+    """
+    dec = codecs.getincrementaldecoder(charset(resp))(errors="replace")
+    seen = 0
+    while max_bytes is None or seen < max_bytes:
+        chunk = resp.read1(size if max_bytes is None else min(size, max_bytes - seen))
+        if not chunk:
+            tail = dec.decode(b"", final=True)
+            if tail:
+                yield tail
+            return
+        seen += len(chunk)
+        text = dec.decode(chunk)
+        if text:
+            yield text
+
+
+def charset(resp: Response, default: str = "utf-8") -> str:
+    ctype = resp.headers.get("Content-Type", "")
+    for part in ctype.split(";")[1:]:
+        k, _, v = part.strip().partition("=")
+        if k.lower() == "charset" and v:
+            try:
+                return codecs.lookup(v.strip('"\'')).name
+            except LookupError:
+                break
+    return default
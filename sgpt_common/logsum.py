@@ -0,0 +1,282 @@
+# ~/.config/shell_gpt/functions/sgpt_common/logsum.py
+"""
+Log-aware streaming summariser for ``remember``.
+
+Lines are fed one at a time and memory stays bounded:
+
+- consecutive lines that are identical once digits and hex runs are
+  masked (timestamps, ids, counters) collapse into one line with a count;
+- the first and last runs are kept up to a share of the character budget;
+- every line that looks like an error or warning is kept, deduplicated by
+  its masked form across the whole stream with a total count;
+- output that fits in ``max_chars`` as it is comes back verbatim;
+- otherwise ``text()`` fits the result to ``max_chars``: head, then errors and
+  warnings (errors first) in stream order, then tail, with the number of
+  omitted lines between them.
+
+Lines are handled in blocks: one regex pass masks a whole block,
+and the error/warning patterns run once per block, so per-line work is a
+key comparison and hundreds of MB stream through in linear time. Only
+error/warning lines get the stricter regex mask used to deduplicate them.
+"""
+import os, re
+from collections import deque
+from typing import Dict, List, Optional
+
+from . import defaults
+
+# "lines" switches remember back to the plain head/tail summary (capture.HeadTail).
+ENABLED = os.environ.get("SGPT_REMEMBER_SUMMARY", "log").lower() != "lines"
+MAX_CHARS = defaults.SUMMARY_CHARS
+MAX_LINE_CHARS = 4096
+_MAX_NOTABLE = 2000  # distinct error/warning lines remembered
+_HEAD_SHARE = 0.3
+_TAIL_SHARE = 0.3
+
+_MASK = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"   # ISO time
+    r"|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +\d{1,2} \d{2}:\d{2}:\d{2}"  # syslog
+    r"|\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?"
+    r"|\b[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}\b"                         # UUID
+    r"|\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-f]*\d)[0-9a-f]{6,}\b"                                 # hex ids
+    r"|\d+"
+)
+_ERROR = re.compile(r"\b(?:error|errors|err|fatal|fail|failed|failure|failures|exception|traceback|"
+                    r"panic|critical|crit|emerg|segfault|denied|refused|abort|aborted|"
+                    r"killed|oom|unreachable|timed out)\b", re.I)
+_WARN = re.compile(r"\bwarn(?:ing|ings)?\b|\bdeprecat", re.I)
+# Substrings every error/warning match contains; plain ``in`` tests on
+# lowercased text rule most blocks and lines out far faster than the regexes.
+_HINTS = ("err", "fatal", "fail", "exception", "traceback", "panic", "crit", "emerg", "segfault",
+          "denied", "refused", "abort", "killed", "oom", "unreachable", "timed out", "warn",
+          "deprecat")
+
+
+def _hinted(text: str) -> bool:
+    low = text.lower()
+    return any(h in low for h in _HINTS)
+
+
+# Whole tokens of digits and lowercase hex that contain a digit (ids,
+# hashes, counters), and any other digit run (inside timestamps, "12ms").
+_RUN_MASK = re.compile(r"\b[a-f]*\d[0-9a-f]*\b|\d+")
+
+
+def _run_keys(text: str) -> str:
+    """Cheap mask for run detection: numbers and hex ids become ``#``, words stay."""
+    return _RUN_MASK.sub("#", text)
+
+
+def mask(line: str) -> str:
+    """The line with timestamps, ids and numbers replaced by ``#``."""
+    return _MASK.sub("#", line)
+
+
+def level(line: str) -> int:
+    """2 for error-like lines, 1 for warnings, else 0."""
+    if not _hinted(line):
+        return 0
+    return 2 if _ERROR.search(line) else 1 if _WARN.search(line) else 0
+
+
+class _Run:
+    __slots__ = ("text", "key", "count", "first", "level", "note")
+
+    def __init__(self, text: str, key: str, count: int, first: int, level: int):
+        self.text, self.key, self.count, self.first, self.level = text, key, count, first, level
+        self.note: Optional[str] = mask(text) if level else None  # key among notable lines
+
+    @property
+    def end(self) -> int:
+        return self.first + self.count - 1
+
+    def render(self, width: int, total: bool = False) -> str:
+        line = self.text if len(self.text) <= width else self.text[: width - 1] + "…"
+        if self.count > 1:
+            line += f"  [seen {self.count}×]" if total else f"  [×{self.count}]"
+        return line
+
+
+class LogSummary:
+    """
+    Drop-in for ``capture.HeadTail`` (``feed``, ``feed_lines``, ``skip``,
+    ``text``, ``chars``) that budgets characters instead of lines.
+    """
+
+    needs_middle = True  # errors can be anywhere, so files are read in full
+
+    def __init__(self, max_chars: int = MAX_CHARS):
+        self.max_chars = max(200, max_chars)
+        self.head: List[_Run] = []
+        self.tail: deque = deque()
+        self.notable: Dict[str, _Run] = {}
+        self.notable_dropped = 0
+        self.notable_dropped_on_render = 0
+        self.lines = 0          # lines fed or skipped
+        self.chars = 0          # every char fed, newlines included
+        self._cur: Optional[_Run] = None
+        self._head_chars = self._tail_chars = 0
+        self._head_open = True
+        self._head_budget = int(self.max_chars * _HEAD_SHARE)
+        self._tail_budget = int(self.max_chars * _TAIL_SHARE)
+        self._width = max(80, self.max_chars // 6)  # kept lines are cut to this
+        self._verbatim: Optional[List[str]] = []  # until the output outgrows the budget
+
+    def _overflow(self) -> None:
+        self._verbatim = None
+
+    def feed(self, line: str) -> None:
+        self.feed_lines([line])
+
+    def feed_lines(self, lines: List[str]) -> None:
+        self.chars += sum(map(len, lines)) + len(lines)
+        lines = [ln.rstrip()[:MAX_LINE_CHARS] for ln in lines]
+        if self._verbatim is not None:
+            if self.chars > self.max_chars:
+                self._overflow()
+            else:
+                self._verbatim.extend(lines)
+        block = "\n".join(lines)
+        flagged = _hinted(block)
+        n = self.lines
+        for line, key in zip(lines, _run_keys(block).split("\n")):
+            n += 1
+            cur = self._cur
+            if cur is not None and key == cur.key:
+                cur.count += 1
+                if cur.note is not None:
+                    nt = self.notable.get(cur.note)
+                    if nt is not None:
+                        nt.count += 1
+                continue
+            self._add(_Run(line, key, 1, n, level(line) if flagged and line else 0))
+        self.lines = n
+
+    def feed_text(self, text: str) -> None:
+        for line in text.split("\n"):
+            self.feed(line)
+        self.chars -= 1  # split() adds no trailing newline
+
+    def skip(self, n: int, chars: int = 0) -> None:
+        """Account for ``n`` lines that passed by without being looked at."""
+        if n <= 0:
+            return
+        self._close()
+        self._overflow()
+        self._head_open = False
+        self.lines += n
+        self.chars += chars
+
+    def replace(self, i: int, line: str) -> None:
+        """Rewrite the ``i``-th kept head line (used to fill in a command's exit code)."""
+        self._close()
+        if self._verbatim is not None and i < len(self._verbatim):
+            self._verbatim[i] = line
+        if i < len(self.head):
+            self.head[i].text = line
+
+    def _add(self, run: _Run) -> None:
+        self._close()
+        self._cur = run
+        if run.note is not None:
+            nt = self.notable.get(run.note)
+            if nt is not None:
+                nt.count += run.count
+            elif len(self.notable) < _MAX_NOTABLE:
+                self.notable[run.note] = _Run(run.text, run.key, run.count, run.first, run.level)
+            else:
+                self.notable_dropped += 1
+
+    def _close(self) -> None:
+        run, self._cur = self._cur, None
+        if run is None:
+            return
+        size = min(len(run.text), self._width) + 12
+        if self._head_open and self._head_chars + size <= self._head_budget:
+            self.head.append(run)
+            self._head_chars += size
+            return
+        self._head_open = False
+        self.tail.append(run)
+        self._tail_chars += size
+        while len(self.tail) > 1 and self._tail_chars > self._tail_budget:
+            self._tail_chars -= min(len(self.tail[0].text), self._width) + 12
+            self.tail.popleft()
+
+    def replay(self, into) -> None:
+        """Feed what this summary kept into another one, with gaps for what it dropped."""
+        self._close()
+        at = 0
+        for run, notable in self._items(None):
+            into.skip(run.first - at - 1)
+            into.feed(run.text)
+            extra = run.count - 1
+            if extra and not notable:  # the rest of the run, without feeding it line by line
+                into._cur.count += extra
+                into.lines += extra
+                into.chars += extra * (len(run.text) + 1)
+            if extra and into._cur.note is not None:
+                nt = into.notable.get(into._cur.note)
+                if nt is not None:
+                    nt.count += extra
+            at = run.first if notable else run.end
+        into.skip(self.lines - at)
+
+    def _items(self, width: Optional[int]):
+        """(run, is_notable) for head, notable and tail, in stream order, within the budget."""
+        head = list(self.head)
+        tail = list(self.tail)
+        if self._cur is not None:
+            (head if self._head_open and not tail else tail).append(self._cur)
+        head_end = head[-1].end if head else 0
+        tail_start = tail[0].first if tail else self.lines + 1
+        notable = [r for r in self.notable.values() if head_end < r.first < tail_start]
+        if width is not None:
+            # Each run costs its text plus a count; each notable line may add an
+            # omission marker. Errors and warnings get at least half the budget.
+            def cost(r, extra=12):
+                return min(len(r.text), width) + extra
+            budget = self.max_chars - 80
+            ends = sum(map(cost, head + tail))
+            room = max(budget - ends, budget // 2)
+            picked = []
+            for r in sorted(notable, key=lambda r: (-r.level, r.first)):
+                if cost(r, 50) <= room:
+                    room -= cost(r, 50)
+                    picked.append(r)
+            self.notable_dropped_on_render = len(notable) - len(picked)
+            notable = picked
+            left = budget - sum(cost(r, 50) for r in notable)
+            while head and tail and ends > left:  # trim the ends, larger side first
+                side = head if sum(map(cost, head)) > sum(map(cost, tail)) else tail
+                ends -= cost(side.pop() if side is head else side.pop(0))
+            while (head or tail) and ends > left:
+                ends -= cost(head.pop() if head else tail.pop(0))
+        out = [(r, False) for r in head] + [(r, True) for r in notable] + [(r, False) for r in tail]
+        out.sort(key=lambda x: x[0].first)
+        return out
+
+    def text(self) -> str:
+        if self._verbatim is not None:
+            return "\n".join(self._verbatim).strip("\n")
+        width = self._width
+        items = self._items(width)
+        while items and not items[0][0].text:
+            items.pop(0)  # blank lines at either end say nothing
+        while items and not items[-1][0].text:
+            items.pop()
+        parts: List[str] = []
+        at = items[0][0].first - 1 if items else 0
+        for run, total in items:
+            if run.first > at + 1:
+                parts.append(f"… [{run.first - at - 1} lines omitted] …")
+            if run.text:
+                parts.append(run.render(width, total))
+            elif parts and parts[-1]:
+                parts.append("")
+            at = max(at, run.first if total else run.end)
+        hidden = self.notable_dropped_on_render + self.notable_dropped
+        if hidden:
+            parts.append(f"[{hidden} more distinct error/warning lines not shown]")
+        out = "\n".join(parts)
+        return out if len(out) <= self.max_chars else out[: self.max_chars - 1] + "…"
@@ -0,0 +1,267 @@
+# ~/.config/shell_gpt/functions/sgpt_common/proc.py
+"""
+Streaming command runner with an output cap and a wall-clock timeout.
+
+Output is read incrementally; only a head excerpt and a tail ring are kept,
+so memory stays bounded however much a command prints. A command that runs
+past its deadline or prints more than ``max_bytes`` is stopped together
+with everything it spawned (it runs in its own process group).
+
+With ``SGPT_SHELL_PERSISTENT=1`` commands go to one long-lived bash worker
+per process instead of a fresh shell each time: login profiles are read
+once, and ``cd``/``export`` carry over between calls.
+"""
+import atexit, os, selectors, shlex, signal, subprocess, threading, time, uuid
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from . import defaults, trace
+
+TIMEOUT_SEC = defaults.SHELL_TIMEOUT_SEC
+MAX_BYTES = defaults.SHELL_MAX_BYTES
+EXCERPT_BYTES = int(os.environ.get("SGPT_SHELL_EXCERPT_BYTES", str(32 * 1024)))
+PERSISTENT = defaults.SHELL_PERSISTENT
+WORKER_SHELL = os.environ.get("SGPT_SHELL_WORKER", "bash -l")
+_KILL_GRACE_SEC = 2.0
+
+
+class RunResult(NamedTuple):
+    exit_code: Optional[int]
+    head: bytes
+    tail: bytes
+    total_bytes: int
+    duration: float
+    stopped: Optional[str]  # why the command was stopped, or None
+
+    @property
+    def omitted(self) -> int:
+        return self.total_bytes - len(self.head) - len(self.tail)
+
+    def output(self, errors: str = "replace") -> str:
+        """Whole output if it was kept, else head + omission marker + tail."""
+        head = self.head.decode(errors=errors)
+        if not self.omitted:
+            return head + self.tail.decode(errors=errors)
+        return (f"{head}\n… [{self.omitted} bytes omitted] …\n"
+                f"{self.tail.decode(errors=errors)}")
+
+    def stats(self) -> str:
+        s = f"bytes={self.total_bytes}, duration={self.duration:.2f}s"
+        return s + (f", stopped: {self.stopped}" if self.stopped else "")
+
+
+def kill_group(p: subprocess.Popen) -> None:
+    """SIGTERM the process group, then SIGKILL whatever is left after a grace period."""
+    for sig, wait in ((signal.SIGTERM, _KILL_GRACE_SEC), (signal.SIGKILL, None)):
+        try:
+            os.killpg(p.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        try:
+            p.wait(timeout=wait)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def _wait(p: subprocess.Popen, deadline: float, timeout: float) -> Tuple[Optional[int], Optional[str]]:
+    """Exit code of ``p``, killing its process group if it runs past the deadline."""
+    try:
+        return p.wait(timeout=max(0.0, deadline - time.monotonic())), None
+    except subprocess.TimeoutExpired:
+        kill_group(p)
+        return p.wait(), f"timeout after {timeout:g}s"
+
+
+class _Excerpt:
+    """Head bytes plus a tail ring; ``feed`` it chunks as they arrive."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.head = bytearray()
+        self.tail = bytearray()
+
+    def __call__(self, chunk: bytes) -> None:
+        room = self.size - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            if len(self.tail) > 2 * self.size:
+                del self.tail[: -self.size]
+
+    def tail_bytes(self) -> bytes:
+        return bytes(self.tail[-self.size :]) if self.size else b""
+
+
+def _pump(fd: int, feed: Callable[[bytes], None], deadline: float, timeout: float,
+          max_bytes: int, marker: Optional[bytes] = None) -> Tuple[int, Optional[str], Optional[bytes]]:
+    """
+    Read ``fd`` until EOF, the deadline, the byte cap, or a ``marker`` line.
+    Returns (bytes fed, stop reason, text after the marker up to its newline).
+    """
+    total = 0
+    pending = b""  # tail held back in case it is the start of the marker
+    os.set_blocking(fd, False)
+    with selectors.DefaultSelector() as sel:
+        sel.register(fd, selectors.EVENT_READ)
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return total, f"timeout after {timeout:g}s", None
+            if not sel.select(timeout=left):
+                continue
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                continue
+            if not chunk:
+                if pending:
+                    feed(pending)
+                    total += len(pending)
+                return total, None, None
+            if marker is not None:
+                buf = pending + chunk
+                i = buf.find(marker)
+                if i >= 0 and buf.find(b"\n", i + len(marker)) >= 0:
+                    feed(buf[:i])
+                    total += i
+                    end = buf.find(b"\n", i + len(marker))
+                    return total, None, buf[i + len(marker) : end]
+                keep = len(buf) - i if i >= 0 else min(len(buf), len(marker))
+                chunk, pending = buf[: len(buf) - keep], buf[len(buf) - keep :]
+            feed(chunk)
+            total += len(chunk)
+            if total > max_bytes:
+                return total, f"output exceeded {max_bytes} bytes", None
+
+
+class ShellWorker:
+    """
+    One long-lived shell fed commands over a pipe. Each command is wrapped
+    as ``eval '<cmd>'`` and followed by a random sentinel line carrying the
+    exit code and ``$PWD``, which frames its output. If the shell dies, or
+    a command has to be killed, the next call starts a fresh shell in the
+    last known working directory (exported variables do not survive that).
+    Output a background job prints after its command returned is dropped
+    when the next command starts, or mixed into that command's output if
+    it arrives while the command runs; redirect such jobs to a file.
+    """
+
+    def __init__(self, argv: Optional[list] = None):
+        self.argv = argv or shlex.split(WORKER_SHELL)
+        self.cwd: Optional[str] = None
+        self.p: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure(self) -> subprocess.Popen:
+        if self.p is None or self.p.poll() is not None:
+            self.p = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, start_new_session=True,
+                                      cwd=self.cwd if self.cwd and os.path.isdir(self.cwd) else None)
+        return self.p
+
+    def close(self) -> None:
+        if self.p is not None and self.p.poll() is None:
+            kill_group(self.p)
+        self.p = None
+
+    def run(self, command: str, feed: Callable[[bytes], None], timeout: float,
+            max_bytes: int) -> Tuple[Optional[int], int, Optional[str]]:
+        """Returns (exit code, bytes of output, stop reason)."""
+        with self._lock:
+            p = self._ensure()
+            deadline = time.monotonic() + timeout
+            marker = f"\n__SGPT_DONE_{uuid.uuid4().hex}__ ".encode()
+            script = (f"eval {shlex.quote(command)} </dev/null 2>&1\n"
+                      f"printf '%s%d %s\\n' {shlex.quote(marker.decode())} \"$?\" \"$PWD\"\n")
+            if not self._discard_pending(p):
+                self.close()
+                p = self._ensure()
+            try:
+                p.stdin.write(script.encode())
+                p.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self.close()
+                p = self._ensure()
+                p.stdin.write(script.encode())
+                p.stdin.flush()
+            total, stopped, status = _pump(p.stdout.fileno(), feed, deadline, timeout,
+                                           max_bytes, marker)
+            if status is not None:
+                code, _, cwd = status.decode(errors="replace").partition(" ")
+                self.cwd = cwd or self.cwd
+                return int(code), total, None
+            if stopped:
+                self.close()
+                return -signal.SIGTERM, total, stopped
+            # EOF: the command ended the shell itself (e.g. `exit 3`) or closed its output.
+            code, stopped = _wait(p, deadline, timeout)
+            self.p = None
+            return code, total, stopped
+
+    @staticmethod
+    def _discard_pending(p: subprocess.Popen) -> bool:
+        """
+        Drop output that arrived since the last command returned (a background
+        job it started printing late). False if the shell closed its output.
+        """
+        fd = p.stdout.fileno()
+        os.set_blocking(fd, False)
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                return True
+            if not chunk:
+                return False
+
+
+_worker: Optional[ShellWorker] = None
+_worker_lock = threading.Lock()
+
+
+def worker() -> ShellWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ShellWorker()
+            atexit.register(_worker.close)
+        return _worker
+
+
+def stream(command: str, feed: Callable[[bytes], None], timeout: float = TIMEOUT_SEC,
+           max_bytes: int = MAX_BYTES, persistent: bool = PERSISTENT
+           ) -> Tuple[Optional[int], int, Optional[str]]:
+    """
+    Run ``command`` (stderr merged into stdout) and pass output chunks to
+    ``feed`` as they arrive. Returns (exit code, bytes of output, stop reason).
+    """
+    with trace.span("proc.run", persistent=persistent) as sp:
+        if persistent:
+            code, total, stopped = worker().run(command, feed, timeout, max_bytes)
+        else:
+            p = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                 start_new_session=True)
+            deadline = time.monotonic() + timeout
+            total, stopped, _ = _pump(p.stdout.fileno(), feed, deadline, timeout, max_bytes)
+            if stopped:
+                kill_group(p)
+            p.stdout.close()
+            if stopped:
+                code = p.wait()
+            else:  # EOF, but the command may have only closed or redirected its output
+                code, stopped = _wait(p, deadline, timeout)
+        sp.set(exit=code, bytes=total)
+    return code, total, stopped
+
+
+def run(command: str, timeout: float = TIMEOUT_SEC, max_bytes: int = MAX_BYTES,
+        excerpt: int = EXCERPT_BYTES, persistent: bool = PERSISTENT) -> RunResult:
+    """``stream`` into a head/tail excerpt."""
+    start = time.monotonic()
+    ex = _Excerpt(excerpt)
+    code, total, stopped = stream(command, ex, timeout, max_bytes, persistent)
+    return RunResult(code, bytes(ex.head), ex.tail_bytes(), total,
+                     time.monotonic() - start, stopped)
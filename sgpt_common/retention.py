@@ -0,0 +1,108 @@
+# ~/.config/shell_gpt/functions/sgpt_common/retention.py
+"""
+Retention and compaction for the memory store.
+
+A policy has up to three limits, each off when 0:
+
+- ``ttl_days``: entries created longer ago than this expire;
+- ``max_entries`` and ``max_bytes``: above either, entries are evicted
+  least recently used first (last read by ``memory``, else creation time).
+
+Pinned entries are never removed and do not count as evictable. Entry
+size is title + summary + kept raw text, uncompressed. ``remember``
+applies the policy from the environment after each insert;
+``memory_compact`` applies it on demand, then sweeps raw blobs no memory
+points at and rewrites the database file.
+"""
+import os, sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from . import blobs, store, vectors
+
+_SIZE = ("length(CAST(title AS BLOB)) + length(CAST(summary AS BLOB)) + "
+         "CASE WHEN blob IS NOT NULL THEN raw_len ELSE 0 END")
+_LRU = "ORDER BY coalesce(accessed, created), id"
+
+
+class Policy(NamedTuple):
+    max_entries: int = 0
+    max_bytes: int = 0
+    ttl_days: float = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.max_entries or self.max_bytes or self.ttl_days)
+
+
+POLICY = Policy(
+    max_entries=int(os.environ.get("SGPT_MEMORY_MAX_ENTRIES", "0")),
+    max_bytes=int(os.environ.get("SGPT_MEMORY_MAX_BYTES", "0")),
+    ttl_days=float(os.environ.get("SGPT_MEMORY_TTL_DAYS", "0")),
+)
+
+
+def enforce(conn: sqlite3.Connection, policy: Policy = POLICY,
+            keep: Iterable[int] = ()) -> Dict[str, int]:
+    """
+    Apply ``policy`` inside the caller's write transaction, never removing
+    ids in ``keep``. Returns how many entries each rule removed.
+    """
+    keep = {int(x) for x in keep}
+    removed = {"ttl": 0, "entries": 0, "bytes": 0}
+    if policy.ttl_days:
+        cutoff = (datetime.utcnow() - timedelta(days=policy.ttl_days)).isoformat() + "Z"
+        ids = [r[0] for r in conn.execute(
+            "SELECT id FROM memories WHERE pinned = 0 AND created < ?", (cutoff,))]
+        removed["ttl"] = _delete(conn, ids, keep)
+    if policy.max_entries:
+        excess = store.count(conn) - policy.max_entries
+        if excess > 0:
+            ids = [r[0] for r in conn.execute(
+                f"SELECT id FROM memories WHERE pinned = 0 {_LRU} LIMIT ?", (excess + len(keep),))]
+            removed["entries"] = _delete(conn, [i for i in ids if i not in keep][:excess], keep)
+    if policy.max_bytes:
+        excess = conn.execute(f"SELECT coalesce(sum({_SIZE}), 0) FROM memories").fetchone()[0] \
+            - policy.max_bytes
+        ids: List[int] = []
+        if excess > 0:
+            for id, size in conn.execute(f"SELECT id, {_SIZE} FROM memories WHERE pinned = 0 {_LRU}"):
+                if excess <= 0:
+                    break
+                if id not in keep:
+                    ids.append(id)
+                    excess -= size
+        removed["bytes"] = _delete(conn, ids, keep)
+    return removed
+
+
+def _delete(conn: sqlite3.Connection, ids: List[int], keep: set) -> int:
+    ids = [i for i in ids if i not in keep]
+    return store.delete(ids, conn) if ids else 0
+
+
+def _disk_usage() -> int:
+    total = blobs.disk_usage()
+    for p in (store.DB_PATH, store.DB_PATH + "-wal", *vectors._paths(store.DB_PATH)):
+        try:
+            total += os.path.getsize(p)
+        except OSError:
+            pass
+    return total
+
+
+def compact(policy: Optional[Policy] = None) -> dict:
+    """
+    Apply ``policy`` (default: the environment's), sweep orphaned blobs and
+    VACUUM. Safe while other processes use the store: deletions go through
+    the normal write path, fresh blobs are left alone, and VACUUM only
+    makes writers wait.
+    """
+    before = _disk_usage()
+    policy = POLICY if policy is None else policy
+    removed = store.write(lambda db: enforce(db, policy)) if policy.active else {}
+    blob_files, blob_bytes = blobs.sweep(store.blob_refs())
+    store.vacuum()
+    after = _disk_usage()
+    return {"before": before, "after": after, "removed": removed,
+            "blob_files": blob_files, "blob_bytes": blob_bytes, "entries": store.count()}
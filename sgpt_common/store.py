@@ -0,0 +1,597 @@
+# ~/.config/shell_gpt/functions/sgpt_common/store.py
+"""
+SQLite (WAL) storage for the memory functions.
+
+Entries keep the shape of the old JSON list items
+(id, created, title, summary, raw_len) plus ``blob``, the SHA-256 of the
+raw text in ``blobs`` (or None), ``accessed`` (last read, for LRU
+retention) and ``pinned``; the legacy ``SGPT_MEMORY_FILE`` is imported
+once into the database the first time it is opened.
+"""
+import json, os, re, sqlite3, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from . import trace, vectors
+
+MEMORY_PATH = os.path.expanduser(
+    os.environ.get("SGPT_MEMORY_FILE", "~/.config/shell_gpt/memory.json")
+)
+DB_PATH = os.path.expanduser(
+    os.environ.get("SGPT_MEMORY_DB", os.path.splitext(MEMORY_PATH)[0] + ".db")
+)
+
+# How long a writer waits for another process's write lock before failing.
+BUSY_TIMEOUT_MS = int(os.environ.get("SGPT_MEMORY_BUSY_TIMEOUT_MS", "30000"))
+# Read results cached per process; 0 disables the cache.
+CACHE_SIZE = int(os.environ.get("SGPT_MEMORY_CACHE_SIZE", "1024"))
+# Reads within this many seconds of the recorded access time are not written back.
+ACCESS_RESOLUTION_SEC = 3600
+
+# What a page cursor's created part looks like (ISO date and time, as now() writes it).
+_CREATED = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ][0-9:.]+)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+FIELDS = ("id", "created", "title", "summary", "raw_len", "blob", "accessed", "pinned")
+_COLS = ", ".join(FIELDS)
+
+# Applied in order; PRAGMA user_version records how many have run.
+_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS memories (
+        id      INTEGER PRIMARY KEY,
+        created TEXT NOT NULL,
+        title   TEXT NOT NULL DEFAULT '',
+        summary TEXT NOT NULL DEFAULT '',
+        raw_len INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """,
+    # Full-text index over title/summary, kept in sync by triggers.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+        title, summary, content='memories', content_rowid='id', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts (memories_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE OF title, summary ON memories BEGIN
+        INSERT INTO memories_fts (memories_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+        INSERT INTO memories_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END;
+    INSERT INTO memories_fts (memories_fts) VALUES ('rebuild');
+    """,
+    # SHA-256 of the raw text kept in the blob store, if any.
+    """
+    ALTER TABLE memories ADD COLUMN blob TEXT;
+    """,
+    # Retention: last access time for LRU eviction, and pinned entries that are never evicted.
+    """
+    ALTER TABLE memories ADD COLUMN accessed TEXT;
+    ALTER TABLE memories ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0;
+    CREATE INDEX IF NOT EXISTS memories_lru ON memories (pinned, coalesce(accessed, created), id);
+    """,
+    # Keyset pagination and date ranges in page().
+    """
+    CREATE INDEX IF NOT EXISTS memories_created ON memories (created, id);
+    """,
+]
+
+T = TypeVar("T")
+
+_local = threading.local()      # per-thread read connections
+_writer: Optional[sqlite3.Connection] = None
+_write_lock = threading.RLock()  # one write transaction per process at a time
+_pending: list = []              # group-commit queue, see write()
+_pending_lock = threading.Lock()
+_migrated = False
+_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_cache_sig: Optional[int] = None
+_cache_lock = threading.Lock()
+_probe: Optional[sqlite3.Connection] = None  # only asked for PRAGMA data_version
+_probe_lock = threading.Lock()
+
+
+def exists() -> bool:
+    return os.path.exists(DB_PATH) or os.path.exists(MEMORY_PATH)
+
+
+def now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _open(check_same_thread: bool = True) -> sqlite3.Connection:
+    global _migrated
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=check_same_thread,
+                           timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    # FULL fsyncs the WAL on every commit; group commit amortises the cost.
+    conn.execute("PRAGMA synchronous=FULL")
+    if not _migrated:
+        with _write_lock:
+            if not _migrated:
+                _migrate(conn)
+                _migrated = True
+    return conn
+
+
+def connect() -> sqlite3.Connection:
+    """
+    This thread's read connection (created and migrated on first use).
+    WAL lets it read while another connection or process is writing.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _open()
+    return conn
+
+
+def _writer_conn() -> sqlite3.Connection:
+    global _writer
+    if _writer is None:
+        _writer = _open(check_same_thread=False)  # only used under _write_lock
+    return _writer
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < len(_MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for script in _MIGRATIONS[version:]:
+                for stmt in _statements(script):
+                    conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version={len(_MIGRATIONS)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    if conn.execute("SELECT 1 FROM meta WHERE key='json_imported'").fetchone() is None:
+        _import_json(conn)
+
+
+def _statements(script: str) -> List[str]:
+    # executescript() would COMMIT our open transaction, so split by hand.
+    out, buf = [], ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            out.append(buf.strip())
+            buf = ""
+    return out
+
+
+def _import_json(conn: sqlite3.Connection) -> None:
+    """One-time import of the legacy JSON list; the JSON file is left untouched."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key='json_imported'").fetchone() is None:
+            items = []
+            if os.path.exists(MEMORY_PATH):
+                try:
+                    with open(MEMORY_PATH, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    items = data if isinstance(data, list) else []
+                except Exception:
+                    items = []
+            for it in items:
+                if not isinstance(it, dict):
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO memories (id, created, title, summary, raw_len) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        int(it["id"]) if it.get("id") is not None else None,
+                        it.get("created") or now(),
+                        it.get("title") or "",
+                        it.get("summary") or "",
+                        int(it.get("raw_len") or 0),
+                    ),
+                )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_imported', ?)",
+                (f"{MEMORY_PATH} ({len(items)} entries)",),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+@contextmanager
+def transaction():
+    """
+    Serialised read-modify-write: BEGIN IMMEDIATE ... COMMIT/ROLLBACK.
+    Holds the process write lock and SQLite's cross-process write lock.
+    """
+    t = trace.clock()
+    with _write_lock:
+        conn = _writer_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        trace.mark("db.lock_wait", t)
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            vectors.discard()
+            raise
+        _finish(conn)
+
+
+def _finish(conn: sqlite3.Connection, **attrs) -> None:
+    """
+    Write the vector index changes queued by this transaction, then COMMIT.
+    Should the COMMIT fail after that, the files are ahead of the data, so
+    the index is marked stale for the next search to rebuild.
+    """
+    flushed = vectors.flush(conn)
+    try:
+        with trace.span("db.commit", **attrs):
+            conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if flushed:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                vectors.mark_stale(conn)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+        raise
+
+
+class _Op:
+    __slots__ = ("fn", "done", "result", "error")
+
+    def __init__(self, fn):
+        self.fn, self.done, self.result, self.error = fn, False, None, None
+
+
+def write(fn: Callable[[sqlite3.Connection], T]) -> T:
+    """
+    Run ``fn(conn)`` in a write transaction and return its result.
+
+    Group commit: callers queue their op, and whichever thread gets the
+    write lock first runs every queued op in one transaction with a single
+    durable COMMIT. Each op runs in its own savepoint, so one raising only
+    rolls back (and re-raises to) its own caller. Ids are assigned under
+    the lock, so they are atomic across threads and processes.
+    """
+    op = _Op(fn)
+    with _pending_lock:
+        _pending.append(op)
+    t = trace.clock()
+    with _write_lock:
+        trace.mark("db.lock_wait", t, lock="process")
+        if not op.done:
+            with _pending_lock:
+                batch = _pending[:]
+                _pending.clear()
+            _commit(batch)
+    if op.error is not None:
+        raise op.error
+    return op.result
+
+
+def _commit(batch: List[_Op]) -> None:
+    conn = _writer_conn()
+    try:
+        t = trace.clock()
+        conn.execute("BEGIN IMMEDIATE")
+        trace.mark("db.lock_wait", t, lock="sqlite")
+        try:
+            for op in batch:
+                conn.execute("SAVEPOINT op")
+                mark = vectors.pending()
+                try:
+                    op.result = op.fn(conn)
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    vectors.discard(mark)
+                    op.error = e
+            _finish(conn, ops=len(batch))
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            vectors.discard()
+            raise
+    except Exception as e:
+        for op in batch:
+            op.result, op.error = None, op.error or e
+    finally:
+        for op in batch:
+            op.done = True
+
+
+def _signature() -> int:
+    # data_version changes whenever another connection (our writer or another
+    # process) commits. Each connection counts separately, so all threads ask
+    # the same one.
+    global _probe
+    with _probe_lock:
+        if _probe is None:
+            _probe = _open(check_same_thread=False)
+        return _probe.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _cached(key: tuple, load):
+    """LRU over read results, dropped wholesale when any connection commits."""
+    global _cache_sig
+    if CACHE_SIZE <= 0:
+        return _query(key, load)
+    sig = _signature()
+    with _cache_lock:
+        if sig != _cache_sig:
+            _cache.clear()
+            _cache_sig = sig
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    value = _query(key, load)
+    with _cache_lock:
+        if sig == _cache_sig:
+            _cache[key] = value
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return value
+
+
+def _query(key: tuple, load):
+    with trace.span("db.query", kind=key[0]):
+        return load()
+
+
+def _copy(value):
+    # Entries are flat dicts; hand out copies so callers cannot poison the cache.
+    if isinstance(value, list):
+        return [dict(v) for v in value]
+    return dict(value) if isinstance(value, dict) else value
+
+
+def _row(r) -> Optional[dict]:
+    return {k: r[k] for k in FIELDS} if r is not None else None
+
+
+def get(id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[dict]:
+    def load():
+        return _row((conn or connect()).execute(
+            f"SELECT {_COLS} FROM memories WHERE id = ?", (int(id),)
+        ).fetchone())
+    # Inside a transaction, always read through to see our own writes.
+    return load() if conn is not None else _copy(_cached(("get", int(id)), load))
+
+
+def get_many(ids: Iterable[int] = (), ranges: Iterable[Tuple[int, int]] = (),
+             limit: int = 200) -> List[dict]:
+    """
+    Entries for ``ids`` and inclusive id ``ranges`` in one read, ordered by
+    id, at most ``limit``. Missing ids are skipped.
+    """
+    t, conn, found = trace.clock(), connect(), {}
+    ids = sorted(set(int(x) for x in ids))
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        for r in conn.execute(
+            f"SELECT {_COLS} FROM memories WHERE id IN ({','.join('?' * len(chunk))})", chunk
+        ):
+            found[r["id"]] = _row(r)
+    for lo, hi in ranges:
+        for r in conn.execute(
+            f"SELECT {_COLS} FROM memories WHERE id BETWEEN ? AND ? ORDER BY id LIMIT ?",
+            (int(lo), int(hi), int(limit)),
+        ):
+            found[r["id"]] = _row(r)
+    trace.mark("db.query", t, kind="get_many", rows=len(found))
+    return [found[k] for k in sorted(found)[:limit]]
+
+
+def page(limit: int, cursor: Optional[str] = None, since: Optional[str] = None,
+         until: Optional[str] = None, title: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of entries, newest first, and the cursor for the next page
+    (None at the end). Keyset pagination over the (created, id) index, so a
+    page costs O(limit) however deep it is; ``since``/``until`` bound
+    ``created`` (ISO prefixes, ``until`` exclusive) and ``title`` is a
+    case-insensitive substring filter.
+    """
+    key = ("page", int(limit), cursor, since, until, title)
+    rows, next_cursor = _cached(key, lambda: _page(limit, cursor, since, until, title))
+    return _copy(rows), next_cursor
+
+
+def _page(limit, cursor, since, until, title) -> Tuple[List[dict], Optional[str]]:
+    where, args = _filters(since, until, title)
+    if cursor:
+        created, _, id = cursor.rpartition("|")
+        if not _CREATED.fullmatch(created):
+            raise ValueError(cursor)
+        where.append("(created, id) < (?, ?)")
+        args += [created, int(id)]
+    sql = (f"SELECT {_COLS} FROM memories {'WHERE ' + ' AND '.join(where) if where else ''} "
+           "ORDER BY created DESC, id DESC LIMIT ?")
+    rows = [_row(r) for r in connect().execute(sql, (*args, int(limit) + 1))]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (f"{rows[-1]['created']}|{rows[-1]['id']}" if more and rows else None)
+
+
+def _filters(since, until, title, table: str = "") -> Tuple[List[str], list]:
+    """WHERE terms and arguments for the created range and title filters."""
+    where, args = [], []
+    if since:
+        where.append(f"{table}created >= ?")
+        args.append(since)
+    if until:
+        where.append(f"{table}created < ?")
+        args.append(until)
+    if title:
+        where.append(f"{table}title LIKE ? ESCAPE '\\'")
+        args.append("%" + re.sub(r"([%_\\])", r"\\\1", title) + "%")
+    return where, args
+
+
+def _match_expr(query: str, op: str) -> str:
+    # Every word becomes a quoted prefix term, so user input never hits FTS syntax.
+    terms = re.findall(r"\w+", query.lower())
+    return f" {op} ".join(f'"{t}"*' for t in terms)
+
+
+def search(query: str, limit: int, cursor: Optional[str] = None, since: Optional[str] = None,
+           until: Optional[str] = None, title: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    BM25-ranked full-text search (title weighted 2x) with prefix matching,
+    one page at a time, and the cursor for the next page (None at the end).
+    All terms must match; if nothing does, any term may. ``since``/``until``
+    and ``title`` filter as in ``page``. Each result carries a ``snippet``
+    with the hits wrapped in [brackets].
+    """
+    key = ("search", query, int(limit), cursor, since, until, title)
+    rows, next_cursor = _cached(key, lambda: _search(query, limit, cursor, since, until, title))
+    return _copy(rows), next_cursor
+
+
+def _search(query, limit, cursor, since, until, title) -> Tuple[List[dict], Optional[str]]:
+    # Ranked results page by offset: "rank|<and|or>|<offset>", so later pages
+    # keep the AND/OR choice made on the first one.
+    ops, offset = ("AND", "OR"), 0
+    if cursor:
+        tag, op, off = (cursor.split("|") + ["", "", ""])[:3]
+        if tag != "rank" or op.upper() not in ops or not off.isdigit():
+            raise ValueError(cursor)
+        ops, offset = (op.upper(),), int(off)
+    where, args = _filters(since, until, title, "m.")
+    conn = connect()
+    for op in ops:
+        expr = _match_expr(query, op)
+        if not expr:
+            return [], None
+        rows = conn.execute(
+            f"SELECT {', '.join('m.' + f for f in FIELDS)}, "
+            "snippet(memories_fts, -1, '[', ']', '…', 12) AS snippet "
+            "FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid "
+            f"WHERE memories_fts MATCH ? {''.join(' AND ' + w for w in where)} "
+            "ORDER BY bm25(memories_fts, 2.0, 1.0), m.id LIMIT ? OFFSET ?",
+            (expr, *args, int(limit) + 1, offset),
+        ).fetchall()
+        if rows or offset:
+            more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = f"rank|{op.lower()}|{offset + len(rows)}" if more else None
+            return [{**_row(r), "snippet": r["snippet"]} for r in rows], next_cursor
+    return [], None
+
+
+def count(conn: Optional[sqlite3.Connection] = None) -> int:
+    def load():
+        return (conn or connect()).execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+    return load() if conn is not None else _cached(("count",), load)
+
+
+def insert(title: str, summary: str, raw_len: int = 0,
+           conn: Optional[sqlite3.Connection] = None, blob: Optional[str] = None) -> dict:
+    if conn is None:
+        return write(lambda c: insert(title, summary, raw_len, c, blob))
+    entry = {"created": now(), "title": title, "summary": summary, "raw_len": int(raw_len),
+             "blob": blob}
+    cur = conn.execute(
+        "INSERT INTO memories (created, title, summary, raw_len, blob) VALUES (?, ?, ?, ?, ?)",
+        (entry["created"], title, summary, entry["raw_len"], blob),
+    )
+    vectors.upsert(conn, DB_PATH, cur.lastrowid, f"{title}\n{summary}")
+    return {"id": cur.lastrowid, **entry}
+
+
+def update(id: int, conn: Optional[sqlite3.Connection] = None, **fields) -> bool:
+    fields = {k: v for k, v in fields.items() if k in FIELDS and k != "id"}
+    if not fields:
+        return False
+    if conn is None:
+        return write(lambda c: update(id, c, **fields))
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    cur = conn.execute(f"UPDATE memories SET {cols} WHERE id = ?", (*fields.values(), int(id)))
+    if cur.rowcount and ("title" in fields or "summary" in fields):
+        row = get(id, conn)
+        vectors.upsert(conn, DB_PATH, int(id), f"{row['title']}\n{row['summary']}")
+    return cur.rowcount > 0
+
+
+def delete(ids: Iterable[int], conn: Optional[sqlite3.Connection] = None) -> int:
+    if conn is None:
+        return write(lambda c: delete(ids, c))
+    ids = sorted(set(int(x) for x in ids))
+    deleted = 0
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        cur = conn.execute(
+            f"DELETE FROM memories WHERE id IN ({','.join('?' * len(chunk))})", chunk
+        )
+        deleted += cur.rowcount
+    for id in ids:
+        vectors.remove(conn, DB_PATH, id)
+    return deleted
+
+
+def clear(conn: Optional[sqlite3.Connection] = None) -> int:
+    if conn is None:
+        return write(clear)
+    vectors.reset(DB_PATH)
+    return conn.execute("DELETE FROM memories").rowcount
+
+
+def touch(entries: Iterable[dict]) -> None:
+    """
+    Record a read of ``entries`` for LRU retention, in one write. Entries
+    whose stored access time is recent are skipped, so repeated reads do
+    not each cost a commit.
+    """
+    stamp = now()
+    cutoff = (datetime.utcnow() - timedelta(seconds=ACCESS_RESOLUTION_SEC)).isoformat() + "Z"
+    ids = [(stamp, int(e["id"])) for e in entries if not (e.get("accessed") and e["accessed"] > cutoff)]
+    if ids:
+        write(lambda c: c.executemany("UPDATE memories SET accessed = ? WHERE id = ?", ids))
+
+
+def blob_refs() -> set:
+    """Every blob hash some memory still points at."""
+    return {r[0] for r in connect().execute(
+        "SELECT DISTINCT blob FROM memories WHERE blob IS NOT NULL")}
+
+
+def vacuum() -> None:
+    """
+    Rewrite the database file without free pages and truncate the WAL.
+    Other processes keep reading their snapshot; writers wait (busy timeout).
+    """
+    with _write_lock:
+        conn = _writer_conn()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def similar(query: str, k: int) -> List[dict]:
+    """Top-k memories by hashed-vector cosine similarity; adds a ``score`` key."""
+    conn = connect()
+    if vectors.needs_rebuild(conn, DB_PATH):
+        with transaction() as db:
+            if vectors.needs_rebuild(db, DB_PATH):
+                vectors.rebuild(db, DB_PATH)
+    out = []
+    for id, score in vectors.query(DB_PATH, query, k, count()):
+        it = get(id)
+        if it:
+            out.append({**it, "score": score})
+    return out
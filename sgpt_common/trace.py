@@ -0,0 +1,280 @@
+# ~/.config/shell_gpt/functions/sgpt_common/trace.py
+"""
+Opt-in per-call instrumentation for the function modules.
+
+Off unless ``SGPT_TRACE`` is set (``1`` for ``~/.cache/shell_gpt/trace.jsonl``,
+or a file path). Then every ``Function.execute`` decorated with
+``instrument`` appends one JSON line per call:
+
+- wall and CPU time (this process, and finished child processes such as
+  shell commands);
+- bytes read and written through files and pipes, including by finished
+  child processes (``/proc/self/io``; absent where that file does not
+  exist), HTTP body bytes received off the wire, and the size of the
+  returned text;
+- sub-phase spans recorded by the shared modules with ``span``/``mark``:
+  DB lock wait, query and commit, HTTP connect and first byte, parsing,
+  output formatting, process runs. Spans carry their start offset, so
+  overlapping ones (reading while parsing) stay readable.
+
+``SGPT_TRACE_PROFILE=cpu`` (cProfile), ``mem`` (tracemalloc) or
+``cpu,mem`` also profiles each call and keeps the dumps of the
+``SGPT_TRACE_PROFILE_KEEP`` (default 5) slowest calls per function in
+``SGPT_TRACE_PROFILE_DIR``. cProfile only sees the calling thread.
+
+Everything here is a no-op when tracing is off, and trace I/O errors
+never reach the function.
+"""
+import json, os, threading, time
+from typing import Dict, List, Optional
+
+_SETTING = os.environ.get("SGPT_TRACE", "").strip()
+ENABLED = _SETTING.lower() not in ("", "0", "false", "no", "off")
+PATH = os.path.expanduser(
+    "~/.cache/shell_gpt/trace.jsonl" if _SETTING.lower() in ("1", "true", "yes", "on") else _SETTING
+) if ENABLED else ""
+PROFILE = {m.strip() for m in os.environ.get("SGPT_TRACE_PROFILE", "").lower().split(",")} & {"cpu", "mem"}
+PROFILE_KEEP = int(os.environ.get("SGPT_TRACE_PROFILE_KEEP", "5"))
+PROFILE_DIR = os.path.expanduser(
+    os.environ.get("SGPT_TRACE_PROFILE_DIR", os.path.splitext(PATH)[0] + ".prof" if PATH else "")
+)
+_MAX_SPANS = 500  # per call; the rest are only counted
+
+_active: List["_Call"] = []  # calls in progress, innermost last
+_lock = threading.Lock()
+_profiling = False
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL = _Null()
+
+
+class _Call:
+    __slots__ = ("name", "t0", "spans", "dropped", "counters")
+
+    def __init__(self, name: str):
+        self.name, self.t0, self.spans, self.dropped = name, time.perf_counter(), [], 0
+        self.counters: Dict[str, int] = {}
+
+    def add(self, name: str, start: float, end: float, attrs: dict) -> None:
+        rec = {"name": name, "at_ms": round((start - self.t0) * 1000, 3),
+               "ms": round((end - start) * 1000, 3), **attrs}
+        t = threading.current_thread()
+        if t is not threading.main_thread():
+            rec["thread"] = t.name
+        with _lock:
+            if len(self.spans) < _MAX_SPANS:
+                self.spans.append(rec)
+            else:
+                self.dropped += 1
+
+
+class _Span(_Null):
+    __slots__ = ("call", "name", "attrs", "start")
+
+    def __init__(self, call: _Call, name: str, attrs: dict):
+        self.call, self.name, self.attrs = call, name, attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.call.add(self.name, self.start, time.perf_counter(), self.attrs)
+        return False
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+def span(name: str, **attrs):
+    """Context manager timing one phase of the current call (``set()`` adds attributes)."""
+    if not _active:
+        return _NULL
+    return _Span(_active[-1], name, attrs)
+
+
+def clock() -> float:
+    return time.perf_counter()
+
+
+def mark(name: str, start: float, **attrs) -> None:
+    """Record a span from ``start`` (a ``clock()`` value) to now."""
+    if _active:
+        _active[-1].add(name, start, time.perf_counter(), attrs)
+
+
+def count(key: str, n: int) -> None:
+    """Add ``n`` to a per-call counter reported next to the timings."""
+    if _active and n:
+        call = _active[-1]
+        with _lock:
+            call.counters[key] = call.counters.get(key, 0) + n
+
+
+def _io() -> Optional[dict]:
+    try:
+        with open("/proc/self/io") as fh:
+            return {k: int(v) for k, v in (ln.split(":") for ln in fh) if k in ("rchar", "wchar")}
+    except (OSError, ValueError):
+        return None
+
+
+def _child_cpu() -> float:
+    import resource
+    r = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return r.ru_utime + r.ru_stime
+
+
+def _args(kwargs: dict) -> dict:
+    """Argument shapes only: strings and lists by length, so no content ends up in the trace."""
+    out = {}
+    for k, v in kwargs.items():
+        if v is None:
+            continue
+        out[k] = v if isinstance(v, (bool, int, float)) else f"{type(v).__name__}[{len(v)}]" \
+            if hasattr(v, "__len__") else type(v).__name__
+    return out
+
+
+def _write(rec: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(PATH) or ".", exist_ok=True)
+        line = json.dumps(rec, default=str) + "\n"
+        fd = os.open(PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, line.encode("utf-8"))  # one append per record
+        finally:
+            os.close(fd)
+    except (OSError, ValueError, TypeError):
+        pass
+
+
+def _keep_profile(name: str, wall_ms: float) -> Optional[str]:
+    """Base path for this call's dumps if it is among the slowest kept, else None."""
+    prefix = name + "-"
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        kept = {}  # base name -> ms, from "<fn>-<ms>ms-<pid>-<stamp>.<kind>"
+        for f in os.listdir(PROFILE_DIR):
+            if f.startswith(prefix) and "ms-" in f:
+                ms = f[len(prefix):].split("ms-", 1)[0]
+                if ms.isdigit():
+                    kept[f.split(".", 1)[0]] = int(ms)
+        if len(kept) >= PROFILE_KEEP:
+            evict = sorted(kept, key=kept.get)[: len(kept) - PROFILE_KEEP + 1]
+            if wall_ms <= kept[evict[-1]]:
+                return None
+            for f in os.listdir(PROFILE_DIR):
+                if f.split(".", 1)[0] in evict:
+                    os.remove(os.path.join(PROFILE_DIR, f))
+    except OSError:
+        return None
+    stamp = int(time.time() * 1000)
+    return os.path.join(PROFILE_DIR, f"{name}-{wall_ms:.0f}ms-{os.getpid()}-{stamp}")
+
+
+def _dump(name: str, wall_ms: float, prof, snapshot) -> Optional[str]:
+    base = _keep_profile(name, wall_ms)
+    if base is None:
+        return None
+    try:
+        if prof is not None:
+            prof.dump_stats(base + ".pstats")
+        if snapshot is not None:
+            stats = snapshot.statistics("lineno")
+            with open(base + ".tracemalloc.txt", "w") as fh:
+                fh.write(f"{name}: {wall_ms:.1f} ms, top allocations still held at return\n")
+                fh.writelines(f"{s}\n" for s in stats[:30])
+    except OSError:
+        return None
+    return base
+
+
+def _call(name: str, fn, args: tuple, kwargs: dict):
+    global _profiling
+    call = _Call(name)
+    io0, cpu0, child0 = _io(), time.process_time(), _child_cpu()
+    prof = tm = None
+    if PROFILE and not _profiling:  # profilers do not nest; the outer call owns them
+        _profiling = True
+        if "cpu" in PROFILE:
+            import cProfile
+            prof = cProfile.Profile()
+        if "mem" in PROFILE:
+            import tracemalloc
+            tm = tracemalloc
+            tm.start()
+    _active.append(call)
+    out, error = None, None
+    try:
+        if prof is not None:
+            prof.enable()
+        try:
+            out = fn(*args, **kwargs)
+        finally:
+            if prof is not None:
+                prof.disable()
+        return out
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        wall_ms = (time.perf_counter() - call.t0) * 1000
+        _active.remove(call)
+        rec = {"ts": round(time.time(), 3), "fn": name, "pid": os.getpid(),
+               "wall_ms": round(wall_ms, 3), "cpu_ms": round((time.process_time() - cpu0) * 1000, 3),
+               "child_cpu_ms": round((_child_cpu() - child0) * 1000, 3)}
+        io1 = _io()
+        if io0 and io1:
+            rec["read_bytes"] = io1["rchar"] - io0["rchar"]
+            rec["written_bytes"] = io1["wchar"] - io0["wchar"]
+        rec.update(call.counters)
+        rec["returned_bytes"] = len(out.encode("utf-8", "replace")) if isinstance(out, str) else 0
+        if error:
+            rec["error"] = error
+        rec["args"] = _args(kwargs)
+        snapshot = None
+        if tm is not None:
+            rec["py_alloc_peak_bytes"] = tm.get_traced_memory()[1]
+            snapshot = tm.take_snapshot()
+            tm.stop()
+        if prof is not None or tm is not None:
+            _profiling = False
+            base = _dump(name, wall_ms, prof, snapshot)
+            if base:
+                rec["profile"] = base
+        rec["spans"] = call.spans
+        if call.dropped:
+            rec["spans_dropped"] = call.dropped
+        _write(rec)
+
+
+def instrument(cls):
+    """
+    Class decorator for ``Function``: traces every ``execute`` call when
+    ``SGPT_TRACE`` is set, and returns the class untouched otherwise.
+    """
+    if not ENABLED:
+        return cls
+    name = getattr(getattr(cls, "Config", None), "title", None) or cls.__module__
+    inner = cls.execute  # bound classmethod
+
+    def execute(klass, *args, **kwargs):
+        return _call(name, inner, args, kwargs)
+
+    execute.__doc__, execute.__wrapped__ = inner.__doc__, inner
+    cls.execute = classmethod(execute)
+    return cls
@@ -0,0 +1,245 @@
+# ~/.config/shell_gpt/functions/sgpt_common/vectors.py
+"""
+Local similarity index for memories (needs NumPy, nothing else).
+
+Each memory is embedded with a signed hashing vectoriser over word unigrams
+and bigrams (sublinear TF, L2-normalised) and stored as row ``id`` of a flat
+float32 matrix next to the database. A per-dimension document-frequency
+table lets queries apply IDF weights without re-embedding the corpus.
+
+Writers are called by ``store`` inside its write transaction and only queue
+their changes; ``flush`` writes them just before COMMIT, so the SQLite
+write lock also serialises updates to these files across processes and a
+rolled-back write never reaches them.
+NumPy is imported on first use, not with the module: it would otherwise
+be most of the startup time of every memory function.
+"""
+import os, re, zlib
+from typing import List, Tuple
+
+DIM = int(os.environ.get("SGPT_MEMORY_VEC_DIM", "256"))
+_BATCH_ROWS = 65536  # rows scored per step in query()
+_BUILD_ROWS = 4096   # ids embedded per file write in rebuild()
+_WORD = re.compile(r"\w+")
+
+np = None  # numpy, once available() has imported it
+_np_missing = False
+
+
+def available() -> bool:
+    """True if NumPy is installed; the first call imports it."""
+    global np, _np_missing
+    if np is None and not _np_missing:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # optional dependency
+            _np_missing = True
+    return np is not None
+
+
+def _paths(db_path: str) -> Tuple[str, str]:
+    base = os.path.splitext(db_path)[0]
+    return base + ".vec", base + ".vecdf"
+
+
+def embed(text: str):
+    vec = np.zeros(DIM, dtype=np.float32)
+    words = _WORD.findall(text.lower())
+    counts: dict = {}
+    for i, w in enumerate(words):
+        counts[w] = counts.get(w, 0) + 1
+        if i:
+            bg = words[i - 1] + " " + w
+            counts[bg] = counts.get(bg, 0) + 1
+    for tok, tf in counts.items():
+        h = zlib.crc32(tok.encode("utf-8"))
+        vec[h % DIM] += (1.0 + np.log(tf)) * (1.0 if h & 0x80000000 else -1.0)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def _load_df(path: str):
+    try:
+        return np.fromfile(path, dtype=np.int64, count=DIM) if os.path.getsize(path) == DIM * 8 \
+            else np.zeros(DIM, dtype=np.int64)
+    except OSError:
+        return np.zeros(DIM, dtype=np.int64)
+
+
+def _read_row(fh, id: int):
+    fh.seek(id * DIM * 4)
+    buf = fh.read(DIM * 4)
+    return np.frombuffer(buf, dtype=np.float32) if len(buf) == DIM * 4 else None
+
+
+def _write(fh, df, id: int, vec) -> None:
+    old = _read_row(fh, id)
+    if old is not None:
+        df -= (old != 0)
+    fh.seek(id * DIM * 4)  # writing past EOF leaves a zero (sparse) gap
+    fh.write(vec.astype(np.float32).tobytes())
+    df += (vec != 0)
+
+
+# Changes made inside the current write transaction, as (db_path, id, vector):
+# vector None removes the row, id None drops the whole index. store applies
+# them with flush() just before COMMIT and cuts them back with discard() when
+# a savepoint or the transaction rolls back, so the files never get ahead of
+# the data. Only touched under store's write lock.
+_pending: list = []
+
+
+def pending() -> int:
+    """A mark to ``discard`` back to, taken when a savepoint starts."""
+    return len(_pending)
+
+
+def discard(mark: int = 0) -> None:
+    del _pending[mark:]
+
+
+def upsert(conn, db_path: str, id: int, text: str) -> None:
+    if not available():
+        mark_stale(conn)
+        return
+    _pending.append((db_path, id, embed(text)))
+
+
+def remove(conn, db_path: str, id: int) -> None:
+    if not available():
+        mark_stale(conn)
+        return
+    _pending.append((db_path, id, None))
+
+
+def reset(db_path: str) -> None:
+    _pending.append((db_path, None, None))
+
+
+def _delete_files(db_path: str) -> None:
+    for p in _paths(db_path):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+def flush(conn) -> bool:
+    """
+    Apply the pending changes to the files, inside the transaction that made
+    them. True if files were written. A write error marks the index stale
+    instead of failing the transaction.
+    """
+    ops, _pending[:] = _pending[:], []
+    if not ops:
+        return False
+    try:
+        for db_path, id, _ in ops:
+            if id is None:
+                _delete_files(db_path)
+        ops = ops[max((i for i, op in enumerate(ops) if op[1] is None), default=-1) + 1 :]
+        if ops:
+            _apply(conn, ops)
+    except OSError:
+        mark_stale(conn)
+    return True
+
+
+def _apply(conn, ops: list) -> None:
+    db_path = ops[0][0]
+    vec_path, df_path = _paths(db_path)
+    if not os.path.exists(vec_path):
+        # A new index is complete only if every memory is one written here.
+        ids = sorted({id for _, id, vec in ops if vec is not None})
+        if not ids:
+            return
+        written = sum(conn.execute(
+            f"SELECT COUNT(*) FROM memories WHERE id IN ({','.join('?' * len(ids[i : i + 500]))})",
+            ids[i : i + 500]).fetchone()[0] for i in range(0, len(ids), 500))
+        if written != conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]:
+            mark_stale(conn)
+            return
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('vec_dim', ?)", (str(DIM),))
+    df = _load_df(df_path)
+    with open(vec_path, "r+b" if os.path.exists(vec_path) else "w+b") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        for _, id, vec in ops:
+            if vec is None:
+                if size < (id + 1) * DIM * 4:
+                    continue
+                vec = np.zeros(DIM, dtype=np.float32)
+            _write(fh, df, id, vec)
+            size = max(size, (id + 1) * DIM * 4)
+    np.maximum(df, 0, out=df).tofile(df_path)
+
+
+def mark_stale(conn) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('vec_stale', '1')")
+
+
+def needs_rebuild(conn, db_path: str) -> bool:
+    """True if memories exist and the matrix is missing, was written without NumPy, or DIM changed."""
+    meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('vec_stale', 'vec_dim')"))
+    if conn.execute("SELECT 1 FROM memories LIMIT 1").fetchone() is None:
+        return False  # nothing to index
+    if meta.get("vec_stale") == "1" or meta.get("vec_dim") != str(DIM):
+        return True
+    return not os.path.exists(_paths(db_path)[0])
+
+
+def rebuild(conn, db_path: str) -> None:
+    """Re-embed every memory, writing the matrix in windows of ``_BUILD_ROWS`` ids."""
+    available()
+    vec_path, df_path = _paths(db_path)
+    discard()
+    _delete_files(db_path)
+    df = np.zeros(DIM, dtype=np.int64)
+    win = np.zeros((_BUILD_ROWS, DIM), dtype=np.float32)
+    start, last = 0, -1
+    with open(vec_path, "wb") as fh:
+        def spill():
+            if last >= start:
+                rows = win[: last - start + 1]
+                df[:] += (rows != 0).sum(axis=0)
+                fh.seek(start * DIM * 4)
+                fh.write(rows.tobytes())
+                win[:] = 0
+        for id, title, summary in conn.execute("SELECT id, title, summary FROM memories ORDER BY id"):
+            if id >= start + _BUILD_ROWS:
+                spill()
+                start = id
+            win[id - start] = embed(f"{title}\n{summary}")
+            last = id
+        spill()
+    df.tofile(df_path)
+    conn.execute("DELETE FROM meta WHERE key = 'vec_stale'")
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('vec_dim', ?)", (str(DIM),))
+
+
+def query(db_path: str, text: str, k: int, n_docs: int) -> List[Tuple[int, float]]:
+    """Top-k (id, cosine) pairs, scored in fixed-size batches over a memory map."""
+    vec_path, df_path = _paths(db_path)
+    if not available() or not os.path.exists(vec_path):
+        return []
+    rows = os.path.getsize(vec_path) // (DIM * 4)
+    if not rows:
+        return []
+    q = embed(text) * np.log((1.0 + n_docs) / (1.0 + _load_df(df_path))).astype(np.float32)
+    norm = float(np.linalg.norm(q))
+    if not norm:
+        return []
+    q /= norm
+    mat = np.memmap(vec_path, dtype=np.float32, mode="r", shape=(rows, DIM))
+    best_ids = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, rows, _BATCH_ROWS):
+        scores = mat[start : start + _BATCH_ROWS] @ q
+        top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+        best_ids = np.concatenate([best_ids, top + start])
+        best_scores = np.concatenate([best_scores, scores[top]])
+        if len(best_ids) > k:
+            keep = np.argpartition(-best_scores, k)[:k]
+            best_ids, best_scores = best_ids[keep], best_scores[keep]
+    order = np.argsort(-best_scores)
+    return [(int(best_ids[i]), float(best_scores[i])) for i in order if best_scores[i] > 0]
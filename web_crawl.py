@@ -0,0 +1,47 @@
+# ~/.config/shell_gpt/functions/web_crawl.py
+import os, sys
+from typing import Optional
+from pydantic import Field
+from instructor import OpenAISchema
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import crawl, defaults, httpclient, trace
+
+@trace.instrument
+class Function(OpenAISchema):
+    """
+    Crawl a site breadth-first from a seed URL and list the pages found
+    (depth, status, URL, title). Follows robots.txt and stays on the seed's host by default.
+    """
+
+    url: str = Field(..., description="Seed URL to start from.")
+    max_depth: int = Field(2, ge=0, le=5, description="How many links away from the seed to go.")
+    max_pages: int = Field(50, ge=1, le=1000, description="Stop after fetching this many pages.")
+    same_host: bool = Field(True, description="Only follow links to the seed URL's host.")
+    timeout_sec: int = Field(20, ge=1, le=120, description="Per-request timeout seconds.")
+    delay_sec: float = Field(defaults.CRAWL_DELAY_SEC, ge=0, le=10, description="Minimum delay between requests to one host.")
+    user_agent: Optional[str] = Field(None, description="Override User-Agent (also used for robots.txt).")
+
+    class Config:
+        title = "web_crawl"
+
+    @classmethod
+    def execute(cls, url: str, max_depth: int = 2, max_pages: int = 50, same_host: bool = True,
+                timeout_sec: int = 20, delay_sec: float = defaults.CRAWL_DELAY_SEC,
+                user_agent: Optional[str] = None) -> str:
+        stats: dict = {}
+        lines = []
+        try:
+            for page in crawl.crawl(url, max_depth, max_pages, same_host, timeout_sec,
+                                    user_agent or httpclient.UA, delay=delay_sec, stats=stats):
+                status = page.status if page.status is not None else "---"
+                what = page.error or page.title or "(no title)"
+                lines.append(f"[{page.depth}] {status} {page.url}  —  {what}")
+        except ValueError as e:
+            return f"Error: {e}"
+        head = (f"Crawled {len(lines)} pages (depth <= {max_depth}); "
+                f"{stats.get('errors', 0)} errors, {stats.get('robots_blocked', 0)} blocked by robots.txt, "
+                f"{stats.get('visited', 0)} distinct URLs seen.")
+        return head + ("\n" + "\n".join(lines) if lines else "")
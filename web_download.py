@@ -1,15 +1,20 @@
 # ~/.config/shell_gpt/functions/web_download.py
-import urllib.request, urllib.error, urllib.parse
-import ssl, os, hashlib
+import os, sys
 from typing import Optional, Dict
 from pydantic import Field
 from instructor import OpenAISchema
 
-UA = "ShellGPT-Web/1.0 (+https://github.com/TheR1D/shell_gpt)"
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import download, httpclient, trace
 
+@trace.instrument
 class Function(OpenAISchema):
     """
     Download a URL to a file path with a size cap and return file info (path, size, sha256).
+    Large files on servers that support byte ranges are fetched in parallel segments,
+    and an interrupted download resumes from its .part file on the next call.
     """
 
     url: str = Field(..., description="HTTP/HTTPS URL to download.")
@@ -18,6 +23,7 @@ class Function(OpenAISchema):
     timeout_sec: int = Field(60, ge=1, le=300, description="Request timeout seconds.")
     user_agent: Optional[str] = Field(None, description="Override User-Agent.")
     headers: Optional[Dict[str, str]] = Field(default_factory=dict, description="Extra headers.")
+    segments: int = Field(4, ge=1, le=16, description="Parallel byte-range connections for large files.")
 
     class Config:
         title = "web_download"
@@ -25,34 +31,24 @@ class Function(OpenAISchema):
     @classmethod
     def execute(cls, url: str, out_path: str, max_bytes: int = 50*1024*1024,
                 timeout_sec: int = 60, user_agent: Optional[str] = None,
-                headers: Optional[Dict[str, str]] = None) -> str:
-        headers = headers or {}
-        headers.setdefault("User-Agent", user_agent or UA)
-        ctx = ssl.create_default_context()
-        req = urllib.request.Request(url, headers=headers, method="GET")
-
+                headers: Optional[Dict[str, str]] = None, segments: int = 4) -> str:
+        # Ask for the bytes as stored, so the file and its SHA-256 match the source.
+        headers = {"Accept-Encoding": "identity", **(headers or {})}
+        if user_agent:
+            headers.setdefault("User-Agent", user_agent)
         os.makedirs(os.path.dirname(os.path.abspath(out_path)) or ".", exist_ok=True)
         try:
-            with urllib.request.urlopen(req, timeout=timeout_sec, context=ctx) as resp:
-                sha = hashlib.sha256()
-                total = 0
-                with open(out_path, "wb") as fh:
-                    while True:
-                        chunk = resp.read(65536)
-                        if not chunk:
-                            break
-                        total += len(chunk)
-                        if total > max_bytes:
-                            fh.close()
-                            try: os.remove(out_path)
-                            except Exception: pass
-                            return f"Aborted: download exceeded {max_bytes} bytes."
-                        fh.write(chunk)
-                        sha.update(chunk)
-                return f"Saved: {out_path}\nSize: {total} bytes\nSHA256: {sha.hexdigest()}"
-        except urllib.error.HTTPError as e:
+            total, digest, mode = download.download(url, out_path, headers, timeout_sec,
+                                                    max_bytes, segments)
+            return f"Saved: {out_path}\nSize: {total} bytes\nSHA256: {digest}\nMode: {mode}"
+        except download.Aborted as e:
+            return str(e)
+        except download.Interrupted as e:
+            return (f"Interrupted: {e}. Partial download kept in {out_path}.part; "
+                    f"call again with the same url and out_path to resume.")
+        except httpclient.HTTPError as e:
             return f"HTTPError {e.code}: {e.reason}"
-        except urllib.error.URLError as e:
+        except httpclient.URLError as e:
             return f"URLError: {e.reason}"
         except Exception as e:
             return f"Error: {e}"
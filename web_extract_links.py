@@ -1,46 +1,26 @@
 # ~/.config/shell_gpt/functions/web_extract_links.py
-import urllib.request, urllib.error, urllib.parse
-import ssl
-from html.parser import HTMLParser
-from typing import List, Tuple, Optional, Dict
+import os, sys
+from typing import List, Optional, Dict
 from pydantic import Field
 from instructor import OpenAISchema
 
-UA = "ShellGPT-Web/1.0 (+https://github.com/TheR1D/shell_gpt)"
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import batch, defaults, extract, httpcache, httpclient, trace
 
-class _LinkParser(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.links: List[Tuple[str, str]] = []  # (href, text)
-        self._in_a = False
-        self._buf = ""
-        self._curr_href = None
-
-    def handle_starttag(self, tag, attrs):
-        if tag.lower() == "a":
-            self._in_a = True
-            self._buf = ""
-            self._curr_href = dict(attrs).get("href")
-
-    def handle_data(self, data):
-        if self._in_a:
-            self._buf += data
-
-    def handle_endtag(self, tag):
-        if tag.lower() == "a" and self._in_a:
-            text = " ".join(self._buf.split())
-            href = self._curr_href or ""
-            self.links.append((href, text))
-            self._in_a = False
-            self._buf = ""
-            self._curr_href = None
+MAX_LINKS = 500
+MAX_BYTES = 8 * 1024 * 1024  # stop reading pages that never reach MAX_LINKS
 
+@trace.instrument
 class Function(OpenAISchema):
     """
     Download a page and extract all anchor links (href + text).
+    Pass ``urls`` instead to fetch several pages concurrently in one call.
     """
 
-    url: str = Field(..., description="Page URL.")
+    url: Optional[str] = Field(None, description="Page URL.")
+    urls: Optional[List[str]] = Field(None, description=f"Several page URLs to fetch concurrently (up to {defaults.WEB_BATCH_MAX_URLS}); results keep this order.")
     timeout_sec: int = Field(20, ge=1, le=120)
     user_agent: Optional[str] = Field(None)
     headers: Optional[Dict[str, str]] = Field(default_factory=dict)
@@ -49,27 +29,51 @@ class Function(OpenAISchema):
         title = "web_extract_links"
 
     @classmethod
-    def execute(cls, url: str, timeout_sec: int = 20, user_agent: Optional[str] = None,
-                headers: Optional[Dict[str, str]] = None) -> str:
-        headers = headers or {}
-        headers.setdefault("User-Agent", user_agent or UA)
-        ctx = ssl.create_default_context()
-        try:
-            req = urllib.request.Request(url, headers=headers, method="GET")
-            with urllib.request.urlopen(req, timeout=timeout_sec, context=ctx) as resp:
-                content_type = resp.headers.get("Content-Type","")
-                body = resp.read().decode("utf-8", errors="replace")
-            if "html" not in content_type.lower() and "<html" not in body.lower():
-                return "Not HTML content; no links extracted."
-            p = _LinkParser()
-            p.feed(body)
-            if not p.links:
-                return "No links found."
-            lines = [f"- {href}  —  {text}" for href, text in p.links if href]
-            return "\n".join(lines[:500])
-        except urllib.error.HTTPError as e:
-            return f"HTTPError {e.code}: {e.reason}"
-        except urllib.error.URLError as e:
-            return f"URLError: {e.reason}"
-        except Exception as e:
-            return f"Error: {e}"
+    def execute(cls, url: Optional[str] = None, timeout_sec: int = 20, user_agent: Optional[str] = None,
+                headers: Optional[Dict[str, str]] = None, urls: Optional[List[str]] = None) -> str:
+        fetch = lambda u: _links(u, timeout_sec, user_agent, headers)
+        if urls:
+            return batch.report(urls, fetch, timeout_sec)
+        if not url:
+            return "Error: give url or urls."
+        return fetch(url)
+
+
+def _links(url: str, timeout_sec: int, user_agent: Optional[str],
+           headers: Optional[Dict[str, str]]) -> str:
+    try:
+        with httpcache.get(url, headers, timeout_sec, user_agent) as resp:
+            cached = httpcache.derived(resp.body_sha, "web_extract_links")
+            if cached is not None:
+                return cached
+            content_type = resp.headers.get("Content-Type","")
+            is_html = "html" in content_type.lower()
+            t = trace.clock()
+            p = extract.LinkParser()
+            prev = ""
+            for chunk in httpclient.iter_text(resp, MAX_BYTES):
+                if not is_html:
+                    is_html = "<html" in (prev + chunk).lower()
+                    prev = chunk[-4:]
+                p.feed(chunk)
+                if is_html and p.with_href >= MAX_LINKS:
+                    httpcache.abandon(resp)
+                    break  # later links would be cut anyway
+            trace.mark("parse", t, links=len(p.links))
+            t = trace.clock()
+            if not is_html:
+                out = "Not HTML content; no links extracted."
+            elif not p.links:
+                out = "No links found."
+            else:
+                lines = [f"- {href}  —  {text}" for href, text in p.links if href]
+                out = "\n".join(lines[:MAX_LINKS])
+            trace.mark("serialize", t)
+            httpcache.put_derived(resp.body_sha, "web_extract_links", out)
+            return out
+    except httpclient.HTTPError as e:
+        return f"HTTPError {e.code}: {e.reason}"
+    except httpclient.URLError as e:
+        return f"URLError: {e.reason}"
+    except Exception as e:
+        return f"Error: {e}"
@@ -1,18 +1,23 @@
 # ~/.config/shell_gpt/functions/web_get.py
-import urllib.request, urllib.error, urllib.parse
-import ssl, sys
-from typing import Dict, Optional
+import os, sys
+from typing import Dict, List, Optional
 from pydantic import Field
 from instructor import OpenAISchema
 
-UA = "ShellGPT-Web/1.0 (+https://github.com/TheR1D/shell_gpt)"
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import batch, defaults, httpcache, httpclient, trace
 
+@trace.instrument
 class Function(OpenAISchema):
     """
     Fetch a URL with HTTP GET and return status, headers, and a truncated body preview.
+    Pass ``urls`` instead to fetch several pages concurrently in one call.
     """
 
-    url: str = Field(..., description="HTTP/HTTPS URL to fetch.")
+    url: Optional[str] = Field(None, description="HTTP/HTTPS URL to fetch.")
+    urls: Optional[List[str]] = Field(None, description=f"Several URLs to fetch concurrently (up to {defaults.WEB_BATCH_MAX_URLS}); results keep this order.")
     timeout_sec: int = Field(20, ge=1, le=120, description="Request timeout seconds.")
     max_preview_bytes: int = Field(65536, ge=1024, le=1048576, description="Max body bytes to include in response preview.")
     user_agent: Optional[str] = Field(None, description="Override User-Agent header.")
@@ -22,25 +27,32 @@ class Function(OpenAISchema):
         title = "web_get"
 
     @classmethod
-    def execute(cls, url: str, timeout_sec: int = 20, max_preview_bytes: int = 65536,
-                user_agent: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> str:
-        headers = headers or {}
-        headers.setdefault("User-Agent", user_agent or UA)
-        ctx = ssl.create_default_context()
-        req = urllib.request.Request(url, headers=headers, method="GET")
-        try:
-            with urllib.request.urlopen(req, timeout=timeout_sec, context=ctx) as resp:
-                status = resp.status
-                hdrs = dict(resp.headers.items())
-                body = resp.read(max_preview_bytes)
-                truncated = resp.length is None or (resp.length > len(body))
-                preview = body.decode(hdrs.get("Content-Encoding","utf-8"), errors="replace") \
-                          if isinstance(body, (bytes, bytearray)) else str(body)
-                note = " (truncated)" if truncated else ""
-                return f"Status: {status}\nHeaders: {hdrs}\n\nBody preview{note}:\n{preview}"
-        except urllib.error.HTTPError as e:
-            return f"HTTPError {e.code}: {e.reason}"
-        except urllib.error.URLError as e:
-            return f"URLError: {e.reason}"
-        except Exception as e:
-            return f"Error: {e}"
+    def execute(cls, url: Optional[str] = None, timeout_sec: int = 20, max_preview_bytes: int = 65536,
+                user_agent: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                urls: Optional[List[str]] = None) -> str:
+        fetch = lambda u: _get(u, timeout_sec, max_preview_bytes, user_agent, headers)
+        if urls:
+            return batch.report(urls, fetch, timeout_sec)
+        if not url:
+            return "Error: give url or urls."
+        return fetch(url)
+
+
+def _get(url: str, timeout_sec: int, max_preview_bytes: int, user_agent: Optional[str],
+         headers: Optional[Dict[str, str]]) -> str:
+    try:
+        with httpcache.get(url, headers, timeout_sec, user_agent) as resp:
+            status = resp.status
+            hdrs = dict(resp.headers.items())
+            body = resp.read(max_preview_bytes + 1)
+            truncated = len(body) > max_preview_bytes
+            preview = body[:max_preview_bytes].decode(httpclient.charset(resp), errors="replace")
+            note = " (truncated)" if truncated else ""
+            cached = f" (from cache: {resp.cache_state})" if resp.cache_state in ("hit", "revalidated") else ""
+            return f"Status: {status}{cached}\nHeaders: {hdrs}\n\nBody preview{note}:\n{preview}"
+    except httpclient.HTTPError as e:
+        return f"HTTPError {e.code}: {e.reason}"
+    except httpclient.URLError as e:
+        return f"URLError: {e.reason}"
+    except Exception as e:
+        return f"Error: {e}"
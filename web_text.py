@@ -1,69 +1,90 @@
 # ~/.config/shell_gpt/functions/web_text.py
-import urllib.request, urllib.error, urllib.parse
-import ssl, re
-from html.parser import HTMLParser
-from typing import Optional, Dict
+import os, sys
+from typing import Optional, Dict, List, Literal
 from pydantic import Field
 from instructor import OpenAISchema
 
-UA = "ShellGPT-Web/1.0 (+https://github.com/TheR1D/shell_gpt)"
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)  # sgpt_common/ ships next to the function files
+from sgpt_common import batch, defaults, extract, httpcache, httpclient, trace
 
-class _TextParser(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.out = []
-        self._skip = False  # inside script/style
-
-    def handle_starttag(self, tag, attrs):
-        if tag.lower() in ("script","style"):
-            self._skip = True
-        elif tag.lower() in ("p","br","div","li","h1","h2","h3","h4","h5","h6"):
-            self.out.append("\n")
-
-    def handle_endtag(self, tag):
-        if tag.lower() in ("script","style"):
-            self._skip = False
-        elif tag.lower() in ("p","div","li"):
-            self.out.append("\n")
-
-    def handle_data(self, data):
-        if not self._skip:
-            self.out.append(data)
-
-    def text(self):
-        raw = "".join(self.out)
-        raw = re.sub(r"\n\s*\n\s*\n+", "\n\n", raw)
-        return raw.strip()
+MAX_CHARS = 200_000  # output cap
+MAX_BYTES = 8 * 1024 * 1024  # stop reading pages that never reach MAX_CHARS of text
 
+@trace.instrument
 class Function(OpenAISchema):
     """
     Fetch a URL and return a rough plaintext extraction of the HTML.
+    Pass ``urls`` instead to fetch several pages concurrently in one call.
+    mode="main" keeps only the main content (article text and headings), dropping
+    navigation, sidebars, footers and repeated boilerplate.
     """
 
-    url: str = Field(..., description="Page URL.")
+    url: Optional[str] = Field(None, description="Page URL.")
+    urls: Optional[List[str]] = Field(None, description=f"Several page URLs to fetch concurrently (up to {defaults.WEB_BATCH_MAX_URLS}); results keep this order.")
     timeout_sec: int = Field(20, ge=1, le=120)
     user_agent: Optional[str] = Field(None)
     headers: Optional[Dict[str, str]] = Field(default_factory=dict)
+    mode: Literal["all", "main"] = Field("all", description="'all' = all page text; 'main' = main content only (much shorter).")
+    max_chars: Optional[int] = Field(None, ge=200, le=MAX_CHARS, description="Trim the text to about this many characters.")
+    max_tokens: Optional[int] = Field(None, ge=50, le=MAX_CHARS // 4, description="Trim the text to about this many tokens.")
 
     class Config:
         title = "web_text"
 
     @classmethod
-    def execute(cls, url: str, timeout_sec: int = 20, user_agent: Optional[str] = None,
-                headers: Optional[Dict[str, str]] = None) -> str:
-        headers = headers or {}
-        headers.setdefault("User-Agent", user_agent or UA)
-        ctx = ssl.create_default_context()
-        try:
-            req = urllib.request.Request(url, headers=headers, method="GET")
-            with urllib.request.urlopen(req, timeout=timeout_sec, context=ctx) as resp:
-                body = resp.read().decode("utf-8", errors="replace")
-            p = _TextParser()
-            p.feed(body)
-            return p.text()[:200_000]  # cap output
-        except urllib.error.HTTPError as e:
-            return f"HTTPError {e.code}: {e.reason}"
-        except urllib.error.URLError as e:
-            return f"URLError: {e.reason}"
-        except Exception as e:
-            return f"Error: {e}"
+    def execute(cls, url: Optional[str] = None, timeout_sec: int = 20, user_agent: Optional[str] = None,
+                headers: Optional[Dict[str, str]] = None, urls: Optional[List[str]] = None,
+                mode: str = "all", max_chars: Optional[int] = None,
+                max_tokens: Optional[int] = None) -> str:
+        if mode not in ("all", "main"):
+            return "Error: mode must be 'all' or 'main'."
+        limit = extract.budget(max_chars, max_tokens)
+        fetch = lambda u: _text(u, timeout_sec, user_agent, headers, mode, limit)
+        if urls:
+            return batch.report(urls, fetch, timeout_sec)
+        if not url:
+            return "Error: give url or urls."
+        return fetch(url)
+
+
+def _text(url: str, timeout_sec: int, user_agent: Optional[str],
+          headers: Optional[Dict[str, str]], mode: str = "all",
+          limit: Optional[int] = None) -> str:
+    try:
+        with httpcache.get(url, headers, timeout_sec, user_agent) as resp:
+            kind = "web_text" if mode == "all" else f"web_text:{mode}"
+            cached = httpcache.derived(resp.body_sha, kind)
+            if cached is not None:
+                return extract.trim(cached, limit)
+            t = trace.clock()
+            if mode == "main":
+                ex = extract.Extractor()
+                for chunk in httpclient.iter_text(resp, MAX_BYTES):
+                    ex.feed(chunk)
+                text = ex.text()[:MAX_CHARS]
+                trace.mark("parse", t, mode=mode, chars=len(text))
+                httpcache.put_derived(resp.body_sha, kind, text)
+                return extract.trim(text, limit)
+            p = extract.TextParser()
+            check_at = MAX_CHARS
+            for chunk in httpclient.iter_text(resp, MAX_BYTES):
+                p.feed(chunk)
+                # Once the text is past the cap (and not just trailing whitespace, which
+                # may still collapse), the rest of the page cannot change the output.
+                if p.chars > check_at:
+                    if len(p.text()) > MAX_CHARS:
+                        httpcache.abandon(resp)
+                        break
+                    check_at = p.chars + 65536
+            text = p.text()[:MAX_CHARS]  # cap output
+            trace.mark("parse", t, mode=mode, chars=len(text))
+            httpcache.put_derived(resp.body_sha, kind, text)
+            return extract.trim(text, limit)
+    except httpclient.HTTPError as e:
+        return f"HTTPError {e.code}: {e.reason}"
+    except httpclient.URLError as e:
+        return f"URLError: {e.reason}"
+    except Exception as e:
+        return f"Error: {e}"